@@ -5,13 +5,21 @@ import sys
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(backend_dir)
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import logging
-from utils.detection_utils import load_model
+from utils.model_registry import model_registry, get_weapon_model
+from utils.video_jobs import video_job_queue, analysis_job_queue
+from utils.weapon_info import WeaponInfo
+from utils.result_cache import image_result_cache
+from utils.inference_scheduler import get_weapon_detector, scheduler_stats, pool_stats
+from utils.adaptive_resolution import resolution_controller
+from utils.metrics import registry as metrics_registry
+from utils.live_streams import live_streams
 from routes.video_routes import video_bp
 from routes.image_routes import image_bp
+from routes.stream_routes import stream_bp
 from config import Config
 
 # Configure logging
@@ -28,13 +36,16 @@ def create_app():
     CORS(app, resources={
         r"/api/*": {
             "origins": "*",
-            "methods": ["GET", "POST", "OPTIONS"],
+            "methods": ["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Range"],
             "expose_headers": ["Content-Range", "Content-Length", "Content-Type"]
         }
     })
     
     socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    video_job_queue.init_app(socketio)
+    analysis_job_queue.init_app(socketio)
+    live_streams.init_app(socketio)
 
     # Create necessary directories
     for folder in [Config.UPLOAD_FOLDER, 'processed_images', 'processed_videos']:
@@ -52,8 +63,12 @@ def create_app():
         if not os.path.exists(Config.WEAPON_MODEL_PATH):
             raise FileNotFoundError(f"Model file not found: {Config.WEAPON_MODEL_PATH}")
         
-        app.config['WEAPON_MODEL'] = load_model(Config.WEAPON_MODEL_PATH)
+        app.config['WEAPON_MODEL'] = get_weapon_model()
         logger.info("Weapon detection model loaded successfully")
+        
+        # Start the inference worker processes now rather than on the first request
+        if Config.INFERENCE_POOL_ENABLED:
+            get_weapon_detector()
     except Exception as e:
         logger.error(f"Error loading weapon detection model: {str(e)}")
         raise
@@ -61,11 +76,38 @@ def create_app():
     # Register blueprints with proper URL prefixes
     app.register_blueprint(image_bp, url_prefix='/api/image')
     app.register_blueprint(video_bp, url_prefix='/api/video')
+    app.register_blueprint(stream_bp, url_prefix='/api/streams')
     logger.info("Blueprints registered successfully")
 
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        return {"status": "healthy", "model_loaded": "WEAPON_MODEL" in app.config}
+        model_error = None
+        try:
+            model_registry.resolve_version(Config.WEAPON_MODEL_NAME, Config.WEAPON_MODEL_VERSION)
+        except KeyError as e:
+            # A misconfigured WEAPON_MODEL_VERSION is reported rather than failing the health check
+            model_error = e.args[0]
+        health = {
+            "status": "healthy" if model_error is None else "unhealthy",
+            "model_loaded": model_registry.is_loaded(Config.WEAPON_MODEL_NAME, Config.WEAPON_MODEL_VERSION),
+            "model_error": model_error,
+            "models": model_registry.status(),
+            "video_jobs": video_job_queue.stats(),
+            "weapon_info_cache": WeaponInfo.cache_stats(),
+            "gemini_rate_limit": WeaponInfo.rate_limit_stats(),
+            "analysis_jobs": analysis_job_queue.stats(),
+            "image_result_cache": image_result_cache.stats(),
+            "inference_scheduler": scheduler_stats(),
+            "inference_pool": pool_stats(),
+            "adaptive_resolution": resolution_controller.stats(),
+            "live_streams": live_streams.stats()
+        }
+        return health, 200 if model_error is None else 503
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        """Per-stage latency histograms and frame counters in the Prometheus text format"""
+        return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
     @socketio.on('connect')
     def handle_connect():
@@ -76,6 +118,66 @@ def create_app():
     def handle_disconnect():
         logger.info('Client disconnected')
 
+    def event_field(data, field, event):
+        """data[field] of a client event, or None after telling the client it is missing"""
+        value = data.get(field) if isinstance(data, dict) else None
+        if not isinstance(value, str) or not value:
+            emit('subscription_error', {'event': event, 'error': f'{field} is required'})
+            return None
+        return value
+
+    @socketio.on('subscribe_video_job')
+    def handle_subscribe_video_job(data=None):
+        job_id = event_field(data, 'job_id', 'subscribe_video_job')
+        if job_id is None:
+            return
+        join_room(job_id)
+        emit('video_job_subscribed', {'job_id': job_id})
+
+    @socketio.on('unsubscribe_video_job')
+    def handle_unsubscribe_video_job(data=None):
+        job_id = event_field(data, 'job_id', 'unsubscribe_video_job')
+        if job_id is not None:
+            leave_room(job_id)
+
+    @socketio.on('subscribe_weapon_analysis')
+    def handle_subscribe_weapon_analysis(data=None):
+        request_id = event_field(data, 'request_id', 'subscribe_weapon_analysis')
+        if request_id is None:
+            return
+        join_room(request_id)
+        emit('weapon_analysis_subscribed', {'request_id': request_id})
+
+    @socketio.on('subscribe_live_stream')
+    def handle_subscribe_live_stream(data=None):
+        stream_id = event_field(data, 'stream_id', 'subscribe_live_stream')
+        if stream_id is None:
+            return
+        stream = live_streams.get(stream_id)
+        if stream is None:
+            emit('live_stream_status', {'stream_id': stream_id, 'status': 'not_found'})
+            return
+        join_room(stream.room)
+        emit('live_stream_subscribed', {'stream_id': stream.id, 'status': stream.status})
+
+    @socketio.on('unsubscribe_live_stream')
+    def handle_unsubscribe_live_stream(data=None):
+        stream_id = event_field(data, 'stream_id', 'unsubscribe_live_stream')
+        if stream_id is not None:
+            leave_room(f"live_stream:{stream_id}")
+
+    @socketio.on('live_stream_ack')
+    def handle_live_stream_ack(data=None):
+        """Clients echo captured_at and emitted_at of a detections event to report end-to-end latency"""
+        if not isinstance(data, dict) or not isinstance(data.get('stream_id'), str):
+            return
+        stream = live_streams.get(data['stream_id'])
+        if stream is not None and 'captured_at' in data and 'emitted_at' in data:
+            try:
+                stream.record_ack(float(data['captured_at']), float(data['emitted_at']))
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring malformed live stream ack for {stream.id}")
+
     return app, socketio
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""Benchmark: per-detection draw_detections() copies vs. the in-place AnnotationRenderer.
+
+Modes:
+    per_detection  - the old video route: draw_detections(frame, [det]) per box, each call copies the frame
+    per_frame      - one draw_detections() call per frame, one copy
+    in_place       - AnnotationRenderer.draw(frame, dets, out=frame): cached label patches, no copy
+
+Memory is measured with tracemalloc (numpy reports its buffers to it): the
+peak of extra memory while annotating a frame, i.e. the transient buffers the
+renderer needs. Also checks that the renderer's pixels match the old drawing.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_annotation --sizes 720p 1080p --boxes 1 5 20
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+# utils/__init__ imports weapon_info, which refuses to load without a key; no API calls are made here
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('WEAPON_INFO_CACHE_PATH', '')
+
+from utils.annotation import AnnotationRenderer
+from benchmarks.synthetic import RESOLUTIONS, synthetic_image
+
+def legacy_draw_detections(image, detections):
+    """draw_detections() as it was before the renderer: copy, then getTextSize/rectangle/putText per box"""
+    img = image.copy()
+    for det in detections:
+        x1, y1, x2, y2 = det['bbox']
+        cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        label = f"{det['class']} {det['confidence']:.2f}"
+        (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        cv2.rectangle(img, (int(x1), int(y1) - text_height - 4), (int(x1) + text_width, int(y1)), (0, 255, 0), -1)
+        cv2.putText(img, label, (int(x1), int(y1) - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    return img
+
+def make_detections(shape, count, seed=0):
+    height, width = shape[:2]
+    rng = np.random.default_rng(seed)
+    detections = []
+    for i in range(count):
+        x, y = float(rng.uniform(0, width * 0.8)), float(rng.uniform(30, height * 0.8))
+        detections.append({
+            'class': ('pistol', 'knife', 'rifle')[i % 3],
+            # Two-decimal confidences repeat across frames, as they do in real video
+            'confidence': round(float(rng.uniform(0.3, 1.0)), 2),
+            'bbox': [x, y, x + width * 0.1, y + height * 0.1]
+        })
+    return detections
+
+def run_mode(mode, frames, detections, renderer):
+    def annotate(frame, frame_detections):
+        if mode == 'per_detection':
+            for det in frame_detections:
+                frame = legacy_draw_detections(frame, [det])
+            return frame
+        if mode == 'per_frame':
+            return legacy_draw_detections(frame, frame_detections)
+        return renderer.draw(frame, frame_detections, out=frame)
+
+    # Warm the label cache and any lazily allocated OpenCV state
+    annotate(frames[0].copy(), detections[0])
+
+    start = time.perf_counter()
+    for frame, frame_detections in zip(frames, detections):
+        annotate(frame, frame_detections)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peaks = []
+    for frame, frame_detections in zip(frames, detections):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = annotate(frame, frame_detections)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    tracemalloc.stop()
+    return elapsed / len(frames) * 1000.0, float(np.mean(peaks))
+
+def check_parity(image, detections, renderer):
+    expected = legacy_draw_detections(image, detections)
+    actual = renderer.draw(image, detections)
+    return int(np.count_nonzero(np.any(expected != actual, axis=2)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=sorted(RESOLUTIONS), default=['720p', '1080p'])
+    parser.add_argument('--boxes', nargs='+', type=int, default=[1, 5, 20])
+    parser.add_argument('--frames', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'boxes':>6} {'mode':>14} {'ms/frame':>10} {'peak KiB/frame':>15} {'frame copies':>13}")
+    for size in args.sizes:
+        base = synthetic_image(size)
+        frame_bytes = base.nbytes
+        for count in args.boxes:
+            detections = [make_detections(base.shape, count, seed=i % 10) for i in range(args.frames)]
+            renderer = AnnotationRenderer()
+            differing = check_parity(base, detections[0], renderer)
+            for mode in ('per_detection', 'per_frame', 'in_place'):
+                frames = [base.copy() for _ in range(args.frames)]
+                ms, peak = run_mode(mode, frames, detections, renderer)
+                print(f"{size:>6} {count:>6} {mode:>14} {ms:>10.3f} {peak / 1024:>15.1f} {peak / frame_bytes:>13.2f}")
+            print(f"{'':>6} {'':>6} {'parity':>14} {differing} pixels differ from the old drawing")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Parity and speed check of an exported inference backend against PyTorch.
+
+Exports best.pt if needed, runs both backends over the same images and prints
+box recall/precision, confidence drift and per-image latency as JSON. Exits
+non-zero when parity fails, so it can gate a backend switch.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_backends --backend onnx
+    python -m benchmarks.bench_backends --backend openvino --int8 --calibration-dir calibration/
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+# utils/__init__ imports weapon_info, which refuses to load without a key; no API calls are made here
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+from config import Config
+from utils.detection_utils import load_model
+from utils.inference_backends import BACKENDS, calibration_images, export_model, load_backend_model
+from utils.backend_parity import compare_backends
+from ultralytics.utils import LOGGER
+
+# Keep per-image predict logs out of the JSON report
+LOGGER.setLevel(logging.WARNING)
+logging.disable(logging.INFO)
+
+def load_images(image_dir, limit, size):
+    paths = calibration_images(image_dir, limit)
+    images = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+    if images:
+        return images
+    # Random noise exercises speed and numerics, but real images are needed for a meaningful box parity check
+    print(f"No images found in {image_dir}, using synthetic frames", file=sys.stderr)
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size, size, 3), dtype=np.uint8) for _ in range(limit)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=Config.WEAPON_MODEL_PATH)
+    parser.add_argument('--backend', choices=[b for b in BACKENDS if b != 'torch'], default='onnx')
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--calibration-dir', default=Config.INT8_CALIBRATION_DIR)
+    parser.add_argument('--images', default=None, help='Evaluation images (default: the calibration dir)')
+    parser.add_argument('--limit', type=int, default=32, help='Max evaluation images')
+    parser.add_argument('--imgsz', type=int, default=Config.EXPORT_IMGSZ)
+    parser.add_argument('--conf', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-recall', type=float, default=0.9)
+    parser.add_argument('--force-export', action='store_true')
+    args = parser.parse_args()
+
+    if args.force_export:
+        export_model(args.model, args.backend, args.imgsz, args.int8, args.calibration_dir, force=True)
+    reference = load_model(args.model, backend='torch')
+    candidate = load_backend_model(args.model, args.backend, args.imgsz, args.int8, args.calibration_dir)
+
+    images = load_images(args.images or args.calibration_dir, args.limit, args.imgsz)
+    report = compare_backends(
+        reference, candidate, images,
+        conf_threshold=args.conf,
+        repeat=args.repeat,
+        min_recall=args.min_recall
+    )
+    report.update({'backend': args.backend, 'int8': args.int8})
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['passed'] else 1)
+
+if __name__ == '__main__':
+    main()
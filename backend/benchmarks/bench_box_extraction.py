@@ -0,0 +1,89 @@
+"""Micro-benchmark: per-box tensor conversion vs. columnar extract_boxes().
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_box_extraction --boxes 5 50 300 --repeat 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+# utils/__init__ imports weapon_info, which refuses to load without a key; no API calls are made here
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+from utils.detection_utils import extract_boxes, boxes_to_detections
+
+try:
+    from ultralytics.engine.results import Boxes
+except ImportError:
+    from ultralytics.yolo.engine.results import Boxes
+
+NAMES = {0: 'knife', 1: 'gun'}
+
+class FakeResult:
+    """Just enough of an ultralytics Results object for the extraction code"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def make_result(num_boxes, rng):
+    xy = rng.uniform(0, 1000, size=(num_boxes, 2))
+    wh = rng.uniform(10, 200, size=(num_boxes, 2))
+    data = np.concatenate([
+        xy, xy + wh,
+        rng.uniform(0.3, 1.0, size=(num_boxes, 1)),
+        rng.integers(0, len(NAMES), size=(num_boxes, 1))
+    ], axis=1)
+    return FakeResult(Boxes(torch.tensor(data, dtype=torch.float32), (1080, 1920)))
+
+def per_box_extraction(result):
+    """The original loop: three tensor conversions per box"""
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        confidence = float(box.conf[0].cpu().numpy())
+        class_id = int(box.cls[0].cpu().numpy())
+        detections.append({
+            'class': NAMES[class_id],
+            'confidence': confidence,
+            'bbox': [float(x1), float(y1), float(x2), float(y2)]
+        })
+    return detections
+
+def columnar_extraction(result):
+    return boxes_to_detections(extract_boxes(result), NAMES)
+
+def columnar_only(result):
+    """Columnar arrays without building dicts, as used away from the JSON boundary"""
+    return extract_boxes(result)
+
+def time_it(fn, result, repeat):
+    fn(result)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(result)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boxes', type=int, nargs='+', default=[1, 10, 50, 300])
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} {'per-box us':>12} {'columnar us':>12} {'arrays us':>10} {'speedup':>8}")
+    for num_boxes in args.boxes:
+        result = make_result(num_boxes, rng)
+        assert len(per_box_extraction(result)) == len(columnar_extraction(result)) == num_boxes
+        legacy = time_it(per_box_extraction, result, args.repeat)
+        columnar = time_it(columnar_extraction, result, args.repeat)
+        arrays = time_it(columnar_only, result, args.repeat)
+        print(f"{num_boxes:>6} {legacy:>12.1f} {columnar:>12.1f} {arrays:>10.1f} {legacy / columnar:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark: handing frames to another process by pickling vs. through a FrameRing.
+
+Modes:
+    pickle   - the array itself goes through a multiprocessing.Queue
+    ring     - the frame is copied into a free slot and only its handle is sent
+    handoff  - the frame already lives in a slot (decoded into it), only the handle is sent
+
+The consumer touches a sparse sample of every frame and acknowledges it, so the
+numbers are dominated by the transport rather than by the work done on the frame.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_frame_transport --frames 300 --sizes 720p 1080p 4k
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+# utils/__init__ imports weapon_info, which refuses to load without a key; no API calls are made here
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+logging.disable(logging.INFO)
+
+from utils.frame_ring import FrameRing, SlotHandle
+
+SIZES = {
+    '480p': (480, 640),
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+    '4k': (2160, 3840)
+}
+
+def consumer(ring_spec, inbox, outbox):
+    ring = FrameRing.attach(*ring_spec) if ring_spec else None
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        frame = ring.array(item) if isinstance(item, SlotHandle) else item
+        checksum = int(frame[::64, ::64].sum())
+        del frame
+        outbox.put((item if isinstance(item, SlotHandle) else None, checksum))
+    if ring is not None:
+        ring.close()
+
+def run_mode(mode, shape, num_frames, depth):
+    context = mp.get_context('spawn')
+    ring = FrameRing(depth, int(np.prod(shape))) if mode != 'pickle' else None
+    inbox, outbox = context.Queue(), context.Queue()
+    ring_spec = (ring.name, ring.num_slots, ring.slot_bytes) if ring else None
+    process = context.Process(target=consumer, args=(ring_spec, inbox, outbox), daemon=True)
+    process.start()
+
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 255, size=shape, dtype=np.uint8)
+    prefilled = []
+    if mode == 'handoff':
+        # Frames decoded straight into slots: no copy at send time
+        prefilled = [ring.write(source) for _ in range(depth)]
+
+    def send(i):
+        if mode == 'pickle':
+            inbox.put(source)
+        elif mode == 'ring':
+            inbox.put(ring.write(source))
+        else:
+            inbox.put(prefilled[i % depth])
+
+    def receive():
+        handle, _ = outbox.get()
+        if mode == 'ring':
+            ring.release(handle)
+
+    # Warm up the consumer and queue feeder threads
+    send(0)
+    receive()
+
+    start = time.perf_counter()
+    in_flight = 0
+    for i in range(num_frames):
+        if in_flight >= depth:
+            receive()
+            in_flight -= 1
+        send(i)
+        in_flight += 1
+    while in_flight:
+        receive()
+        in_flight -= 1
+    elapsed = time.perf_counter() - start
+
+    inbox.put(None)
+    process.join()
+    if ring is not None:
+        for handle in prefilled:
+            ring.release(handle)
+        ring.close()
+    return num_frames / elapsed, elapsed / num_frames * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=['720p', '1080p', '4k'])
+    parser.add_argument('--depth', type=int, default=8, help='Frames in flight (and ring slots)')
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'mode':>8} {'fps':>10} {'ms/frame':>10} {'vs pickle':>10}")
+    for size in args.sizes:
+        shape = SIZES[size] + (3,)
+        baseline = None
+        for mode in ('pickle', 'ring', 'handoff'):
+            fps, ms = run_mode(mode, shape, args.frames, args.depth)
+            baseline = baseline or fps
+            print(f"{size:>6} {mode:>8} {fps:>10.1f} {ms:>10.3f} {fps / baseline:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Benchmark suite for the detection hot paths, with a baseline regression check.
+
+Times detect_weapons, draw_detections, process_detection and
+process_video_detection on synthetic images and videos at several
+resolutions and lengths. Each case runs in a fresh process, so its peak RSS is
+its own. Reports throughput (fps), p50/p95/p99 latency and peak RSS, and
+writes everything to JSON.
+
+With --model stub (the default) a stand-in detector replaces the network, so
+the numbers cover the code around it and are stable across machines with the
+same CPU; pass a weights path to include the real forward pass.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_hot_paths --output bench.json
+    python -m benchmarks.bench_hot_paths --baseline bench.json --threshold 0.15
+    python -m benchmarks.bench_hot_paths --model models/best.pt --paths detect_weapons --resolutions 720p
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+# utils/__init__ imports weapon_info, which refuses to load without a key; no API calls are made here
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('WEAPON_INFO_CACHE_PATH', '')
+# A fixed input size: the adaptive controller would otherwise react to the benchmark's own load
+os.environ['ADAPTIVE_RESOLUTION_ENABLED'] = 'False'
+logging.disable(logging.INFO)
+
+import cv2
+import numpy as np
+import psutil
+
+from benchmarks.synthetic import RESOLUTIONS, synthetic_image, write_synthetic_video, load_benchmark_model
+
+PATHS = ('detect_weapons', 'draw_detections', 'process_detection', 'process_video_detection')
+
+def _rss_mb() -> float:
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _time_calls(fn, iterations: int, warmup: int):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_case(case: dict) -> dict:
+    """Set up one case, time it and return its statistics"""
+    from ultralytics.utils import LOGGER
+    LOGGER.setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    previous_cwd = os.getcwd()
+    # process_* write their outputs relative to the working directory
+    os.chdir(workdir)
+    try:
+        return _run_case_in(workdir, case)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _run_case_in(workdir: str, case: dict) -> dict:
+    from utils.detection_utils import (
+        detect_weapons, draw_detections, process_detection, process_video_detection, boxes_to_detections
+    )
+    from benchmarks.synthetic import StubModel
+
+    model = load_benchmark_model(case['model'], case['boxes'])
+    path, resolution = case['path'], case['resolution']
+    frames_per_call = 1
+
+    if path == 'process_video_detection':
+        video_path = write_synthetic_video(os.path.join(workdir, 'input.mp4'), resolution, case['frames'])
+        frames_per_call = case['frames']
+
+        def call():
+            process_video_detection(model, cv2.VideoCapture(video_path))
+    else:
+        image = synthetic_image(resolution)
+        if path == 'detect_weapons':
+            def call():
+                detect_weapons(model, image)
+        elif path == 'process_detection':
+            def call():
+                process_detection(model, image)
+        else:
+            # Boxes from the stand-in, so drawing has the same work whatever the real model finds
+            detections = boxes_to_detections(StubModel(case['boxes']).predict_boxes([image])[0], model.names)
+
+            def call():
+                draw_detections(image, detections)
+
+    setup_rss = _rss_mb()
+    latencies = _time_calls(call, case['iterations'], case['warmup'])
+    total = sum(latencies)
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        'name': case['name'],
+        'path': path,
+        'resolution': resolution,
+        'frames': case.get('frames'),
+        'iterations': case['iterations'],
+        'fps': frames_per_call * len(latencies) / total if total > 0 else None,
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'setup_rss_mb': round(setup_rss, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1)
+    }
+
+def _case_worker(case, results):
+    try:
+        results.put(run_case(case))
+    except Exception as e:
+        results.put({'name': case['name'], 'error': f'{type(e).__name__}: {e}'})
+
+def run_isolated(case: dict) -> dict:
+    """run_case() in a fresh process so earlier cases do not inflate its peak RSS"""
+    context = mp.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_case_worker, args=(case, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1.0)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                result = {'name': case['name'], 'error': f'worker exited with code {process.exitcode}'}
+                break
+    process.join()
+    return result
+
+def build_cases(args) -> list:
+    cases = []
+    base = {'model': args.model, 'boxes': args.boxes, 'warmup': args.warmup}
+    for path in args.paths:
+        if path == 'process_video_detection':
+            for resolution in args.video_resolutions:
+                for frames in args.video_frames:
+                    cases.append(dict(
+                        base, path=path, resolution=resolution, frames=frames,
+                        iterations=args.video_repeat, warmup=min(args.warmup, 1),
+                        name=f'{path}/{resolution}/{frames}f'
+                    ))
+        else:
+            iterations = args.iterations * 10 if path == 'draw_detections' else args.iterations
+            for resolution in args.resolutions:
+                cases.append(dict(base, path=path, resolution=resolution, iterations=iterations, name=f'{path}/{resolution}'))
+    return cases
+
+def environment(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=backend_dir, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'model': args.model,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__
+    }
+
+def compare_to_baseline(results: list, baseline: dict, threshold: float) -> list:
+    """Cases whose fps dropped or whose p95 grew by more than threshold (a fraction)"""
+    previous = {result['name']: result for result in baseline.get('results', []) if 'error' not in result}
+    regressions = []
+    print(f"\n{'case':<42} {'fps':>10} {'base fps':>10} {'change':>8} {'p95 ms':>9} {'base p95':>9} {'change':>8}")
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None or 'error' in result:
+            continue
+        fps_change = result['fps'] / old['fps'] - 1 if old.get('fps') else 0.0
+        p95_change = result['p95_ms'] / old['p95_ms'] - 1 if old.get('p95_ms') else 0.0
+        regressed = fps_change < -threshold or p95_change > threshold
+        print(
+            f"{result['name']:<42} {result['fps']:>10.1f} {old['fps']:>10.1f} {fps_change:>+8.1%} "
+            f"{result['p95_ms']:>9.2f} {old['p95_ms']:>9.2f} {p95_change:>+8.1%}{'  REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(result['name'])
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='stub', help="'stub' or a weights path")
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS))
+    parser.add_argument('--resolutions', nargs='+', choices=sorted(RESOLUTIONS), default=['480p', '720p', '1080p'])
+    parser.add_argument('--video-resolutions', nargs='+', choices=sorted(RESOLUTIONS), default=['480p', '720p'])
+    parser.add_argument('--video-frames', nargs='+', type=int, default=[60, 300], help='Video lengths in frames')
+    parser.add_argument('--iterations', type=int, default=30, help='Timed calls per image case (x10 for drawing)')
+    parser.add_argument('--video-repeat', type=int, default=3, help='Timed runs per video case')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--boxes', type=int, default=3, help='Boxes per frame from the stand-in model')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed fps drop / p95 growth (fraction)')
+    parser.add_argument('--in-process', action='store_true', help='Run cases in this process (faster; peak RSS becomes cumulative)')
+    args = parser.parse_args()
+    if args.model != 'stub':
+        # Cases run from a scratch working directory
+        args.model = os.path.abspath(args.model)
+
+    results = []
+    print(f"{'case':<42} {'fps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>9}")
+    for case in build_cases(args):
+        result = run_case(case) if args.in_process else run_isolated(case)
+        results.append(result)
+        if 'error' in result:
+            print(f"{case['name']:<42} ERROR {result['error']}")
+            continue
+        print(
+            f"{result['name']:<42} {result['fps']:>10.1f} {result['p50_ms']:>9.2f} "
+            f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_rss_mb']:>9.1f}"
+        )
+
+    report = {'environment': environment(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    failed = any('error' in result for result in results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('model') != args.model:
+            print(f"Warning: baseline was recorded with model {baseline.get('environment', {}).get('model')}", file=sys.stderr)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Synthetic inputs and a stand-in detector for the benchmarks.
+
+Everything is generated from a fixed seed, so two runs on the same machine see
+exactly the same pixels and boxes.
+"""
+import os
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    '480p': (480, 640),
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+    '4k': (2160, 3840)
+}
+
+def synthetic_image(resolution: str, seed: int = 0) -> np.ndarray:
+    """Smooth noise with a few solid shapes, so it compresses and decodes like a photo rather than static"""
+    height, width = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+    for _ in range(6):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(width // 20, width // 5)), int(rng.integers(height // 20, height // 5))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+    return image
+
+def write_synthetic_video(path: str, resolution: str, num_frames: int, fps: int = 30, seed: int = 0) -> str:
+    """A static background with a moving block, written with the mp4v codec the app itself uses"""
+    height, width = RESOLUTIONS[resolution]
+    background = synthetic_image(resolution, seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Could not open a video writer for {path}")
+    size = max(8, width // 10)
+    try:
+        for index in range(num_frames):
+            frame = background.copy()
+            x = (index * max(1, width // 100)) % max(1, width - size)
+            cv2.rectangle(frame, (x, height // 3), (x + size, height // 3 + size), (255, 255, 255), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+class StubModel:
+    """Stand-in for the YOLO model: letterboxes each frame to imgsz and returns fixed boxes.
+
+    It is picked up through the predict_boxes() hook of detect_boxes_batch(), so
+    every path around the network (batching, box conversion, drawing, encoding)
+    runs for real while the forward pass costs only a resize. That makes it
+    useful for timing the code we own, not the model.
+    """
+
+    def __init__(self, boxes_per_frame: int = 3, names: Optional[Dict[int, str]] = None):
+        self.boxes_per_frame = boxes_per_frame
+        self.names = names or {0: 'pistol', 1: 'knife', 2: 'rifle'}
+
+    def predict_boxes(self, frames: List[np.ndarray], conf_threshold: float = 0.3, imgsz: Optional[int] = None):
+        # Imported here so this module stays usable before sys.path points at the backend
+        from utils.detection_utils import BoxArrays
+        from utils.inference_backends import letterbox
+
+        results = []
+        for frame in frames:
+            letterbox(frame, imgsz or 640)
+            height, width = frame.shape[:2]
+            count = self.boxes_per_frame
+            # Boxes spread along the diagonal, each a tenth of the frame
+            starts = np.linspace(0.05, 0.75, count, dtype=np.float32) if count else np.zeros(0, np.float32)
+            xyxy = np.stack([
+                starts * width, starts * height, (starts + 0.1) * width, (starts + 0.1) * height
+            ], axis=1).astype(np.float32) if count else np.zeros((0, 4), np.float32)
+            results.append(BoxArrays(
+                xyxy,
+                np.full(count, 0.9, dtype=np.float32),
+                (np.arange(count) % len(self.names)).astype(np.int32)
+            ))
+        return results
+
+def load_benchmark_model(model: str, boxes_per_frame: int = 3):
+    """'stub' for the StubModel, otherwise a weights path for the real detector"""
+    if model == 'stub':
+        return StubModel(boxes_per_frame)
+    from utils.detection_utils import load_model
+    if not os.path.exists(model):
+        raise FileNotFoundError(f"Model file not found: {model}")
+    return load_model(model)
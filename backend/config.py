@@ -8,18 +8,166 @@ class Config:
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     PROCESSED_VIDEOS_FOLDER = os.path.join(BASE_DIR, 'processed_videos')
     PROCESSED_IMAGES_DIR = os.path.join(BASE_DIR, 'processed_images')
+    SOURCE_VIDEOS_FOLDER = os.path.join(BASE_DIR, 'source_videos')  # Untouched uploads and their detection sidecars
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'avi', 'mov'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
     # Model settings
     WEAPON_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'best.pt')
+    WEAPON_MODEL_NAME = 'weapon'
+    WEAPON_MODEL_VERSION = os.environ.get('WEAPON_MODEL_VERSION', 'v1')
+    
+    # Models known to the shared registry: name -> {version: path}
+    MODELS = {
+        WEAPON_MODEL_NAME: {
+            'v1': WEAPON_MODEL_PATH
+        }
+    }
+    MODEL_WARMUP = True  # Run a dummy inference right after loading
+    MODEL_WARMUP_SIZE = 640
+    
+    # Inference runtime: 'torch', 'onnx' (onnxruntime) or 'openvino'.
+    # Non-torch backends export best.pt next to it on first load and reuse the export afterwards.
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch').lower()
+    EXPORT_IMGSZ = 640  # Export and INT8 calibration input size (exports keep dynamic shapes)
+    # INT8 post-training quantization, calibrated on images in INT8_CALIBRATION_DIR
+    INFERENCE_INT8 = os.environ.get('INFERENCE_INT8', 'False').lower() == 'true'
+    INT8_CALIBRATION_DIR = os.environ.get('INT8_CALIBRATION_DIR', os.path.join(BASE_DIR, 'calibration'))
+    INT8_CALIBRATION_MAX_IMAGES = 300
+    
+    # Inference settings
+    # Frames per forward pass. The video route buffers decoded frames until a batch is
+    # full, but never more than VIDEO_PIPELINE_QUEUE_SIZE of them; sparse sampling then
+    # runs a smaller batch.
+    INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 4))
+    BATCH_MAX_IMAGES = 256  # Max images accepted by /api/image/detect-batch
+    BATCH_MAX_UNCOMPRESSED_BYTES = int(os.environ.get('BATCH_MAX_UNCOMPRESSED_BYTES', 256 * 1024 * 1024))  # Total inflated size of zipped batch members
+    BATCH_DECODE_WORKERS = os.cpu_count() or 4  # Threads decoding batch uploads
+    VIDEO_SAMPLE_INTERVAL = 30  # Run detection on every Nth frame in the video route
+    # In sparse mode, seek instead of grab() when the sample interval is at least
+    # this many frames (0 disables seeking)
+    SPARSE_SEEK_MIN_INTERVAL = int(os.environ.get('SPARSE_SEEK_MIN_INTERVAL', 120))
+    
+    # Coalesce concurrent inference calls from request threads into one forward pass.
+    # A longer window or larger batch trades per-request latency for throughput.
+    INFERENCE_SCHEDULER_ENABLED = os.environ.get('INFERENCE_SCHEDULER_ENABLED', 'True').lower() == 'true'
+    INFERENCE_BATCH_WINDOW_MS = float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', 5))  # Max wait for more requests
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 8))  # Max frames per coalesced pass
+    
+    # Run inference in separate worker processes, each with its own model copy,
+    # so the GIL and a single torch thread pool do not cap throughput
+    INFERENCE_POOL_ENABLED = os.environ.get('INFERENCE_POOL_ENABLED', 'False').lower() == 'true'
+    INFERENCE_POOL_WORKERS = int(os.environ.get('INFERENCE_POOL_WORKERS', 0))  # 0: physical cores / threads per worker
+    INFERENCE_POOL_THREADS_PER_WORKER = int(os.environ.get('INFERENCE_POOL_THREADS_PER_WORKER', 2))  # torch/OMP threads
+    INFERENCE_POOL_PIN_CPUS = True  # Give each worker a disjoint set of CPUs (Linux only)
+    INFERENCE_POOL_START_TIMEOUT = 120  # Seconds to wait for the workers to load their models
+    # Shared memory frame slots used to hand frames to the workers without pickling.
+    # Memory is slots * slot bytes of /dev/shm; 0 slots sends every task through its own segment.
+    FRAME_RING_SLOTS = int(os.environ.get('FRAME_RING_SLOTS', 16))
+    FRAME_RING_SLOT_BYTES = int(os.environ.get('FRAME_RING_SLOT_BYTES', 1920 * 1080 * 3))  # One 1080p BGR frame
+    
+    # Tiled inference for large stills: overlapping native-resolution tiles merged with NMS
+    TILED_INFERENCE_ENABLED = os.environ.get('TILED_INFERENCE_ENABLED', 'True').lower() == 'true'
+    TILED_INFERENCE_MIN_SIDE = int(os.environ.get('TILED_INFERENCE_MIN_SIDE', 2000))  # Longest side in pixels
+    TILE_SIZE = int(os.environ.get('TILE_SIZE', 640))
+    TILE_OVERLAP = int(os.environ.get('TILE_OVERLAP', 128))  # Pixels shared by neighbouring tiles
+    TILE_NMS_THRESHOLD = 0.5
+    TILE_NMS_METRIC = 'ios'  # 'ios' also merges boxes cut by tile borders; 'iou' is plain NMS
+    TILE_INCLUDE_FULL_IMAGE = True  # Add a downscaled whole-image pass for objects larger than a tile
+
+    # Adaptive inference size: step down the ladder when per-frame latency (a call's latency,
+    # queueing included, over its frames) threatens the target, and back up when load eases.
+    # Sizes must be multiples of 32.
+    ADAPTIVE_RESOLUTION_ENABLED = os.environ.get('ADAPTIVE_RESOLUTION_ENABLED', 'True').lower() == 'true'
+    INFERENCE_LATENCY_TARGET_MS = float(os.environ.get('INFERENCE_LATENCY_TARGET_MS', 1000))  # p95 per frame
+    IMGSZ_LADDER = [int(size) for size in os.environ.get('IMGSZ_LADDER', '640,512,416,320').split(',')]
+    ADAPTIVE_RESOLUTION_WINDOW = 32  # Recent per-frame samples the p95 is taken over
+    ADAPTIVE_RESOLUTION_QUEUE_LIMIT = 8  # Queued requests that force a step down regardless of latency
+    ADAPTIVE_RESOLUTION_MIN_INTERVAL = 2.0  # Min seconds between two steps
+
+    # Run decode, inference, annotation and encoding as overlapping stages
+    VIDEO_PIPELINE_ENABLED = os.environ.get('VIDEO_PIPELINE_ENABLED', 'True').lower() == 'true'
+    VIDEO_PIPELINE_QUEUE_SIZE = 32  # Max frames buffered between two stages
+    
+    # Default video output: 'full' burns boxes into a re-encoded copy, 'metadata' keeps the
+    # source untouched and writes detections as NDJSON/WebVTT sidecars for a client-side overlay
+    # (burn-in stays available as an export job), 'sparse' returns sampled detections only
+    VIDEO_OUTPUT_MODE = os.environ.get('VIDEO_OUTPUT_MODE', 'full').lower()
+    VIDEO_CACHE_MAX_AGE = 3600  # Cache-Control max-age in seconds for source videos
+    
+    # Track boxes across frames the detector skips in the video route
+    VIDEO_TRACKING_ENABLED = os.environ.get('VIDEO_TRACKING_ENABLED', 'True').lower() == 'true'
+    TRACKER_IOU_THRESHOLD = 0.3  # Min IoU to match a detection to an existing track
+    TRACKER_MAX_AGE = 45  # Frames a track survives without a matching detection
+    TRACKER_MAX_MISSES = 2  # Detector runs a track may go unmatched before it is dropped
+    TRACKER_DRIFT_THRESHOLD = 0.25  # Re-detect once a predicted centre moved this fraction of its box size since the last detection
+    
+    # Skip inference on frames with no motion or scene change (static cameras)
+    MOTION_GATE_ENABLED = os.environ.get('MOTION_GATE_ENABLED', 'False').lower() == 'true'
+    MOTION_GATE_THRESHOLD = 0.005  # Min fraction of changed pixels that counts as motion
+    MOTION_GATE_PIXEL_THRESHOLD = 25  # Min grayscale difference for a pixel to count as changed
+    MOTION_GATE_SCENE_CHANGE_THRESHOLD = 0.4  # 1 - histogram correlation that counts as a cut
+    MOTION_GATE_DOWNSCALE_WIDTH = 160
+    MOTION_GATE_MAX_SKIP = 300  # Always run inference after this many gated frames
+    
+    # Live stream ingestion (RTSP/RTMP/HTTP URLs, capture devices, looped test files)
+    LIVE_STREAM_MAX_STREAMS = int(os.environ.get('LIVE_STREAM_MAX_STREAMS', 8))
+    LIVE_STREAM_FILES_FOLDER = os.environ.get('LIVE_STREAM_FILES_FOLDER', os.path.join(BASE_DIR, 'stream_files'))  # Looped file sources
+    # Only files are accepted by default, since the API is unauthenticated and would otherwise open any
+    # URL or local camera it is given. Hosts (or host:port) stream URLs may point at, comma separated
+    # ('*' allows any host); only list hosts you trust, as FFmpeg follows HTTP redirects
+    LIVE_STREAM_ALLOWED_HOSTS = [
+        host.strip().lower() for host in os.environ.get('LIVE_STREAM_ALLOWED_HOSTS', '').split(',') if host.strip()
+    ]
+    LIVE_STREAM_ALLOW_DEVICES = os.environ.get('LIVE_STREAM_ALLOW_DEVICES', 'False').lower() == 'true'  # Local capture devices
+    LIVE_STREAM_TIMEOUT = 10.0  # Seconds to wait when opening or reading a network source
+    LIVE_STREAM_RECONNECT_DELAY = 2.0  # Seconds between reconnect attempts
+    LIVE_STREAM_MAX_RECONNECTS = 5  # Consecutive failed reconnects before a stream is marked failed
+    LIVE_STREAM_LATENCY_WINDOW = 120  # Recent frames the reported latency percentiles cover
+    LIVE_STREAM_FPS_WINDOW = 5.0  # Seconds the reported achieved FPS is averaged over
+    
+    # Fair scheduling of live streams: one inference budget shared by max-min fair allocation.
+    # Each stream gets its min FPS first; the rest is split by weight, capped at its target FPS.
+    LIVE_INFERENCE_BUDGET_FPS = float(os.environ.get('LIVE_INFERENCE_BUDGET_FPS', 0))  # 0: measured detector throughput
+    LIVE_SCHEDULER_MAX_BATCH = INFERENCE_MAX_BATCH_SIZE  # Streams analyzed per forward pass
+    LIVE_STREAM_TARGET_FPS = float(os.environ.get('LIVE_STREAM_TARGET_FPS', 5))  # Default per-stream analysis rate
+    LIVE_STREAM_MIN_FPS = float(os.environ.get('LIVE_STREAM_MIN_FPS', 1))
+    LIVE_STREAM_WEIGHT = 1.0
+    LIVE_STREAM_BOOST_FACTOR = 2.0  # Weight and target multiplier after a detection
+    LIVE_STREAM_BOOST_SECONDS = 10.0  # How long a detection keeps a stream boosted
+    
+    # Gemini weapon info / risk assessment cache
+    WEAPON_INFO_CACHE_SIZE = 512  # Max cached responses
+    WEAPON_INFO_CACHE_TTL = int(os.environ.get('WEAPON_INFO_CACHE_TTL', 7 * 24 * 3600))  # Seconds
+    # SQLite file that keeps the cache across restarts; set to '' to keep it in memory only
+    WEAPON_INFO_CACHE_PATH = os.environ.get('WEAPON_INFO_CACHE_PATH', os.path.join(BASE_DIR, 'cache', 'weapon_info.sqlite3')) or None
+    RISK_CONFIDENCE_BUCKET = 0.1  # Risk assessments are cached per confidence bucket of this width
+    GEMINI_RATE_LIMIT_TIMEOUT = 120  # Max seconds a background job waits for a Gemini slot
+    
+    # 'sync': enrich image detections inline (fallback data when over quota)
+    # 'async': respond with cached/fallback data and push Gemini results later
+    IMAGE_ENRICHMENT_MODE = os.environ.get('IMAGE_ENRICHMENT_MODE', 'sync')
+    ANALYSIS_JOB_WORKERS = 1  # Gemini is rate limited, so more workers only queue on the limiter
+    ANALYSIS_JOB_QUEUE_SIZE = 64
+    ANALYSIS_JOB_RETENTION_SECONDS = 600
+    
+    # Image detection settings
+    IMAGE_CONF_THRESHOLD = 0.3
+    # Byte budget for cached detections of repeated uploads (keyed by content hash, model version and threshold)
+    IMAGE_RESULT_CACHE_BYTES = int(os.environ.get('IMAGE_RESULT_CACHE_BYTES', 32 * 1024 * 1024))
+    
+    # Background video job settings
+    VIDEO_JOB_WORKERS = int(os.environ.get('VIDEO_JOB_WORKERS', 2))
+    VIDEO_JOB_QUEUE_SIZE = int(os.environ.get('VIDEO_JOB_QUEUE_SIZE', 16))  # Max queued jobs
+    VIDEO_JOB_RETENTION_SECONDS = 3600  # Keep finished job results for an hour
+    VIDEO_JOB_PROGRESS_INTERVAL = 1.0  # Min seconds between Socket.IO progress events
     
     # Create necessary directories
     @classmethod
     def create_directories(cls):
         """Create all necessary directories with proper permissions"""
         try:
-            for folder in [cls.UPLOAD_FOLDER, cls.PROCESSED_VIDEOS_FOLDER, cls.PROCESSED_IMAGES_DIR]:
+            for folder in [cls.UPLOAD_FOLDER, cls.PROCESSED_VIDEOS_FOLDER, cls.PROCESSED_IMAGES_DIR, cls.SOURCE_VIDEOS_FOLDER]:
                 if not os.path.exists(folder):
                     os.makedirs(folder)
                     print(f"Created directory: {folder}")
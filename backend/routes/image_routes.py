@@ -1,16 +1,25 @@
-from flask import Blueprint, request, jsonify, current_app, send_file, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, send_file, send_from_directory, Response, stream_with_context
 from flask_socketio import emit
 import os
 from werkzeug.utils import secure_filename
-from utils.detection_utils import process_detection, load_model, detect_weapons, draw_detections
+from utils.detection_utils import process_detection, detect_weapons, detect_weapons_batch, draw_detections, should_tile
+from utils.model_registry import model_registry
+from utils.inference_scheduler import get_weapon_detector
+from utils.video_jobs import analysis_job_queue, JobQueueFull
 from utils.weapon_info import WeaponInfo
+from utils.result_cache import image_result_cache, content_key
+from utils.adaptive_resolution import resolution_controller
+from utils.metrics import time_stage
 import logging
 import time
-import psutil
 import cv2
 import numpy as np
 from config import Config
 import json
+import io
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,9 +28,6 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 image_bp = Blueprint('image', __name__)
 
-# Load the weapon detection model
-weapon_model = load_model(Config.WEAPON_MODEL_PATH)
-
 # Initialize weapon info
 weapon_info = WeaponInfo()
 
@@ -29,16 +35,213 @@ def allowed_file(filename):
     """Check if the file type is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}
 
-def get_system_info():
-    """Get system information for logging."""
-    cpu_percent = psutil.cpu_percent()
-    memory = psutil.virtual_memory()
+def build_analysis_result(detection, weapon_data, risk_data):
+    """Combine a detection with its weapon info and risk assessment"""
     return {
-        'cpu_percent': cpu_percent,
-        'memory_percent': memory.percent,
-        'memory_available': memory.available / (1024 * 1024)  # MB
+        'class': detection['class'],
+        'confidence': float(detection['confidence']),
+        'bbox': {
+            'x': int(detection['bbox'][0]),
+            'y': int(detection['bbox'][1]),
+            'width': int(detection['bbox'][2]),
+            'height': int(detection['bbox'][3])
+        },
+        'weapon_info': {
+            'description': weapon_data.get('description', ''),
+            'specifications': weapon_data.get('specifications', {}),
+            'risk_assessment': risk_data.get('threat_analysis', ''),
+            'recommended_actions': risk_data.get('recommended_actions', [])
+        }
     }
 
+def analyze_detections(detections, remote=True, wait=False, progress=None):
+    """Look up weapon info and risk for each detection.
+
+    remote=False uses only cached or fallback data; wait=True blocks for a
+    Gemini rate-limit slot instead of falling back.
+    """
+    analysis_results = []
+    for index, detection in enumerate(detections):
+        try:
+            # Get weapon information
+            weapon_data = weapon_info.get_weapon_info(detection['class'], remote=remote, wait=wait)
+            
+            # Get risk assessment
+            risk_data = weapon_info.get_risk_assessment(
+                detection['class'], detection['confidence'], remote=remote, wait=wait
+            )
+            
+            # Log the analysis
+            logger.info(f"Analysis for {detection['class']}:")
+            logger.info(f"Description: {weapon_data.get('description', 'N/A')}")
+            logger.info(f"Risk Level: {risk_data.get('risk_level', 'N/A')}")
+            
+            analysis_results.append(build_analysis_result(detection, weapon_data, risk_data))
+        except Exception as e:
+            logger.error(f"Error analyzing detection: {str(e)}")
+        if progress:
+            progress(index + 1, len(detections), len(analysis_results))
+    return analysis_results
+
+def save_processed_image(image, detections, suffix=''):
+    """Draw detections on the image, write it to the processed folder and return its filename.
+
+    The image is annotated in place; callers do not use it afterwards.
+    """
+    processed_image = draw_detections(image, detections, out=image)
+    
+    timestamp = int(time.time())
+    processed_filename = f'processed_{timestamp}{suffix}.jpg'
+    processed_path = os.path.join(Config.PROCESSED_IMAGES_DIR, processed_filename)
+    
+    # Ensure the directory exists
+    os.makedirs(Config.PROCESSED_IMAGES_DIR, exist_ok=True)
+    
+    with time_stage('encode'):
+        cv2.imwrite(processed_path, processed_image)
+    logger.info(f"Saved processed image to: {processed_path}")
+    return processed_filename
+
+def enrich_detections(detections, enrich_mode):
+    """Return (analysis, analysis_request_id) for the detections.
+
+    In async mode the analysis carries cached or fallback data and the Gemini
+    analysis follows over Socket.IO under analysis_request_id.
+    """
+    if enrich_mode == 'async' and detections:
+        analysis_results = analyze_detections(detections, remote=False)
+        try:
+            return analysis_results, analysis_job_queue.submit(analyze_detections, detections, remote=True, wait=True)
+        except JobQueueFull as e:
+            logger.warning(f"Skipping background enrichment: {str(e)}")
+            return analysis_results, None
+    return analyze_detections(detections), None
+
+def result_cache_key(data):
+    return content_key(data, model_registry.resolve_version(Config.WEAPON_MODEL_NAME, Config.WEAPON_MODEL_VERSION), Config.IMAGE_CONF_THRESHOLD)
+
+def get_cached_result(cache_key, imgsz):
+    """Return cached detections for an upload, provided its processed image has not been cleaned up.
+
+    Results from a lower resolution than imgsz (taken under load) are recomputed.
+    """
+    cached = image_result_cache.get(cache_key)
+    if cached is None or cached['imgsz'] < imgsz:
+        return None
+    if not os.path.exists(os.path.join(Config.PROCESSED_IMAGES_DIR, cached['processed_filename'])):
+        image_result_cache.invalidate(cache_key)
+        return None
+    return cached
+
+def cache_result(cache_key, detections, processed_filename, imgsz):
+    # Analysis is not stored: it is cheap to rebuild from the Gemini cache and may have been fallback data
+    image_result_cache.set(cache_key, {'detections': detections, 'processed_filename': processed_filename, 'imgsz': imgsz})
+
+def inference_size(image, imgsz):
+    """Model input size a still is detected at: the tile size when it is tiled"""
+    return Config.TILE_SIZE if should_tile(image) else imgsz
+
+def build_image_response(detections, analysis_results, processed_filename, imgsz, analysis_request_id=None, cached=False):
+    response = {
+        'success': True,
+        'detections': len(detections),
+        'analysis': analysis_results,
+        'processed_image_url': f'/api/image/processed/{processed_filename}',
+        'imgsz': imgsz,
+        'cached': cached
+    }
+    if analysis_request_id:
+        response['analysis_status'] = 'pending'
+        response['analysis_request_id'] = analysis_request_id
+        response['analysis_url'] = f'/api/image/analysis/{analysis_request_id}'
+    return response
+
+def read_batch_uploads():
+    """Collect (filename, bytes) pairs from 'files'/'file' parts and any zip archives among them"""
+    uploads = []
+    # Shared by every archive in the request; checked against declared sizes before anything is inflated
+    uncompressed_budget = Config.BATCH_MAX_UNCOMPRESSED_BYTES
+    for file in request.files.getlist('files') + request.files.getlist('file'):
+        if not file or file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(file.read())) as archive:
+                members = [m for m in archive.infolist() if not m.is_dir() and allowed_file(m.filename)]
+                if len(uploads) + len(members) > Config.BATCH_MAX_IMAGES:
+                    raise ValueError(f"Too many images in batch (max {Config.BATCH_MAX_IMAGES})")
+                for member in members:
+                    if member.file_size > Config.MAX_CONTENT_LENGTH:
+                        raise ValueError(f"Archive member too large: {member.filename}")
+                uncompressed_budget -= sum(member.file_size for member in members)
+                if uncompressed_budget < 0:
+                    raise ValueError(f"Archive contents too large (max {Config.BATCH_MAX_UNCOMPRESSED_BYTES} bytes uncompressed)")
+                # ZipFile.read stops at the declared file_size, so the budget bounds what is inflated
+                uploads.extend((os.path.basename(member.filename), archive.read(member)) for member in members)
+            continue
+        if len(uploads) >= Config.BATCH_MAX_IMAGES:
+            raise ValueError(f"Too many images in batch (max {Config.BATCH_MAX_IMAGES})")
+        if allowed_file(file.filename):
+            uploads.append((file.filename, file.read()))
+        else:
+            uploads.append((file.filename, None))
+    return uploads
+
+def decode_image(data):
+    if data is None:
+        return None
+    with time_stage('decode'):
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+def iter_batch_results(uploads, enrich_mode):
+    """Decode, detect and annotate uploads chunk by chunk, yielding one result per image in order"""
+    model = get_weapon_detector()
+    chunk_size = Config.INFERENCE_BATCH_SIZE
+    chunks = [list(enumerate(uploads))[i:i + chunk_size] for i in range(0, len(uploads), chunk_size)]
+    with ThreadPoolExecutor(max_workers=Config.BATCH_DECODE_WORKERS) as pool:
+        def start_chunk(chunk):
+            # Cache hits are neither decoded nor inferred
+            entries = []
+            for index, (filename, data) in chunk:
+                cache_key = result_cache_key(data) if data is not None else None
+                cached = get_cached_result(cache_key, resolution_controller.current()) if cache_key else None
+                future = pool.submit(decode_image, data) if cached is None else None
+                entries.append((index, filename, cache_key, cached, future))
+            return entries
+        
+        # cv2.imdecode releases the GIL, so the next chunk decodes while this one is inferred
+        pending = start_chunk(chunks[0])
+        for chunk_index in range(len(chunks)):
+            entries = pending
+            images = [future.result() if future else None for *_, future in entries]
+            if chunk_index + 1 < len(chunks):
+                pending = start_chunk(chunks[chunk_index + 1])
+            
+            # Large stills are tiled, the rest share one forward pass
+            imgsz = resolution_controller.current()
+            batch_detections = iter(detect_weapons_batch(
+                model, [image for image in images if image is not None],
+                conf_threshold=Config.IMAGE_CONF_THRESHOLD, imgsz=imgsz, tiled=None
+            ))
+            for (index, filename, cache_key, cached, _), image in zip(entries, images):
+                if cached is not None:
+                    detections = cached['detections']
+                    processed_filename = cached['processed_filename']
+                    used_imgsz = cached['imgsz']
+                elif image is None:
+                    yield {'index': index, 'filename': filename, 'success': False, 'error': 'Failed to read image'}
+                    continue
+                else:
+                    detections = next(batch_detections)
+                    used_imgsz = inference_size(image, imgsz)
+                    processed_filename = save_processed_image(image, detections, suffix=f'_{uuid.uuid4().hex[:8]}')
+                    cache_result(cache_key, detections, processed_filename, used_imgsz)
+                analysis_results, analysis_request_id = enrich_detections(detections, enrich_mode)
+                result = build_image_response(
+                    detections, analysis_results, processed_filename, used_imgsz, analysis_request_id, cached=cached is not None
+                )
+                result.update({'index': index, 'filename': filename})
+                yield result
+
 @image_bp.route('/detect', methods=['POST'])
 def detect_weapons_in_image():
     try:
@@ -52,70 +255,43 @@ def detect_weapons_in_image():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'error': 'Invalid file type'}), 400
 
-        # Read the image
-        nparr = np.frombuffer(file.read(), np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if image is None:
-            return jsonify({'success': False, 'error': 'Failed to read image'}), 400
-
-        # Detect weapons
-        detections = detect_weapons(model=weapon_model, frame=image)
-        logger.info(f"Detected {len(detections)} weapons in image")
-        
-        # Log each detection
-        for detection in detections:
-            logger.info(f"Detected weapon: {detection['class']} with confidence: {detection['confidence']:.2f}")
+        with time_stage('upload_parse'):
+            data = file.read()
+        cache_key = result_cache_key(data)
+        # Input size for this request, lowered by the adaptive controller under load
+        imgsz = resolution_controller.current()
+        cached = get_cached_result(cache_key, imgsz)
+        if cached is not None:
+            # Identical upload seen before: skip decoding, inference and annotation
+            detections = cached['detections']
+            processed_filename = cached['processed_filename']
+            imgsz = cached['imgsz']
+            logger.info(f"Result cache hit: {len(detections)} weapons, image {processed_filename}")
+        else:
+            # Read the image
+            image = decode_image(data)
+            if image is None:
+                return jsonify({'success': False, 'error': 'Failed to read image'}), 400
 
-        # Draw detections on the image
-        processed_image = draw_detections(image.copy(), detections)
+            # Detect weapons
+            detections = detect_weapons(
+                model=get_weapon_detector(), frame=image, conf_threshold=Config.IMAGE_CONF_THRESHOLD, imgsz=imgsz
+            )
+            imgsz = inference_size(image, imgsz)
+            logger.info(f"Detected {len(detections)} weapons in image")
+            
+            # Log each detection
+            for detection in detections:
+                logger.info(f"Detected weapon: {detection['class']} with confidence: {detection['confidence']:.2f}")
 
-        # Save the processed image
-        timestamp = int(time.time())
-        processed_filename = f'processed_{timestamp}.jpg'
-        processed_path = os.path.join(Config.PROCESSED_IMAGES_DIR, processed_filename)
-        
-        # Ensure the directory exists
-        os.makedirs(Config.PROCESSED_IMAGES_DIR, exist_ok=True)
-        
-        cv2.imwrite(processed_path, processed_image)
-        logger.info(f"Saved processed image to: {processed_path}")
+            # Draw detections and save the processed image
+            # Unique name, since a cached result keeps pointing at this file
+            processed_filename = save_processed_image(image, detections, suffix=f'_{uuid.uuid4().hex[:8]}')
+            cache_result(cache_key, detections, processed_filename, imgsz)
 
         # Analyze each detection
-        analysis_results = []
-        for detection in detections:
-            try:
-                # Get weapon information
-                weapon_data = weapon_info.get_weapon_info(detection['class'])
-                
-                # Get risk assessment
-                risk_data = weapon_info.get_risk_assessment(detection['class'], detection['confidence'])
-                
-                # Log the analysis
-                logger.info(f"Analysis for {detection['class']}:")
-                logger.info(f"Description: {weapon_data.get('description', 'N/A')}")
-                logger.info(f"Risk Level: {risk_data.get('risk_level', 'N/A')}")
-                
-                # Combine the data
-                analysis_result = {
-                    'class': detection['class'],
-                    'confidence': float(detection['confidence']),
-                    'bbox': {
-                        'x': int(detection['bbox'][0]),
-                        'y': int(detection['bbox'][1]),
-                        'width': int(detection['bbox'][2]),
-                        'height': int(detection['bbox'][3])
-                    },
-                    'weapon_info': {
-                        'description': weapon_data.get('description', ''),
-                        'specifications': weapon_data.get('specifications', {}),
-                        'risk_assessment': risk_data.get('threat_analysis', ''),
-                        'recommended_actions': risk_data.get('recommended_actions', [])
-                    }
-                }
-                analysis_results.append(analysis_result)
-            except Exception as e:
-                logger.error(f"Error analyzing detection: {str(e)}")
-                continue
+        enrich_mode = request.args.get('enrich', Config.IMAGE_ENRICHMENT_MODE).lower()
+        analysis_results, analysis_request_id = enrich_detections(detections, enrich_mode)
 
         # Remove the original uploaded file if it exists
         try:
@@ -125,17 +301,62 @@ def detect_weapons_in_image():
         except Exception as e:
             logger.warning(f"Could not remove uploaded file: {str(e)}")
 
+        return jsonify(build_image_response(
+            detections, analysis_results, processed_filename, imgsz, analysis_request_id, cached=cached is not None
+        ))
+
+    except Exception as e:
+        logger.error(f"Error processing image: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@image_bp.route('/detect-batch', methods=['POST'])
+def detect_weapons_in_batch():
+    """Detect weapons in many images (multipart 'files' and/or zip archives) in one request.
+
+    Pass ?stream=ndjson to receive one JSON line per image as soon as it is done.
+    """
+    try:
+        with time_stage('upload_parse'):
+            uploads = read_batch_uploads()
+        if not uploads:
+            return jsonify({'success': False, 'error': 'No images in request'}), 400
+        
+        enrich_mode = request.args.get('enrich', Config.IMAGE_ENRICHMENT_MODE).lower()
+        
+        if request.args.get('stream', '').lower() == 'ndjson':
+            def generate():
+                for result in iter_batch_results(uploads, enrich_mode):
+                    yield json.dumps(result) + '\n'
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        results = list(iter_batch_results(uploads, enrich_mode))
         return jsonify({
             'success': True,
-            'detections': len(detections),
-            'analysis': analysis_results,
-            'processed_image_url': f'/api/image/processed/{processed_filename}'
+            'images': len(results),
+            'detections': sum(result.get('detections', 0) for result in results),
+            'results': results
         })
-
+        
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
+        logger.error(f"Error processing image batch: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@image_bp.route('/analysis/<request_id>', methods=['GET'])
+def get_image_analysis(request_id):
+    """Return the Gemini-enriched analysis for an async detection request"""
+    job = analysis_job_queue.get(request_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Analysis request not found'}), 404
+    return jsonify({
+        'success': job['status'] != 'failed',
+        'request_id': request_id,
+        'status': job['status'],
+        'analysis': job['result'],
+        'error': job['error']
+    })
+
 @image_bp.route('/processed/<filename>')
 def serve_processed_image(filename):
     """Serve processed images."""
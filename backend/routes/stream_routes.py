@@ -0,0 +1,86 @@
+from flask import Blueprint, request, jsonify
+from utils.live_streams import live_streams, LiveStreamLimit, SourceNotAllowed
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+stream_bp = Blueprint('streams', __name__)
+
+BUDGET_FIELDS = ('target_fps', 'min_fps', 'weight', 'boost_factor', 'boost_seconds')
+
+def budget_settings(data):
+    """StreamBudget settings present in a request body"""
+    return {field: float(data[field]) for field in BUDGET_FIELDS if data.get(field) is not None}
+
+@stream_bp.route('', methods=['POST'])
+def start_stream():
+    """Start analyzing a live source and return its ID and Socket.IO room.
+
+    JSON body: {"source": <device index | rtsp/rtmp/http URL | file in LIVE_STREAM_FILES_FOLDER>, "name": optional}
+    plus optional target_fps, min_fps, weight, boost_factor and boost_seconds
+    for the stream's share of the inference budget. Devices and URLs are
+    refused with 403 unless LIVE_STREAM_ALLOW_DEVICES / LIVE_STREAM_ALLOWED_HOSTS allow them.
+    Join the room with the 'subscribe_live_stream' event to receive
+    'live_stream_detections' and 'live_stream_status' events.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'source' not in data:
+            return jsonify({'error': 'No source given'}), 400
+        
+        try:
+            stream = live_streams.start(data['source'], data.get('name'), **budget_settings(data))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except SourceNotAllowed as e:
+            return jsonify({'error': str(e)}), 403
+        except IOError as e:
+            return jsonify({'error': str(e)}), 502
+        except LiveStreamLimit as e:
+            return jsonify({'error': str(e)}), 503
+        
+        return jsonify(dict(stream.stats(), success=True, status_url=f'/api/streams/{stream.id}')), 201
+        
+    except Exception as e:
+        logger.error(f"Error starting live stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@stream_bp.route('', methods=['GET'])
+def list_streams():
+    """Status, throughput and latency of every live stream"""
+    return jsonify({'success': True, 'streams': live_streams.list()})
+
+@stream_bp.route('/<stream_id>', methods=['GET'])
+def get_stream(stream_id):
+    stream = live_streams.get(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Stream not found'}), 404
+    return jsonify(dict(stream.stats(), success=True))
+
+@stream_bp.route('/<stream_id>', methods=['PATCH'])
+def update_stream(stream_id):
+    """Change a running stream's target_fps, min_fps, weight, boost_factor or boost_seconds"""
+    try:
+        stream = live_streams.get(stream_id)
+        if stream is None:
+            return jsonify({'error': 'Stream not found'}), 404
+        
+        try:
+            stream.budget.update(**budget_settings(request.get_json(silent=True) or {}))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(dict(stream.stats(), success=True))
+        
+    except Exception as e:
+        logger.error(f"Error updating live stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@stream_bp.route('/<stream_id>', methods=['DELETE'])
+def stop_stream(stream_id):
+    if not live_streams.stop(stream_id):
+        return jsonify({'error': 'Stream not found'}), 404
+    return jsonify({'success': True, 'stream_id': stream_id, 'status': 'stopped'})
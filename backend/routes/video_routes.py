@@ -1,17 +1,25 @@
 from flask import Blueprint, request, jsonify, current_app, send_file, Response, send_from_directory
 import os
 from werkzeug.utils import secure_filename
-from utils.detection_utils import load_model, detect_weapons, draw_detections
+from utils.detection_utils import detect_weapons, detect_weapons_batch, detect_video_sparse, draw_detections, passes_motion_gate
+from utils.inference_scheduler import get_weapon_detector
+from utils.video_jobs import video_job_queue, JobQueueFull
+from utils.video_pipeline import VideoPipeline
+from utils.tracker import IoUTracker
+from utils.motion_gate import create_motion_gate
 from utils.weapon_info import WeaponInfo
+from utils.adaptive_resolution import resolution_controller, ResolutionUsage
+from utils.metrics import time_stage, frames_skipped
+from utils.video_sidecar import DetectionSidecar
 from config import Config
 import logging
 import time
-import psutil
 import cv2
 import re
 from flask_socketio import emit
 import numpy as np
 import shutil
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,8 +31,11 @@ video_bp = Blueprint('video', __name__)
 # Create necessary directories
 Config.create_directories()
 
-# Load the weapon detection model
-weapon_model = load_model(Config.WEAPON_MODEL_PATH)
+VIDEO_MIMETYPES = {
+    'mp4': 'video/mp4',
+    'mov': 'video/quicktime',
+    'avi': 'video/x-msvideo'
+}
 
 def ensure_directory_exists(directory):
     """Ensure directory exists and has write permissions"""
@@ -44,36 +55,10 @@ def allowed_file(filename):
     """Check if the file type is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'mp4', 'avi', 'mov'}
 
-def get_system_info():
-    """Get system information for logging"""
-    try:
-        cpu_percent = psutil.cpu_percent()
-        memory = psutil.virtual_memory()
-        return {
-            'cpu_percent': cpu_percent,
-            'memory_percent': memory.percent,
-            'memory_available': memory.available / (1024 * 1024)  # Convert to MB
-        }
-    except Exception as e:
-        logger.warning(f"Error getting system info: {str(e)}")
-        return {
-            'cpu_percent': 0,
-            'memory_percent': 0,
-            'memory_available': 0
-        }
-
-def log_system_info():
-    """Log system information for debugging"""
-    try:
-        system_info = get_system_info()
-        logger.info(f"System Info - CPU: {system_info['cpu_percent']}%, Memory: {system_info['memory_percent']}%, Available: {system_info['memory_available']:.2f}MB")
-    except Exception as e:
-        logger.warning(f"Error logging system info: {str(e)}")
-
 def cleanup_old_files():
-    """Remove files older than 24 hours from upload and processed directories"""
+    """Remove files older than 24 hours from upload, source and processed directories"""
     current_time = time.time()
-    for directory in [Config.UPLOAD_FOLDER, Config.PROCESSED_VIDEOS_FOLDER]:
+    for directory in [Config.UPLOAD_FOLDER, Config.PROCESSED_VIDEOS_FOLDER, Config.SOURCE_VIDEOS_FOLDER]:
         try:
             for filename in os.listdir(directory):
                 file_path = os.path.join(directory, filename)
@@ -112,9 +97,514 @@ def draw_bounding_box(frame, x1, y1, x2, y2, label, confidence):
         logger.error(f"Error drawing bounding box: {str(e)}")
         return frame
 
-@video_bp.route('/api/video/detect', methods=['POST'])
+def update_detections_summary(detections_summary, detection, frame_index, weapon_info):
+    """Add a single detection to the per-class video summary"""
+    class_name = detection['class']
+    confidence = detection['confidence']
+    
+    if class_name not in detections_summary:
+        detections_summary[class_name] = {
+            'count': 0,
+            'max_confidence': 0,
+            'frames_detected': [],
+            'info': weapon_info.get_weapon_info(class_name),
+            'risk_assessment': weapon_info.get_risk_assessment(class_name, confidence)
+        }
+    
+    detections_summary[class_name]['count'] += 1
+    detections_summary[class_name]['max_confidence'] = max(
+        detections_summary[class_name]['max_confidence'],
+        confidence
+    )
+    detections_summary[class_name]['frames_detected'].append(frame_index)
+
+def write_frame_batch(model, out, pending_frames, detections_summary, weapon_info, usage):
+    """Run batched detection on the sampled frames and write all frames in order"""
+    sampled = [(index, frame) for index, frame, is_sampled in pending_frames if is_sampled]
+    batch_detections = []
+    if sampled:
+        batch_detections = detect_weapons_batch(model, [frame for _, frame in sampled], imgsz=usage.next(len(sampled)))
+    detections_by_index = {index: dets for (index, _), dets in zip(sampled, batch_detections)}
+    
+    for index, frame, _ in pending_frames:
+        frame_detections = detections_by_index.get(index, [])
+        if frame_detections:
+            # Draw all of the frame's detections in place
+            draw_detections(frame, frame_detections, out=frame)
+        
+        # Update detections summary
+        for detection in frame_detections:
+            update_detections_summary(detections_summary, detection, index, weapon_info)
+        
+        # Write processed frame
+        with time_stage('encode'):
+            out.write(frame)
+
+def is_video_id(video_id):
+    """Video IDs are uuid4 hex strings; anything else never names a stored file"""
+    return re.fullmatch(r'[0-9a-f]{32}', video_id or '') is not None
+
+def find_source_video(video_id):
+    """Path of the untouched upload stored for a metadata-mode video, or None"""
+    if not is_video_id(video_id):
+        return None
+    for extension in ('mp4', 'avi', 'mov'):
+        path = os.path.join(Config.SOURCE_VIDEOS_FOLDER, f'{video_id}.{extension}')
+        if os.path.exists(path):
+            return path
+    return None
+
+def sidecar_path(video_id, fmt):
+    return os.path.join(Config.SOURCE_VIDEOS_FOLDER, f'{video_id}.{fmt}')
+
+def create_tracker():
+    return IoUTracker(
+        iou_threshold=Config.TRACKER_IOU_THRESHOLD,
+        max_age=Config.TRACKER_MAX_AGE,
+        max_misses=Config.TRACKER_MAX_MISSES,
+        drift_threshold=Config.TRACKER_DRIFT_THRESHOLD
+    )
+
+def remove_file(path):
+    """Delete a file if there is one at path"""
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def run_upload_job(job_fn, input_path, *args, keep_upload=False, **kwargs):
+    """Run a detection job on a saved upload, then delete the upload whether or not the job succeeded.
+
+    keep_upload keeps it after a successful job (metadata mode plays it back).
+    """
+    succeeded = False
+    try:
+        result = job_fn(input_path, *args, **kwargs)
+        succeeded = True
+        return result
+    finally:
+        if not (keep_upload and succeeded):
+            remove_file(input_path)
+
+def count_detections(detections_summary):
+    """Total number of detections recorded in a video summary"""
+    return sum(summary['count'] for summary in detections_summary.values())
+
+def run_video_detection(
+    input_path,
+    progress=None,
+    pipelined=Config.VIDEO_PIPELINE_ENABLED,
+    tracking=Config.VIDEO_TRACKING_ENABLED,
+    gated=Config.MOTION_GATE_ENABLED,
+    video_id=None
+):
+    """Run weapon detection over a saved upload and write the processed video.
+
+    progress, if given, is called as progress(frames_done, total_frames, detections).
+    Output files are named after video_id (a new one if not given), so jobs on
+    uploads with the same file name never touch each other's files. The video
+    is written as processed_<video_id>.mp4, which only appears once it is
+    complete.
+    """
+    start_time = time.time()
+    video_id = video_id or uuid.uuid4().hex
+    
+    # Initialize video capture
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise IOError('Error opening video file')
+        
+    # Get video properties
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    
+    # Create output video writer
+    output_name = f'{video_id}.mp4'
+    # Written under a temporary name so a half-written file is never served
+    tmp_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processing_{output_name}')
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(tmp_path, fourcc, fps, (width, height))
+    output_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{output_name}')
+    
+    if not out.isOpened():
+        cap.release()
+        remove_file(tmp_path)
+        raise IOError('Error creating output video')
+        
+    try:
+        # Process video frames
+        frame_count = 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        detections_summary = {}
+        weapon_info = WeaponInfo()
+        weapon_model = get_weapon_detector()
+        # Each batch runs at the adaptive controller's size at that moment
+        usage = ResolutionUsage(resolution_controller)
+    
+        stage_timings = None
+        # Skip sampled frames where nothing moved since the last ones
+        motion_gate = create_motion_gate() if gated else None
+        tracker = None
+        if tracking:
+            # Carry boxes across skipped frames and re-detect early when tracks drift
+            tracker = create_tracker()
+    
+        def should_infer(index, frame):
+            """Sampled frames that pass the motion gate"""
+            sampled = index % Config.VIDEO_SAMPLE_INTERVAL == 0
+            if sampled and passes_motion_gate(motion_gate, frame):
+                return True
+            if not sampled and tracker is None:
+                frames_skipped.labels('sampling').inc()
+            return False
+    
+        def redetect(index):
+            """Frames should_infer passed over that the tracker wants the detector to see"""
+            if tracker.needs_detection():
+                return True
+            if index % Config.VIDEO_SAMPLE_INTERVAL:
+                frames_skipped.labels('sampling').inc()
+            return False
+    
+        # The tracker needs the staged pipeline to decide frame by frame
+        if pipelined or tracker:
+            def record_detections(index, detections):
+                for detection in detections:
+                    update_detections_summary(detections_summary, detection, index, weapon_info)
+                if progress:
+                    progress(index + 1, total_frames, count_detections(detections_summary))
+        
+            pipeline = VideoPipeline(
+                cap,
+                out,
+                infer_fn=lambda frames: detect_weapons_batch(weapon_model, frames, imgsz=usage.next(len(frames))),
+                # Decoded frames belong to the pipeline, so they are annotated in place
+                annotate_fn=lambda frame, detections: draw_detections(frame, detections, out=frame),
+                batch_size=Config.INFERENCE_BATCH_SIZE,
+                queue_size=Config.VIDEO_PIPELINE_QUEUE_SIZE,
+                should_infer=should_infer,
+                on_detections=record_detections,
+                track_fn=(lambda index, detections: tracker.step(detections)) if tracker else None,
+                # Sampled frames are batched; re-detections depend on the previous frame and run one at a time
+                redetect=redetect if tracker else None,
+                # Decode into the worker pool's shared memory when inference runs out of process
+                frame_ring=getattr(weapon_model, 'frame_ring', None),
+                # Tracker-triggered re-detections are copied in instead
+                prefer_ring=lambda index: index % Config.VIDEO_SAMPLE_INTERVAL == 0
+            )
+            stage_timings = pipeline.run()
+            frame_count = pipeline.stats['encode'].items
+            inferred_frames = pipeline.stats['infer'].items
+        else:
+            # Frames are buffered until a full batch of sampled frames is ready (or
+            # VIDEO_PIPELINE_QUEUE_SIZE frames are waiting), then written out in their original order
+            pending_frames = []
+            sampled_count = 0
+    
+            while cap.isOpened():
+                with time_stage('decode'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+            
+                # Process every Nth frame
+                is_sampled = should_infer(frame_count, frame)
+                pending_frames.append((frame_count, frame, is_sampled))
+                if is_sampled:
+                    sampled_count += 1
+        
+                frame_count += 1
+        
+                if sampled_count >= Config.INFERENCE_BATCH_SIZE or len(pending_frames) >= Config.VIDEO_PIPELINE_QUEUE_SIZE:
+                    write_frame_batch(weapon_model, out, pending_frames, detections_summary, weapon_info, usage)
+                    pending_frames = []
+                    sampled_count = 0
+                    if progress:
+                        progress(frame_count, total_frames, count_detections(detections_summary))
+    
+            if pending_frames:
+                write_frame_batch(weapon_model, out, pending_frames, detections_summary, weapon_info, usage)
+        
+        # Release resources
+        cap.release()
+        out.release()
+        os.replace(tmp_path, output_path)
+    finally:
+        cap.release()
+        out.release()
+        # Left behind only when the job failed
+        remove_file(tmp_path)
+    
+    if progress:
+        progress(frame_count, total_frames, count_detections(detections_summary))
+    
+    if tracker:
+        # Distinct tracked weapons, rather than per-frame hits
+        for class_name, unique_count in tracker.distinct_counts().items():
+            if class_name in detections_summary:
+                detections_summary[class_name]['unique_count'] = unique_count
+    
+    result = {
+        'success': True,
+        'total_frames': total_frames,
+        'processed_frames': frame_count,
+        'processing_time': time.time() - start_time,
+        'detections_summary': detections_summary,
+        'processed_video_url': f'/api/video/processed/{output_name}',
+        'imgsz': usage.to_dict()  # Frames inferred at each input size
+    }
+    if stage_timings:
+        result['stage_timings'] = stage_timings
+    if tracker:
+        result['inferred_frames'] = inferred_frames
+    if motion_gate:
+        result['motion_gate'] = motion_gate.stats()
+    return result
+
+def run_sparse_video_detection(
+    input_path,
+    progress=None,
+    interval=Config.VIDEO_SAMPLE_INTERVAL,
+    gated=Config.MOTION_GATE_ENABLED
+):
+    """Detections-only triage: analyze every interval-th frame without decoding the
+    rest and without writing an output video.
+    """
+    start_time = time.time()
+    
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise IOError('Error opening video file')
+    
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    detections_summary = {}
+    weapon_info = WeaponInfo()
+    
+    def record_detections(index, detections):
+        for detection in detections:
+            update_detections_summary(detections_summary, detection, index, weapon_info)
+        if progress:
+            progress(index + 1, total_frames, count_detections(detections_summary))
+    
+    try:
+        sparse_result = detect_video_sparse(
+            get_weapon_detector(),
+            cap,
+            interval=interval,
+            on_detections=record_detections,
+            motion_gate=create_motion_gate() if gated else None
+        )
+    finally:
+        cap.release()
+    
+    result = {
+        'success': True,
+        'mode': 'sparse',
+        'sample_interval': interval,
+        'total_frames': total_frames,
+        'processed_frames': sparse_result['frames_analyzed'],
+        'processing_time': time.time() - start_time,
+        'detections_summary': detections_summary,
+        'frame_detections': sparse_result['frame_detections'],
+        'imgsz': sparse_result['imgsz']
+    }
+    if 'motion_gate' in sparse_result:
+        result['motion_gate'] = sparse_result['motion_gate']
+    return result
+
+def run_metadata_detection(
+    source_path,
+    video_id,
+    progress=None,
+    tracking=Config.VIDEO_TRACKING_ENABLED,
+    gated=Config.MOTION_GATE_ENABLED
+):
+    """Detect weapons without touching the source video: detections go to an
+    NDJSON and a WebVTT sidecar keyed by frame timestamp, for the client to
+    draw as an overlay. Nothing is annotated or encoded.
+
+    With tracking, every frame is decoded so tracked boxes follow the weapons
+    between detector runs; without it, only sampled frames are decoded and
+    each sampled frame's boxes hold until the next one.
+    """
+    start_time = time.time()
+    
+    cap = cv2.VideoCapture(source_path)
+    if not cap.isOpened():
+        raise IOError('Error opening video file')
+    
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    sidecar = DetectionSidecar(
+        cap.get(cv2.CAP_PROP_FPS),
+        total_frames,
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    detections_summary = {}
+    weapon_info = WeaponInfo()
+    weapon_model = get_weapon_detector()
+    motion_gate = create_motion_gate() if gated else None
+    tracker = create_tracker() if tracking else None
+    
+    def record_detections(index, detections):
+        for detection in detections:
+            update_detections_summary(detections_summary, detection, index, weapon_info)
+        if not tracker:
+            sidecar.add(index, detections)
+        if progress:
+            progress(index + 1, total_frames, count_detections(detections_summary))
+    
+    result = {}
+    try:
+        if tracker:
+            usage = ResolutionUsage(resolution_controller)
+            
+            def should_infer(index, frame):
+                return index % Config.VIDEO_SAMPLE_INTERVAL == 0 and passes_motion_gate(motion_gate, frame)
+            
+            def redetect(index):
+                if tracker.needs_detection():
+                    return True
+                if index % Config.VIDEO_SAMPLE_INTERVAL:
+                    frames_skipped.labels('sampling').inc()
+                return False
+            
+            def track(index, detections):
+                tracked = tracker.step(detections)
+                sidecar.add(index, tracked)
+                # Nothing to draw; the frame only has to reach the end of the pipeline
+                return None
+            
+            pipeline = VideoPipeline(
+                cap,
+                None,
+                infer_fn=lambda frames: detect_weapons_batch(weapon_model, frames, imgsz=usage.next(len(frames))),
+                annotate_fn=lambda frame, detections: frame,
+                batch_size=Config.INFERENCE_BATCH_SIZE,
+                queue_size=Config.VIDEO_PIPELINE_QUEUE_SIZE,
+                should_infer=should_infer,
+                on_detections=record_detections,
+                track_fn=track,
+                redetect=redetect,
+                frame_ring=getattr(weapon_model, 'frame_ring', None),
+                prefer_ring=lambda index: index % Config.VIDEO_SAMPLE_INTERVAL == 0
+            )
+            result['stage_timings'] = pipeline.run()
+            result['inferred_frames'] = processed_frames = pipeline.stats['infer'].items
+            result['imgsz'] = usage.to_dict()
+            for class_name, unique_count in tracker.distinct_counts().items():
+                if class_name in detections_summary:
+                    detections_summary[class_name]['unique_count'] = unique_count
+        else:
+            sparse_result = detect_video_sparse(
+                weapon_model,
+                cap,
+                on_detections=record_detections,
+                motion_gate=motion_gate
+            )
+            processed_frames = sparse_result['frames_analyzed']
+            result['imgsz'] = sparse_result['imgsz']
+    finally:
+        cap.release()
+    
+    sidecar.write_ndjson(sidecar_path(video_id, 'ndjson'))
+    sidecar.write_webvtt(sidecar_path(video_id, 'vtt'))
+    
+    if progress:
+        progress(total_frames, total_frames, count_detections(detections_summary))
+    
+    result.update({
+        'success': True,
+        'mode': 'metadata',
+        'video_id': video_id,
+        'total_frames': total_frames,
+        'processed_frames': processed_frames,
+        'processing_time': time.time() - start_time,
+        'detections_summary': detections_summary,
+        'sidecar_entries': len(sidecar),
+        'source_video_url': f'/api/video/source/{video_id}',
+        'detections_url': f'/api/video/detections/{video_id}.ndjson',
+        'webvtt_url': f'/api/video/detections/{video_id}.vtt',
+        'export_url': f'/api/video/export/{video_id}'
+    })
+    if motion_gate:
+        result['motion_gate'] = motion_gate.stats()
+    return result
+
+def run_burn_in_export(video_id, progress=None):
+    """Render a metadata-mode video's sidecar detections into a re-encoded copy.
+
+    No inference runs: each frame gets the boxes in effect at its timestamp.
+    """
+    start_time = time.time()
+    
+    source_path = find_source_video(video_id)
+    if source_path is None:
+        raise FileNotFoundError(f'Source video {video_id} not found')
+    sidecar = DetectionSidecar.load_ndjson(sidecar_path(video_id, 'ndjson'))
+    
+    cap = cv2.VideoCapture(source_path)
+    if not cap.isOpened():
+        raise IOError('Error opening video file')
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    filename = f'{video_id}.mp4'
+    # Written under a temporary name of its own so the export only becomes
+    # visible once complete, and concurrent exports of one video never share a file
+    output_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{filename}')
+    tmp_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'exporting_{uuid.uuid4().hex}_{filename}')
+    out = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not out.isOpened():
+        cap.release()
+        remove_file(tmp_path)
+        raise IOError('Error creating output video')
+    
+    pipeline = VideoPipeline(
+        cap,
+        out,
+        infer_fn=lambda frames: [],
+        annotate_fn=lambda frame, detections: draw_detections(frame, detections, out=frame),
+        batch_size=1,
+        queue_size=Config.VIDEO_PIPELINE_QUEUE_SIZE,
+        should_infer=lambda index, frame: False,
+        track_fn=lambda index, detections: sidecar.detections_at(index),
+        on_frame_written=(lambda frames_done: progress(frames_done, total_frames, 0)) if progress else None
+    )
+    try:
+        stage_timings = pipeline.run()
+        cap.release()
+        out.release()
+        os.replace(tmp_path, output_path)
+    finally:
+        cap.release()
+        out.release()
+        # Left behind only when the export failed
+        remove_file(tmp_path)
+    
+    return {
+        'success': True,
+        'mode': 'export',
+        'video_id': video_id,
+        'total_frames': total_frames,
+        'processed_frames': pipeline.stats['encode'].items,
+        'processing_time': time.time() - start_time,
+        'processed_video_url': f'/api/video/processed/{filename}',
+        'stage_timings': stage_timings
+    }
+
+@video_bp.route('/detect', methods=['POST'])
 def process_video():
-    """Process video for weapon detection"""
+    """Queue a video for weapon detection and return the job ID.
+
+    Pass ?wait=true to process the video inside the request instead, and
+    ?mode=sparse for a detections-only pass that skips decoding unsampled frames.
+    ?mode=metadata keeps the upload as is and writes detection sidecars for a
+    client-side overlay; POST /api/video/export/<video_id> burns them in later.
+    ?motion_gate=true skips inference on frames without motion or a scene change.
+    """
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file part'}), 400
@@ -129,103 +619,161 @@ def process_video():
         # Clean up old files
         cleanup_old_files()
         
-        # Save uploaded file
+        # mode=sparse and mode=metadata return detections without re-encoding the video
+        mode = request.args.get('mode', request.form.get('mode', Config.VIDEO_OUTPUT_MODE)).lower()
+        gated = request.args.get('motion_gate', str(Config.MOTION_GATE_ENABLED)).lower() == 'true'
+        if mode == 'sparse':
+            # Checked before the upload is saved, so a bad value leaves nothing behind
+            try:
+                interval = int(request.args.get('interval', Config.VIDEO_SAMPLE_INTERVAL))
+            except ValueError:
+                return jsonify({'error': 'interval must be an integer'}), 400
+            if interval < 1:
+                return jsonify({'error': 'interval must be at least 1'}), 400
+        
+        # Save uploaded file under a name of its own, so uploads with the same
+        # file name never overwrite each other; metadata mode keeps it as the playback source
+        video_id = uuid.uuid4().hex
         filename = secure_filename(file.filename)
-        input_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-        file.save(input_path)
+        if mode == 'metadata':
+            # From the validated original name: secure_filename() drops non-ASCII
+            # stems along with their dot, e.g. '视频.mp4' becomes 'mp4'
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            input_path = os.path.join(Config.SOURCE_VIDEOS_FOLDER, f'{video_id}.{extension}')
+        else:
+            input_path = os.path.join(Config.UPLOAD_FOLDER, f'{video_id}_{filename}')
+        with time_stage('upload_parse'):
+            file.save(input_path)
         
-        # Initialize video capture
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            return jsonify({'error': 'Error opening video file'}), 500
-            
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        # Create output video writer
-        output_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{filename}')
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        
-        if not out.isOpened():
-            return jsonify({'error': 'Error creating output video'}), 500
-            
-        # Process video frames
-        frame_count = 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        detections_summary = {}
-        weapon_info = WeaponInfo()
+        if mode == 'metadata':
+            job_fn, job_args = run_upload_job, (run_metadata_detection, input_path, video_id)
+            job_kwargs = {'gated': gated, 'keep_upload': True}
+        elif mode == 'sparse':
+            job_fn, job_args = run_upload_job, (run_sparse_video_detection, input_path)
+            job_kwargs = {'interval': interval, 'gated': gated}
+        else:
+            job_fn, job_args = run_upload_job, (run_video_detection, input_path)
+            job_kwargs = {'gated': gated, 'video_id': video_id}
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Process every 30th frame
-            if frame_count % 30 == 0:
-                # Detect weapons
-                detections = detect_weapons(weapon_model, frame)
-                
-                # Draw detections and collect information
-                for detection in detections:
-                    class_name = detection['class']
-                    confidence = detection['confidence']
-                    
-                    # Draw detection on frame
-                    frame = draw_detections(frame, [detection])
-                    
-                    # Update detections summary
-                    if class_name not in detections_summary:
-                        detections_summary[class_name] = {
-                            'count': 0,
-                            'max_confidence': 0,
-                            'frames_detected': [],
-                            'info': weapon_info.get_weapon_info(class_name),
-                            'risk_assessment': weapon_info.get_risk_assessment(class_name, confidence)
-                        }
-                    
-                    detections_summary[class_name]['count'] += 1
-                    detections_summary[class_name]['max_confidence'] = max(
-                        detections_summary[class_name]['max_confidence'],
-                        confidence
-                    )
-                    detections_summary[class_name]['frames_detected'].append(frame_count)
-            
-            # Write processed frame
-            out.write(frame)
-            frame_count += 1
-            
-        # Release resources
-        cap.release()
-        out.release()
+        if request.args.get('wait', 'false').lower() == 'true':
+            return jsonify(job_fn(*job_args, **job_kwargs))
         
-        # Remove original file
-        os.remove(input_path)
+        try:
+            job_id = video_job_queue.submit(job_fn, *job_args, **job_kwargs)
+        except JobQueueFull as e:
+            os.remove(input_path)
+            return jsonify({'error': str(e)}), 503
         
-        return jsonify({
+        response = {
             'success': True,
-            'total_frames': total_frames,
-            'processed_frames': frame_count,
-            'processing_time': time.time() - start_time,
-            'detections_summary': detections_summary,
-            'processed_video_url': f'/api/video/processed/{filename}'
-        })
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/video/jobs/{job_id}'
+        }
+        return jsonify(response), 202
         
     except Exception as e:
         logger.error(f"Error processing video: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@video_bp.route('/api/video/processed/<filename>')
+@video_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Return the status, progress and (when finished) result of a video job"""
+    job = video_job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(dict(job, success=job['status'] != 'failed'))
+
+@video_bp.route('/export/<video_id>', methods=['POST'])
+def export_video(video_id):
+    """Queue burning a metadata-mode video's detections into a re-encoded copy.
+
+    Returns the finished export straight away if it already exists; pass
+    ?wait=true to render inside the request.
+    """
+    try:
+        if find_source_video(video_id) is None or not os.path.exists(sidecar_path(video_id, 'ndjson')):
+            return jsonify({'error': 'Video not found'}), 404
+        
+        if os.path.exists(os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{video_id}.mp4')):
+            return jsonify({
+                'success': True,
+                'status': 'completed',
+                'processed_video_url': f'/api/video/processed/{video_id}.mp4'
+            })
+        
+        if request.args.get('wait', 'false').lower() == 'true':
+            return jsonify(run_burn_in_export(video_id))
+        
+        try:
+            job_id = video_job_queue.submit(run_burn_in_export, video_id)
+        except JobQueueFull as e:
+            return jsonify({'error': str(e)}), 503
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/video/jobs/{job_id}'
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error exporting video: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/source/<video_id>')
+def serve_source_video(video_id):
+    """Serve the untouched upload of a metadata-mode video"""
+    try:
+        source_path = find_source_video(video_id)
+        if source_path is None:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        return send_file(
+            source_path,
+            mimetype=VIDEO_MIMETYPES.get(source_path.rsplit('.', 1)[1]),
+            conditional=True,
+            max_age=Config.VIDEO_CACHE_MAX_AGE
+        )
+        
+    except Exception as e:
+        logger.error(f"Error serving source video: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/detections/<video_id>.<fmt>')
+def serve_detection_sidecar(video_id, fmt):
+    """Serve a metadata-mode video's detections as NDJSON or a WebVTT metadata track"""
+    try:
+        mimetypes = {'ndjson': 'application/x-ndjson', 'vtt': 'text/vtt'}
+        if fmt not in mimetypes or not is_video_id(video_id):
+            return jsonify({'error': 'Detections not found'}), 404
+        
+        path = sidecar_path(video_id, fmt)
+        if not os.path.exists(path):
+            return jsonify({'error': 'Detections not found'}), 404
+        
+        return send_file(path, mimetype=mimetypes[fmt], conditional=True)
+        
+    except Exception as e:
+        logger.error(f"Error serving detections: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/processed/<filename>')
 def serve_processed_video(filename):
-    """Serve processed video file"""
+    """Serve a complete processed video, with Range and conditional request support"""
     try:
-        processed_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{filename}')
+        processed_path = os.path.join(Config.PROCESSED_VIDEOS_FOLDER, f'processed_{secure_filename(filename)}')
         if not os.path.exists(processed_path):
             return jsonify({'error': 'Processed video not found'}), 404
-            
-        return send_file(processed_path, mimetype='video/mp4')
+        
+        # conditional=True answers Range requests with 206 partial content and
+        # If-None-Match / If-Modified-Since with 304, so players can seek
+        # without downloading the whole file
+        return send_file(
+            processed_path,
+            mimetype=VIDEO_MIMETYPES.get(processed_path.rsplit('.', 1)[-1].lower(), 'application/octet-stream'),
+            conditional=True
+        )
         
     except Exception as e:
         logger.error(f"Error serving processed video: {str(e)}")
@@ -235,8 +783,10 @@ def serve_processed_video(filename):
 def after_request(response):
     try:
         response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Range'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, HEAD, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Range, If-None-Match, If-Modified-Since'
+        # Let cross-origin players read what they need for seeking and revalidation
+        response.headers['Access-Control-Expose-Headers'] = 'Accept-Ranges, Content-Length, Content-Range, ETag'
         return response
     except Exception as e:
         logger.error(f"Error in after_request: {str(e)}")
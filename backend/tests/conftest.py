@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Import backend modules the way app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# utils/weapon_info.py refuses to import without a key; the tests never call Gemini
+os.environ.setdefault('GEMINI_API_KEY', 'test')
@@ -0,0 +1,101 @@
+import pytest
+from utils import adaptive_resolution
+from utils.adaptive_resolution import ResolutionController, ResolutionUsage
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(adaptive_resolution.time, 'monotonic', clock)
+    return clock
+
+def controller(**kwargs):
+    settings = dict(ladder=(640, 512, 416, 320), target_ms=100.0, window=16, min_samples=4,
+                    queue_limit=8, headroom=0.7, min_interval=2.0)
+    settings.update(kwargs)
+    return ResolutionController(**settings)
+
+def test_steps_down_when_p95_exceeds_the_target(clock):
+    resolution = controller()
+    for _ in range(3):
+        resolution.observe(150.0, 640)
+    assert resolution.current() == 640  # Too few samples yet
+    resolution.observe(150.0, 640)
+    assert resolution.current() == 512
+    assert resolution.steps_down == 1
+
+def test_a_batch_counts_as_one_sample_per_frame(clock):
+    resolution = controller()
+    # 8 frames in 400ms is 50ms a frame: under the target, though the call took 4x it
+    resolution.observe(400.0, 640, frames=8)
+    assert resolution.current() == 640
+    assert resolution.stats()['recent_frames'] == 8
+    resolution.observe(1600.0, 640, frames=8)
+    assert resolution.current() == 512
+
+def test_steps_down_on_queue_depth_without_waiting_for_samples(clock):
+    resolution = controller()
+    resolution.observe(10.0, 640, queue_depth=9)
+    assert resolution.current() == 512
+
+def test_steps_are_at_least_min_interval_apart(clock):
+    resolution = controller()
+    resolution.observe(10.0, 640, queue_depth=9)
+    clock.now += 1.0
+    resolution.observe(10.0, 512, queue_depth=9)
+    assert resolution.current() == 512
+    clock.now += 1.0
+    resolution.observe(10.0, 512, queue_depth=9)
+    assert resolution.current() == 416
+
+def test_calls_at_another_size_are_ignored(clock):
+    resolution = controller()
+    resolution.observe(10.0, 640, queue_depth=9)
+    clock.now += 5.0
+    resolution.observe(10.0, 640, queue_depth=9)
+    assert resolution.current() == 512
+    assert resolution.stats()['recent_frames'] == 0
+
+def test_no_step_up_while_the_queue_is_not_empty(clock):
+    resolution = controller()
+    resolution.observe(10.0, 640, queue_depth=9)
+    clock.now += 5.0
+    for _ in range(8):
+        resolution.observe(10.0, 512, queue_depth=1)
+    assert resolution.current() == 512
+    resolution.observe(10.0, 512, queue_depth=0)
+    assert resolution.current() == 640
+    assert resolution.steps_up == 1
+
+def test_step_up_needs_headroom_at_the_larger_size(clock):
+    resolution = controller()
+    resolution.observe(10.0, 640, queue_depth=9)
+    clock.now += 5.0
+    # 60ms at 512 is about 94ms at 640, over 0.7 * 100ms
+    for _ in range(8):
+        resolution.observe(60.0, 512)
+    assert resolution.current() == 512
+    clock.now += 5.0
+    for _ in range(16):
+        resolution.observe(40.0, 512)
+    assert resolution.current() == 640
+
+def test_disabled_controller_never_moves(clock):
+    resolution = controller(enabled=False)
+    resolution.observe(1000.0, 640, queue_depth=100)
+    assert resolution.current() == 640
+
+def test_usage_counts_frames_per_size(clock):
+    resolution = controller()
+    usage = ResolutionUsage(resolution)
+    assert usage.next(4) == 640
+    resolution.observe(10.0, 640, queue_depth=9)
+    assert usage.next(2) == 512
+    assert usage.next(1, imgsz=320) == 320
+    assert usage.to_dict() == {'640': 4, '512': 2, '320': 1}
@@ -0,0 +1,50 @@
+import io
+import zipfile
+import pytest
+from flask import Flask
+from config import Config
+from routes.image_routes import read_batch_uploads
+
+app = Flask(__name__)
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def read(*files):
+    data = {'files': [(io.BytesIO(content), name) for name, content in files]}
+    with app.test_request_context('/', method='POST', data=data, content_type='multipart/form-data'):
+        return read_batch_uploads()
+
+def test_zip_members_are_read_alongside_plain_files():
+    archive = zip_bytes([('a/one.jpg', b'1'), ('notes.txt', b'x'), ('two.png', b'22')])
+    uploads = read(('zero.jpg', b'0'), ('batch.zip', archive))
+    assert uploads == [('zero.jpg', b'0'), ('one.jpg', b'1'), ('two.png', b'22')]
+
+def test_total_uncompressed_size_is_capped_across_archives(monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_MAX_UNCOMPRESSED_BYTES', 1500)
+    first = zip_bytes([('a.jpg', b'\0' * 1000)])
+    second = zip_bytes([('b.jpg', b'\0' * 1000)])
+    assert len(read(('first.zip', first))) == 1
+    with pytest.raises(ValueError, match='too large'):
+        read(('first.zip', first), ('second.zip', second))
+
+def test_oversized_archive_is_refused_before_any_member_is_inflated(monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_MAX_UNCOMPRESSED_BYTES', 1000)
+    inflated = []
+    original_read = zipfile.ZipFile.read
+    monkeypatch.setattr(zipfile.ZipFile, 'read', lambda self, name, pwd=None: inflated.append(name) or original_read(self, name, pwd))
+    with pytest.raises(ValueError):
+        read(('bomb.zip', zip_bytes([('a.jpg', b'\0' * 600), ('b.jpg', b'\0' * 600)])))
+    assert inflated == []
+
+def test_image_count_is_checked_before_members_are_added(monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_MAX_IMAGES', 2)
+    with pytest.raises(ValueError, match='Too many images'):
+        read(('batch.zip', zip_bytes([(f'{i}.jpg', b'1') for i in range(3)])))
+    with pytest.raises(ValueError, match='Too many images'):
+        read(('a.jpg', b'1'), ('b.jpg', b'1'), ('c.jpg', b'1'))
+    assert len(read(('a.jpg', b'1'), ('b.jpg', b'1'))) == 2
@@ -0,0 +1,38 @@
+import pytest
+from app import create_app
+
+@pytest.fixture(scope='module')
+def client():
+    app, socketio = create_app()
+    test_client = socketio.test_client(app)
+    test_client.get_received()
+    yield test_client
+    test_client.disconnect()
+
+@pytest.mark.parametrize('event, field, payload', [
+    ('subscribe_video_job', 'job_id', {}),
+    ('unsubscribe_video_job', 'job_id', {'id': 'abc'}),
+    ('subscribe_weapon_analysis', 'request_id', {'request_id': 5}),
+    ('subscribe_live_stream', 'stream_id', None),
+    ('unsubscribe_live_stream', 'stream_id', 'abc'),
+])
+def test_missing_ids_get_an_error_event(client, event, field, payload):
+    if payload is None:
+        client.emit(event)
+    else:
+        client.emit(event, payload)
+    assert client.get_received() == [{
+        'name': 'subscription_error',
+        'args': [{'event': event, 'error': f'{field} is required'}],
+        'namespace': '/'
+    }]
+
+def test_malformed_acks_are_ignored(client):
+    for payload in ({}, {'stream_id': ['a']}, {'stream_id': 'a', 'captured_at': 'x', 'emitted_at': 1}):
+        client.emit('live_stream_ack', payload)
+    client.emit('live_stream_ack')
+    assert client.get_received() == []
+
+def test_valid_subscription_is_confirmed(client):
+    client.emit('subscribe_video_job', {'job_id': 'abc'})
+    assert client.get_received()[0]['args'] == [{'job_id': 'abc'}]
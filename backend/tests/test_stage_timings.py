@@ -0,0 +1,71 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+import pytest
+from utils import detection_utils
+from utils.detection_utils import BoxArrays, detect_boxes_batch, detect_weapons_batch
+from utils.inference_pool import InferenceWorkerPool
+from utils.metrics import stage_seconds
+
+EMPTY = BoxArrays(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+
+def stage_total(stage):
+    snapshot = stage_seconds.labels(stage).snapshot()
+    return snapshot['count'], snapshot['sum']
+
+class FakeResult:
+    boxes = None
+
+class SlowForwardModel:
+    """Called like an ultralytics model; the forward pass takes `seconds`"""
+    names = {0: 'pistol'}
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, frames, **kwargs):
+        time.sleep(self.seconds)
+        return [FakeResult() for _ in frames]
+
+class QueuedModel:
+    """Model wrapper whose requests wait in a queue before any forward pass"""
+    names = {0: 'pistol'}
+
+    def predict_boxes(self, frames, conf_threshold=0.3, imgsz=None):
+        time.sleep(0.05)
+        return [EMPTY for _ in frames]
+
+def test_forward_pass_is_recorded_and_returned():
+    count, total = stage_total('inference')
+    timings = {}
+    detect_boxes_batch(SlowForwardModel(0.02), [np.zeros((8, 8, 3), np.uint8)] * 2, timings=timings)
+    assert set(timings) == {'inference', 'extract'}
+    assert timings['inference'] >= 0.02
+    assert stage_total('inference') == (count + 1, pytest.approx(total + timings['inference']))
+
+def test_time_waiting_for_a_wrapped_model_is_not_inference(monkeypatch):
+    monkeypatch.setattr(detection_utils.resolution_controller, 'observe', lambda *args, **kwargs: None)
+    before = stage_total('inference')
+    detect_weapons_batch(QueuedModel(), [np.zeros((8, 8, 3), np.uint8)], imgsz=320)
+    assert stage_total('inference') == before
+
+class FakeProcess:
+    def is_alive(self):
+        return True
+
+def test_worker_timings_are_recorded_in_the_server_process():
+    pool = InferenceWorkerPool('unused.pt', num_workers=1, ring_slots=0)
+    pool._result_queue = queue.Queue()
+    pool._workers = [{'process': FakeProcess(), 'queue': None, 'cpus': None, 'in_flight': 1, 'tasks': 1}]
+    future = Future()
+    pool._tasks[7] = (future, None, [], 0)
+    inference_before, extract_before = stage_total('inference'), stage_total('extract')
+
+    threading.Thread(target=pool._collect_results, daemon=True).start()
+    pool._result_queue.put(('result', 0, 7, ([EMPTY], {'inference': 0.5, 'extract': 0.25})))
+
+    assert future.result(timeout=5) == [EMPTY]
+    assert stage_total('inference') == (inference_before[0] + 1, pytest.approx(inference_before[1] + 0.5))
+    assert stage_total('extract') == (extract_before[0] + 1, pytest.approx(extract_before[1] + 0.25))
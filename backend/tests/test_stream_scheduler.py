@@ -0,0 +1,119 @@
+import time
+import numpy as np
+import pytest
+from utils import stream_scheduler
+from utils.stream_scheduler import FairStreamScheduler, StreamBudget, allocate_rates, _StreamState
+
+def test_minimums_are_scaled_down_together_when_capacity_is_short():
+    rates = allocate_rates(3.0, {'a': (2.0, 5.0, 1.0), 'b': (4.0, 5.0, 1.0)})
+    assert rates == pytest.approx({'a': 1.0, 'b': 2.0})
+
+def test_no_capacity_gives_every_stream_zero():
+    assert allocate_rates(0.0, {'a': (1.0, 5.0, 1.0), 'b': (0.0, 5.0, 1.0)}) == {'a': 0.0, 'b': 0.0}
+
+def test_capacity_above_minimums_is_shared_by_weight():
+    rates = allocate_rates(12.0, {'a': (1.0, 10.0, 2.0), 'b': (1.0, 10.0, 1.0)})
+    assert rates == pytest.approx({'a': 1.0 + 20.0 / 3, 'b': 1.0 + 10.0 / 3})
+
+def test_share_a_saturated_stream_cannot_use_spills_over_to_the_others():
+    rates = allocate_rates(12.0, {'a': (1.0, 2.0, 1.0), 'b': (1.0, 10.0, 1.0), 'c': (1.0, 10.0, 1.0)})
+    assert rates == pytest.approx({'a': 2.0, 'b': 5.0, 'c': 5.0})
+    assert sum(rates.values()) == pytest.approx(12.0)
+
+def test_capacity_beyond_all_targets_is_left_unused():
+    rates = allocate_rates(100.0, {'a': (1.0, 5.0, 1.0), 'b': (1.0, 3.0, 4.0)})
+    assert rates == pytest.approx({'a': 5.0, 'b': 3.0})
+
+def test_boost_multiplies_target_and_weight_until_it_expires():
+    budget = StreamBudget(target_fps=5.0, min_fps=1.0, weight=1.0, boost_factor=2.0, boost_seconds=10.0)
+    budget.boost(100.0)
+    assert budget.effective(105.0) == (1.0, 10.0, 2.0)
+    assert budget.effective(110.0) == (1.0, 5.0, 1.0)
+
+def test_boosted_target_is_capped_at_source_fps():
+    budget = StreamBudget(target_fps=5.0, min_fps=1.0, weight=1.0, boost_factor=2.0, boost_seconds=10.0)
+    budget.boost(100.0)
+    assert budget.effective(101.0, source_fps=8.0) == (1.0, 8.0, 2.0)
+
+def test_minimum_never_exceeds_a_slow_source():
+    budget = StreamBudget(target_fps=5.0, min_fps=4.0)
+    assert budget.effective(0.0, source_fps=2.0)[:2] == (2.0, 2.0)
+
+def test_invalid_budget_update_is_rolled_back():
+    budget = StreamBudget(target_fps=5.0, min_fps=1.0)
+    with pytest.raises(ValueError):
+        budget.update(target_fps=10.0, min_fps=20.0)
+    assert (budget.target_fps, budget.min_fps) == (5.0, 1.0)
+
+class FakeReader:
+    def __init__(self, alive=True, has_frame=True):
+        self.alive = alive
+        self.fps = 30.0
+        self.frame = (7, np.zeros((4, 4, 3), dtype=np.uint8), 1.0) if has_frame else None
+
+    def latest(self, after=-1, timeout=1.0, take=True):
+        return self.frame if self.frame and self.frame[0] > after else None
+
+class FakeStream:
+    def __init__(self, stream_id, reader):
+        self.id = stream_id
+        self.reader = reader
+        self.budget = StreamBudget(target_fps=5.0, min_fps=1.0)
+        self.published = []
+        self.finished = False
+
+    def publish(self, sequence, captured_at, started_at, detections, imgsz):
+        self.published.append(sequence)
+
+    def finish(self):
+        self.finished = True
+
+@pytest.fixture
+def detector_calls(monkeypatch):
+    calls = []
+
+    def detect(model, frames, imgsz=None):
+        calls.append(len(frames))
+        return [[] for _ in frames]
+
+    monkeypatch.setattr(stream_scheduler, 'detect_weapons_batch', detect)
+    return calls
+
+def make_scheduler(streams, lateness, max_batch):
+    """A scheduler without its thread; lateness gives each stream's seconds past due"""
+    scheduler = FairStreamScheduler(budget_fps=30.0, max_batch=max_batch)
+    now = time.monotonic()
+    for stream in streams:
+        scheduler._streams[stream.id] = stream
+        scheduler._states[stream.id] = state = _StreamState()
+        state.next_due = now - lateness.get(stream.id, 0.0)
+    return scheduler
+
+def test_dispatch_batches_the_most_overdue_streams(detector_calls):
+    streams = [FakeStream(stream_id, FakeReader()) for stream_id in ('a', 'b', 'c')]
+    # Every stream is allocated its 5 fps target, so all intervals are 0.2 s
+    scheduler = make_scheduler(streams, {'a': 0.1, 'b': 0.3, 'c': 0.2}, max_batch=2)
+
+    assert scheduler._dispatch(None, streams)
+    assert detector_calls == [2]
+    assert [stream.published for stream in streams] == [[], [7], [7]]
+    assert scheduler.allocated_fps('a') == pytest.approx(5.0)
+    # Served streams are not due again for an interval; a frame they already had does not count as new
+    assert not scheduler._dispatch(None, streams[1:])
+
+def test_dispatch_skips_streams_without_a_new_frame(detector_calls):
+    streams = [FakeStream('a', FakeReader(has_frame=False)), FakeStream('b', FakeReader())]
+    scheduler = make_scheduler(streams, {'a': 0.5, 'b': 0.1}, max_batch=8)
+
+    assert scheduler._dispatch(None, streams)
+    assert detector_calls == [1]
+    assert streams[1].published == [7]
+
+def test_dispatch_finishes_and_removes_streams_whose_reader_died(detector_calls):
+    streams = [FakeStream('a', FakeReader(alive=False)), FakeStream('b', FakeReader())]
+    scheduler = make_scheduler(streams, {}, max_batch=8)
+
+    scheduler._dispatch(None, streams)
+    assert streams[0].finished and not streams[0].published
+    assert 'a' not in scheduler._streams
+    assert streams[1].published == [7]
@@ -0,0 +1,31 @@
+import numpy as np
+from utils.tiling import nms, tile_grid
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32)
+
+def test_overlapping_boxes_of_one_class_keep_the_best_score():
+    xyxy = boxes([0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60])
+    keep = nms(xyxy, np.array([0.6, 0.9, 0.5]), np.array([0, 0, 0]), 0.5, metric='iou')
+    assert keep.tolist() == [1, 2]
+
+def test_overlapping_boxes_of_different_classes_are_both_kept():
+    xyxy = boxes([0, 0, 10, 10], [1, 1, 11, 11])
+    keep = nms(xyxy, np.array([0.9, 0.8]), np.array([0, 1]), 0.5, metric='iou')
+    assert keep.tolist() == [0, 1]
+
+def test_ios_removes_a_box_cut_out_of_a_larger_one():
+    # The right half of a detection, as a tile border would cut it
+    xyxy = boxes([0, 0, 100, 40], [50, 0, 100, 40])
+    scores, classes = np.array([0.9, 0.8]), np.array([0, 0])
+    assert nms(xyxy, scores, classes, 0.5, metric='iou').tolist() == [0, 1]
+    assert nms(xyxy, scores, classes, 0.5, metric='ios').tolist() == [0]
+
+def test_equal_scores_keep_input_order():
+    xyxy = boxes([0, 0, 10, 10], [0, 0, 10, 10])
+    assert nms(xyxy, np.array([0.7, 0.7]), np.array([0, 0]), 0.5).tolist() == [0]
+
+def test_tiles_cover_the_image_at_full_size():
+    tiles = tile_grid(1000, 1500, 640, 64)
+    assert all(x2 - x1 == 640 and y2 - y1 == 640 for x1, y1, x2, y2 in tiles)
+    assert max(x2 for _, _, x2, _ in tiles) == 1500 and max(y2 for _, _, _, y2 in tiles) == 1000
@@ -0,0 +1,24 @@
+from utils.tracker import IoUTracker
+
+def run(box_at, frames=300, interval=30):
+    """Sampled detection every interval frames plus tracker re-detections; returns detector runs"""
+    tracker = IoUTracker()
+    runs = 0
+    for index in range(frames):
+        if index % interval == 0 or tracker.needs_detection():
+            runs += 1
+            tracker.step([{'class': 'gun', 'confidence': 0.9, 'bbox': box_at(index)}])
+        else:
+            tracker.step(None)
+    return runs, tracker
+
+def test_static_track_adds_no_detector_runs():
+    runs, tracker = run(lambda index: [100, 100, 160, 140])
+    assert runs == 10
+    assert tracker.distinct_counts() == {'gun': 1}
+
+def test_moving_track_is_redetected_between_samples():
+    # 2 px per frame on a 120 px box: a quarter box of drift takes half a sample interval
+    runs, tracker = run(lambda index: [100 + 2 * index, 100, 220 + 2 * index, 220])
+    assert runs > 10
+    assert tracker.distinct_counts() == {'gun': 1}
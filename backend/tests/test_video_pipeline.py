@@ -0,0 +1,46 @@
+import numpy as np
+from utils.video_pipeline import VideoPipeline
+
+class FakeCapture:
+    def __init__(self, frames):
+        self.frames = iter(range(frames))
+
+    def read(self, image=None):
+        index = next(self.frames, None)
+        if index is None:
+            return False, None
+        return True, np.full((4, 4, 3), index % 256, np.uint8)
+
+class FakeWriter:
+    def __init__(self):
+        self.written = []
+
+    def write(self, frame):
+        self.written.append(int(frame[0, 0, 0]))
+
+def run(frames, interval, batch_size, queue_size):
+    batches = []
+    writer = FakeWriter()
+    pipeline = VideoPipeline(
+        FakeCapture(frames),
+        writer,
+        infer_fn=lambda batch: batches.append(len(batch)) or [[] for _ in batch],
+        annotate_fn=lambda frame, detections: frame,
+        batch_size=batch_size,
+        queue_size=queue_size,
+        should_infer=lambda index, frame: index % interval == 0
+    )
+    pipeline.run()
+    return batches, writer.written
+
+def test_sparse_sampling_flushes_a_partial_batch_at_the_queue_size():
+    # 4 samples 30 frames apart would hold 91 frames; 32 at most means batches of 1-2
+    batches, written = run(frames=120, interval=30, batch_size=4, queue_size=32)
+    assert sum(batches) == 4
+    assert max(batches) < 4
+    assert written == list(range(120))
+
+def test_dense_sampling_still_fills_batches():
+    batches, written = run(frames=40, interval=2, batch_size=4, queue_size=32)
+    assert batches == [4] * 5
+    assert written == list(range(40))
@@ -0,0 +1,28 @@
+from flask import Flask
+from config import Config
+from routes.video_routes import video_bp
+
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'PROCESSED_VIDEOS_FOLDER', str(tmp_path))
+    (tmp_path / 'processed_clip.mp4').write_bytes(bytes(range(256)) * 4)
+    app = Flask(__name__)
+    app.register_blueprint(video_bp, url_prefix='/api/video')
+    return app.test_client()
+
+def test_range_request_returns_partial_content(tmp_path, monkeypatch):
+    response = client(tmp_path, monkeypatch).get('/api/video/processed/clip.mp4', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == 'bytes 100-199/1024'
+    assert response.mimetype == 'video/mp4'
+    assert response.data == bytes(range(100, 200))
+
+def test_unchanged_video_is_revalidated_with_304(tmp_path, monkeypatch):
+    test_client = client(tmp_path, monkeypatch)
+    etag = test_client.get('/api/video/processed/clip.mp4').headers['ETag']
+    response = test_client.get('/api/video/processed/clip.mp4', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+def test_unfinished_video_is_not_found(tmp_path, monkeypatch):
+    test_client = client(tmp_path, monkeypatch)
+    (tmp_path / 'processing_other.mp4').write_bytes(b'partial')
+    assert test_client.get('/api/video/processed/other.mp4').status_code == 404
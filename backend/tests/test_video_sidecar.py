@@ -0,0 +1,67 @@
+import json
+from utils.video_sidecar import DetectionSidecar, format_vtt_timestamp
+
+def box(x, confidence=0.9, name='pistol'):
+    return {'class': name, 'confidence': confidence, 'bbox': [x, 10, x + 20, 30]}
+
+def sidecar_with_entries():
+    sidecar = DetectionSidecar(fps=10, total_frames=100, width=640, height=480)
+    sidecar.add(0, [])            # Nothing before the first detection is recorded
+    sidecar.add(5, [box(1)])
+    sidecar.add(6, [box(1)])      # Unchanged: holds from frame 5
+    sidecar.add(9, [box(1.04)])   # Rounds to the same box
+    sidecar.add(12, [box(50)])
+    sidecar.add(20, [])           # Boxes cleared
+    sidecar.add(21, [])
+    sidecar.add(40, [box(7)])
+    return sidecar
+
+def test_only_changes_are_recorded():
+    sidecar = sidecar_with_entries()
+    assert [entry['frame'] for entry in sidecar.entries()] == [5, 12, 20, 40]
+    assert [entry['t'] for entry in sidecar.entries()] == [0.5, 1.2, 2.0, 4.0]
+
+def test_detections_at_returns_the_boxes_in_effect():
+    sidecar = sidecar_with_entries()
+    assert sidecar.detections_at(0) == []
+    assert sidecar.detections_at(5)[0]['bbox'] == [1.0, 10.0, 21.0, 30.0]
+    assert sidecar.detections_at(11)[0]['bbox'] == [1.0, 10.0, 21.0, 30.0]
+    assert sidecar.detections_at(12)[0]['bbox'] == [50.0, 10.0, 70.0, 30.0]
+    assert sidecar.detections_at(39) == []
+    assert sidecar.detections_at(99)[0]['bbox'] == [7.0, 10.0, 27.0, 30.0]
+
+def test_vtt_cues_end_at_the_next_entry_or_the_end_of_the_video(tmp_path):
+    path = tmp_path / 'detections.vtt'
+    sidecar_with_entries().write_webvtt(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[0] == 'WEBVTT'
+    timings = [line for line in lines if '-->' in line]
+    # The empty entry at frame 20 ends the second cue and gets none of its own
+    assert timings == [
+        '00:00:00.500 --> 00:00:01.200',
+        '00:00:01.200 --> 00:00:02.000',
+        '00:00:04.000 --> 00:00:10.000'
+    ]
+    payload = json.loads(lines[lines.index(timings[1]) + 1])
+    assert payload['frame'] == 12 and payload['detections'][0]['class'] == 'pistol'
+
+def test_vtt_cue_on_the_last_frame_is_not_empty(tmp_path):
+    path = tmp_path / 'detections.vtt'
+    sidecar = DetectionSidecar(fps=10, total_frames=10, width=64, height=48)
+    sidecar.add(9, [box(1)])
+    sidecar.write_webvtt(str(path))
+    assert '00:00:00.900 --> 00:00:01.000' in path.read_text()
+
+def test_ndjson_round_trip(tmp_path):
+    path = tmp_path / 'detections.ndjson'
+    sidecar = sidecar_with_entries()
+    sidecar.write_ndjson(str(path))
+    loaded = DetectionSidecar.load_ndjson(str(path))
+    assert (loaded.fps, loaded.total_frames, loaded.width, loaded.height) == (10, 100, 640, 480)
+    assert list(loaded.entries()) == list(sidecar.entries())
+
+def test_unknown_frame_rate_falls_back_to_default():
+    assert DetectionSidecar(fps=0, total_frames=0, width=1, height=1).timestamp(30) == 1.0
+
+def test_vtt_timestamp_format():
+    assert format_vtt_timestamp(3725.5) == '01:02:05.500'
@@ -0,0 +1,25 @@
+import pytest
+from config import Config
+from utils.weapon_info import WeaponInfo
+
+@pytest.mark.parametrize('confidence, bucket', [
+    (0.3, '0.30'),
+    (0.7, '0.70'),
+    (0.6, '0.60'),
+    (0.29999, '0.20'),
+    (0.35, '0.30'),
+    (0.99, '0.90'),
+    (1.0, '1.00'),
+])
+def test_confidence_is_floored_to_its_bucket(confidence, bucket):
+    assert WeaponInfo._confidence_bucket(confidence) == bucket
+
+def test_every_bucket_edge_lands_in_its_own_bucket(monkeypatch):
+    monkeypatch.setattr(Config, 'RISK_CONFIDENCE_BUCKET', 0.05)
+    for edge in range(1, 21):
+        assert WeaponInfo._confidence_bucket(edge * 0.05) == f'{edge * 0.05:.2f}'
+        assert WeaponInfo._confidence_bucket(edge * 0.05 - 0.001) == f'{(edge - 1) * 0.05:.2f}'
+
+def test_missing_confidence_has_its_own_bucket():
+    assert WeaponInfo._confidence_bucket(None) == 'none'
+    assert WeaponInfo._confidence_bucket(0) == 'none'
@@ -1,4 +1,4 @@
 # This file makes the utils directory a Python package 
 from .weapon_info import WeaponInfo
-from .detection_utils import load_model, detect_weapons, draw_detections
-from .openai_utils import get_weapon_details 
\ No newline at end of file
+from .detection_utils import load_model, detect_weapons, detect_weapons_batch, draw_detections
+from .model_registry import model_registry, get_weapon_model
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+from config import Config
+from utils.metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ResolutionController:
+    """Picks the inference size from a ladder so per-frame latency stays under a target.
+
+    Callers ask current() for the size to infer at and report each call's
+    latency (including any scheduler queueing) with observe(). A call's
+    latency is divided by the frames it carried, so target_ms is the p95
+    latency per frame: a single still counts in full, while an 8-frame video
+    batch or a multi-stream live batch counts as eight samples of an eighth
+    each, and cannot push stills down the ladder on its own. When the p95 of
+    recent samples at the current size exceeds target_ms, or more than
+    queue_limit requests are waiting, the size steps one rung down. It steps
+    back up once the queue is empty and the p95 scaled to the larger size
+    (cost grows with the pixel count) still fits within headroom * target_ms.
+    Steps are at least min_interval seconds apart so each size gets a fair sample.
+    """
+
+    def __init__(
+        self,
+        ladder: Sequence[int] = (640, 512, 416, 320),
+        target_ms: float = 1000.0,
+        window: int = 32,
+        min_samples: int = 8,
+        queue_limit: int = 8,
+        headroom: float = 0.7,
+        min_interval: float = 2.0,
+        enabled: bool = True
+    ):
+        self.ladder = sorted(set(ladder), reverse=True)
+        self.target_ms = target_ms
+        self.min_samples = min_samples
+        self.queue_limit = queue_limit
+        self.headroom = headroom
+        self.min_interval = min_interval
+        self.enabled = enabled
+        self._level = 0
+        self._samples = deque(maxlen=window)  # Per-frame latencies (ms) observed at the current size
+        self._queue_depth = 0
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+        self.steps_down = 0
+        self.steps_up = 0
+
+    def current(self) -> int:
+        """Inference size to use for the next call"""
+        with self._lock:
+            return self.ladder[self._level]
+
+    def observe(self, latency_ms: float, imgsz: Optional[int], queue_depth: int = 0, frames: int = 1):
+        """Record one call's latency over the frames it carried; calls made at another size are ignored"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if imgsz != self.ladder[self._level]:
+                return
+            frames = max(1, frames)
+            self._samples.extend([latency_ms / frames] * frames)
+            self._queue_depth = queue_depth
+            now = time.monotonic()
+            if now - self._last_change < self.min_interval:
+                return
+            backlog = queue_depth > self.queue_limit
+            if len(self._samples) < self.min_samples and not backlog:
+                return
+
+            p95 = float(np.percentile(self._samples, 95))
+            if (backlog or p95 > self.target_ms) and self._level < len(self.ladder) - 1:
+                self._step(+1, now, f"p95 {p95:.0f}ms, queue depth {queue_depth}")
+            elif self._level > 0 and queue_depth == 0 and len(self._samples) >= self.min_samples:
+                scale = (self.ladder[self._level - 1] / self.ladder[self._level]) ** 2
+                if p95 * scale < self.headroom * self.target_ms:
+                    self._step(-1, now, f"p95 {p95:.0f}ms")
+
+    def _step(self, direction: int, now: float, reason: str):
+        previous = self.ladder[self._level]
+        self._level += direction
+        self._samples.clear()
+        self._last_change = now
+        if direction > 0:
+            self.steps_down += 1
+        else:
+            self.steps_up += 1
+        logger.info(f"Inference size {previous} -> {self.ladder[self._level]} ({reason}, target {self.target_ms:.0f}ms)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._samples)
+            return {
+                'enabled': self.enabled,
+                'imgsz': self.ladder[self._level],
+                'ladder': self.ladder,
+                'target_ms': self.target_ms,
+                'recent_frames': len(samples),
+                'p50_ms': float(np.percentile(samples, 50)) if samples else None,
+                'p95_ms': float(np.percentile(samples, 95)) if samples else None,
+                'queue_depth': self._queue_depth,
+                'steps_down': self.steps_down,
+                'steps_up': self.steps_up
+            }
+
+class ResolutionUsage:
+    """Frames inferred at each size over one job, for reporting in its result"""
+
+    def __init__(self, controller: ResolutionController):
+        self.controller = controller
+        self.frames: Dict[int, int] = {}
+
+    def next(self, num_frames: int, imgsz: Optional[int] = None) -> int:
+        """Size for the next batch of num_frames frames; a given imgsz is only counted"""
+        imgsz = imgsz or self.controller.current()
+        self.frames[imgsz] = self.frames.get(imgsz, 0) + num_frames
+        return imgsz
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(imgsz): count for imgsz, count in sorted(self.frames.items(), reverse=True)}
+
+resolution_controller = ResolutionController(
+    ladder=Config.IMGSZ_LADDER,
+    target_ms=Config.INFERENCE_LATENCY_TARGET_MS,
+    window=Config.ADAPTIVE_RESOLUTION_WINDOW,
+    queue_limit=Config.ADAPTIVE_RESOLUTION_QUEUE_LIMIT,
+    min_interval=Config.ADAPTIVE_RESOLUTION_MIN_INTERVAL,
+    enabled=Config.ADAPTIVE_RESOLUTION_ENABLED
+)
+
+registry.gauge('weapon_inference_imgsz', 'Current adaptive inference input size', resolution_controller.current)
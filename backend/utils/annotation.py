@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AnnotationRenderer:
+    """Draws all boxes and labels of a frame in one pass, optionally in place.
+
+    Each distinct label string ("pistol 0.87", "#3 knife 0.55") is rendered
+    once into a small patch (background plus text) and later blitted with a
+    slice copy, instead of running getTextSize, a filled rectangle and putText
+    for every box of every frame. Patches are kept in a bounded LRU cache and
+    are never written to after creation, so they are shared between threads.
+    """
+
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+    def __init__(
+        self,
+        color: Tuple[int, int, int] = (0, 255, 0),
+        text_color: Tuple[int, int, int] = (0, 0, 0),
+        box_thickness: int = 2,
+        font_scale: float = 0.5,
+        max_labels: int = 2048
+    ):
+        self.color = color
+        self.text_color = text_color
+        self.box_thickness = box_thickness
+        self.font_scale = font_scale
+        self.max_labels = max_labels
+        self._labels: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def label_patch(self, label: str) -> np.ndarray:
+        """Background and text for a label, laid out like the original per-box drawing"""
+        with self._lock:
+            patch = self._labels.get(label)
+            if patch is not None:
+                self._labels.move_to_end(label)
+                self.hits += 1
+                return patch
+            self.misses += 1
+
+        (text_width, text_height), _ = cv2.getTextSize(label, self.FONT, self.font_scale, 1)
+        # Covers (x1, y1 - text_height - 4) .. (x1 + text_width, y1) inclusive, text baseline at y1 - 4
+        patch = np.empty((text_height + 5, text_width + 1, 3), dtype=np.uint8)
+        patch[:] = self.color
+        cv2.putText(patch, label, (0, text_height), self.FONT, self.font_scale, self.text_color, 1)
+        patch.flags.writeable = False
+
+        with self._lock:
+            self._labels[label] = patch
+            while len(self._labels) > self.max_labels:
+                self._labels.popitem(last=False)
+        return patch
+
+    @staticmethod
+    def _blit(image: np.ndarray, patch: np.ndarray, x: int, y: int):
+        """Copy patch into image with its top-left corner at (x, y), clipped to the image"""
+        height, width = image.shape[:2]
+        patch_height, patch_width = patch.shape[:2]
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + patch_width, width), min(y + patch_height, height)
+        if left < right and top < bottom:
+            image[top:bottom, left:right] = patch[top - y:bottom - y, left - x:right - x]
+
+    def draw(self, image: np.ndarray, detections: List[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Annotate image and return the result.
+
+        out=None draws on a copy; out=image draws in place; any other array of
+        the same shape is overwritten with the image and drawn on, so a caller
+        can reuse one buffer across frames.
+        """
+        if out is None:
+            out = image.copy()
+        elif out is not image:
+            np.copyto(out, image)
+        if not detections:
+            return out
+
+        bgr = out.ndim == 3 and out.shape[2] == 3 and out.dtype == np.uint8
+        for det in detections:
+            x1, y1, x2, y2 = (int(v) for v in det['bbox'])
+            cv2.rectangle(out, (x1, y1), (x2, y2), self.color, self.box_thickness)
+
+            label = f"{det['class']} {det['confidence']:.2f}"
+            if 'track_id' in det:
+                label = f"#{det['track_id']} {label}"
+
+            if bgr:
+                patch = self.label_patch(label)
+                self._blit(out, patch, x1, y1 - patch.shape[0] + 1)
+            else:
+                # Patches are BGR; draw anything else directly
+                (text_width, text_height), _ = cv2.getTextSize(label, self.FONT, self.font_scale, 1)
+                cv2.rectangle(out, (x1, y1 - text_height - 4), (x1 + text_width, y1), self.color, -1)
+                cv2.putText(out, label, (x1, y1 - 4), self.FONT, self.font_scale, self.text_color, 1)
+        return out
+
+    def draw_batch(
+        self,
+        frames: List[np.ndarray],
+        detections: List[List[Dict[str, Any]]],
+        in_place: bool = True
+    ) -> List[np.ndarray]:
+        """draw() over several frames; in place by default, since batches are usually owned by the caller"""
+        return [
+            self.draw(frame, frame_detections, out=frame if in_place else None)
+            for frame, frame_detections in zip(frames, detections)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'cached_labels': len(self._labels),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+annotation_renderer = AnnotationRenderer()
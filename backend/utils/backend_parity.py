@@ -0,0 +1,96 @@
+import logging
+import time
+from typing import Any, Dict, List
+import numpy as np
+from utils.detection_utils import BoxArrays, detect_boxes_batch
+from utils.tracker import bbox_iou
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def match_boxes(reference: BoxArrays, candidate: BoxArrays, iou_threshold: float = 0.5):
+    """Greedily pair same-class boxes by IoU; returns (reference_index, candidate_index, iou) triples"""
+    if len(reference.conf) == 0 or len(candidate.conf) == 0:
+        return []
+    ious = bbox_iou(reference.xyxy, candidate.xyxy)
+    ious[reference.cls[:, None] != candidate.cls[None, :]] = 0.0
+    matches = []
+    for flat_index in np.argsort(ious, axis=None)[::-1]:
+        ref_index, cand_index = np.unravel_index(flat_index, ious.shape)
+        iou = float(ious[ref_index, cand_index])
+        if iou < iou_threshold:
+            break
+        matches.append((int(ref_index), int(cand_index), iou))
+        ious[ref_index, :] = 0.0
+        ious[:, cand_index] = 0.0
+    return matches
+
+def _latency_ms(model, images: List[np.ndarray], conf_threshold: float, repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            detect_boxes_batch(model, [image], conf_threshold)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+def compare_backends(
+    reference_model,
+    candidate_model,
+    images: List[np.ndarray],
+    conf_threshold: float = 0.3,
+    iou_threshold: float = 0.5,
+    repeat: int = 3,
+    min_recall: float = 0.9
+) -> Dict[str, Any]:
+    """Check a candidate backend's detections against the reference (PyTorch) backend and time both.
+
+    Recall and precision count boxes of the same class overlapping by at least
+    iou_threshold. The check passes when both reach min_recall.
+    """
+    try:
+        reference = [detect_boxes_batch(reference_model, [image], conf_threshold)[0] for image in images]
+        candidate = [detect_boxes_batch(candidate_model, [image], conf_threshold)[0] for image in images]
+
+        matched, conf_diffs, ious = 0, [], []
+        for ref_boxes, cand_boxes in zip(reference, candidate):
+            for ref_index, cand_index, iou in match_boxes(ref_boxes, cand_boxes, iou_threshold):
+                matched += 1
+                ious.append(iou)
+                conf_diffs.append(abs(float(ref_boxes.conf[ref_index]) - float(cand_boxes.conf[cand_index])))
+        reference_count = sum(len(boxes.conf) for boxes in reference)
+        candidate_count = sum(len(boxes.conf) for boxes in candidate)
+        recall = matched / reference_count if reference_count else 1.0
+        precision = matched / candidate_count if candidate_count else 1.0
+
+        # Warm both up outside the timed loop
+        _latency_ms(reference_model, images[:1], conf_threshold, 1)
+        _latency_ms(candidate_model, images[:1], conf_threshold, 1)
+        reference_ms = _latency_ms(reference_model, images, conf_threshold, repeat)
+        candidate_ms = _latency_ms(candidate_model, images, conf_threshold, repeat)
+
+        return {
+            'images': len(images),
+            'reference_boxes': reference_count,
+            'candidate_boxes': candidate_count,
+            'matched_boxes': matched,
+            'recall': round(recall, 4),
+            'precision': round(precision, 4),
+            'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+            'max_confidence_diff': round(max(conf_diffs), 4) if conf_diffs else None,
+            'reference_ms': {
+                'p50': round(float(np.percentile(reference_ms, 50)), 2),
+                'p95': round(float(np.percentile(reference_ms, 95)), 2)
+            },
+            'candidate_ms': {
+                'p50': round(float(np.percentile(candidate_ms, 50)), 2),
+                'p95': round(float(np.percentile(candidate_ms, 95)), 2)
+            },
+            'speedup': round(float(np.median(reference_ms) / np.median(candidate_ms)), 2),
+            'passed': recall >= min_recall and precision >= min_recall
+        }
+
+    except Exception as e:
+        logger.error(f"Error in compare_backends: {str(e)}")
+        raise
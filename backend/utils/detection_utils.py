@@ -3,21 +3,46 @@ import numpy as np
 from ultralytics import YOLO
 import os
 import logging
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Callable, NamedTuple, Optional, Union
 import torch
 import time
+from config import Config
+from utils.video_pipeline import VideoPipeline
+from utils.video_sampling import iter_sampled_frames
+from utils.motion_gate import MotionGate
+from utils.inference_backends import load_backend_model
+from utils.tiling import tile_grid, nms
+from utils.adaptive_resolution import resolution_controller, ResolutionUsage
+from utils.metrics import time_stage, stage_seconds, frames_processed, frames_skipped
+from utils.annotation import annotation_renderer
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def load_model(model_path: str) -> YOLO:
-    """Load the YOLO model from the specified path."""
+def load_model(model_path: str, backend: Optional[str] = None) -> YOLO:
+    """Load the YOLO model from the specified path.
+
+    backend is one of inference_backends.BACKENDS (default Config.INFERENCE_BACKEND);
+    non-torch backends serve an exported copy of model_path.
+    """
     try:
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
         
-        logger.info(f"Loading model from: {model_path}")
+        backend = backend or Config.INFERENCE_BACKEND
+        logger.info(f"Loading model from: {model_path} (backend: {backend})")
+        
+        if backend != 'torch':
+            model = load_backend_model(
+                model_path,
+                backend,
+                imgsz=Config.EXPORT_IMGSZ,
+                int8=Config.INFERENCE_INT8,
+                calibration_dir=Config.INT8_CALIBRATION_DIR
+            )
+            logger.info("Model loaded successfully")
+            return model
         
         # Load the YOLO model
         model = YOLO(model_path)
@@ -35,62 +60,219 @@ def load_model(model_path: str) -> YOLO:
         logger.error(f"Error loading model: {str(e)}")
         raise
 
-def detect_weapons(model: YOLO, frame: np.ndarray, conf_threshold: float = 0.3) -> List[Dict[str, Any]]:
-    """Detect weapons in a single frame."""
+class BoxArrays(NamedTuple):
+    """Columnar detections for one image: one array per field instead of one dict per box."""
+    xyxy: np.ndarray  # (N, 4) float32
+    conf: np.ndarray  # (N,) float32
+    cls: np.ndarray  # (N,) int32
+
+EMPTY_BOXES = BoxArrays(
+    np.zeros((0, 4), dtype=np.float32),
+    np.zeros((0,), dtype=np.float32),
+    np.zeros((0,), dtype=np.int32)
+)
+
+def extract_boxes(result) -> BoxArrays:
+    """Pull all boxes out of an ultralytics result with one device transfer per field."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_BOXES
+    return BoxArrays(
+        boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+        boxes.conf.cpu().numpy().astype(np.float32, copy=False),
+        boxes.cls.cpu().numpy().astype(np.int32, copy=False)
+    )
+
+def boxes_to_detections(boxes: BoxArrays, names: Dict[int, str]) -> List[Dict[str, Any]]:
+    """Convert columnar boxes into the detection dicts used in API responses."""
+    return [
+        {
+            'class': names[class_id],
+            'confidence': confidence,
+            'bbox': bbox
+        }
+        for bbox, confidence, class_id in zip(boxes.xyxy.tolist(), boxes.conf.tolist(), boxes.cls.tolist())
+    ]
+
+def _result_to_detections(model: YOLO, result) -> List[Dict[str, Any]]:
+    """Convert a single ultralytics result into detection dicts."""
+    return boxes_to_detections(extract_boxes(result), model.names)
+
+def detect_boxes_batch(
+    model: YOLO,
+    frames: List[np.ndarray],
+    conf_threshold: float = 0.3,
+    imgsz: Optional[int] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> List[BoxArrays]:
+    """Run one forward pass over several frames and return columnar boxes per frame.
+
+    The forward pass and box extraction are recorded as the 'inference' and
+    'extract' stages; if timings is given, their seconds are also stored in it
+    (worker processes send them back with the results).
+    """
     try:
-        # Run inference
-        results = model(frame, conf=conf_threshold)
+        if not frames:
+            return []
         
-        # Process results
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = model.names[class_id]
-                
-                detections.append({
-                    'class': class_name,
-                    'confidence': confidence,
-                    'bbox': [float(x1), float(y1), float(x2), float(y2)]
-                })
+        # Schedulers and other model wrappers run the batch themselves
+        if hasattr(model, 'predict_boxes'):
+            return model.predict_boxes(list(frames), conf_threshold, imgsz)
+        
+        kwargs = {'conf': conf_threshold}
+        if imgsz is not None:
+            kwargs['imgsz'] = imgsz
         
-        return detections
+        # Run inference on the whole batch
+        with time_stage('inference') as forward:
+            results = model(list(frames), **kwargs)
+        
+        # Split results back per frame
+        with time_stage('extract') as extract:
+            batch_boxes = [extract_boxes(result) for result in results]
+        if timings is not None:
+            timings['inference'] = forward.elapsed
+            timings['extract'] = extract.elapsed
+        return batch_boxes
+        
+    except Exception as e:
+        logger.error(f"Error in detect_boxes_batch: {str(e)}")
+        raise
+
+def should_tile(frame: np.ndarray) -> bool:
+    """Whether a still is large enough that downscaling it to one model input would lose small objects"""
+    return Config.TILED_INFERENCE_ENABLED and max(frame.shape[:2]) >= Config.TILED_INFERENCE_MIN_SIDE
+
+def detect_boxes_tiled(
+    model: YOLO,
+    image: np.ndarray,
+    conf_threshold: float = 0.3,
+    tile_size: int = 640,
+    overlap: int = 128,
+    nms_threshold: float = 0.5
+) -> BoxArrays:
+    """Detect on overlapping tiles at native resolution and merge the boxes in image coordinates.
+
+    A downscaled pass over the whole image is added so objects larger than a
+    tile are still found. Tiles are batched; with a scheduler or worker pool
+    the chunks are submitted together so they run in parallel.
+    """
+    try:
+        height, width = image.shape[:2]
+        grid = tile_grid(height, width, tile_size, overlap)
+        tiles = [np.ascontiguousarray(image[y1:y2, x1:x2]) for x1, y1, x2, y2 in grid]
+        offsets = [(x1, y1) for x1, y1, _, _ in grid]
+        if Config.TILE_INCLUDE_FULL_IMAGE:
+            tiles.append(image)
+            offsets.append((0, 0))
+        
+        if hasattr(model, 'submit'):
+            chunk_size = Config.INFERENCE_MAX_BATCH_SIZE
+            futures = [
+                model.submit(tiles[i:i + chunk_size], conf_threshold, tile_size)
+                for i in range(0, len(tiles), chunk_size)
+            ]
+            tile_boxes = [boxes for future in futures for boxes in future.result()]
+        else:
+            tile_boxes = detect_boxes_batch(model, tiles, conf_threshold, tile_size)
+        
+        # Shift every tile's boxes into image coordinates
+        xyxy = np.concatenate([
+            boxes.xyxy + np.array([x, y, x, y], dtype=np.float32)
+            for boxes, (x, y) in zip(tile_boxes, offsets)
+        ])
+        conf = np.concatenate([boxes.conf for boxes in tile_boxes])
+        cls = np.concatenate([boxes.cls for boxes in tile_boxes])
+        if not len(conf):
+            return EMPTY_BOXES
+        
+        keep = nms(xyxy, conf, cls, nms_threshold, Config.TILE_NMS_METRIC)
+        return BoxArrays(xyxy[keep], conf[keep], cls[keep])
+        
+    except Exception as e:
+        logger.error(f"Error in detect_boxes_tiled: {str(e)}")
+        raise
+
+def detect_weapons_batch(
+    model: YOLO,
+    frames: List[np.ndarray],
+    conf_threshold: float = 0.3,
+    imgsz: Optional[int] = None,
+    tiled: Optional[bool] = False
+) -> List[List[Dict[str, Any]]]:
+    """Detect weapons in several frames with a single forward pass.
+
+    tiled=True runs every frame through detect_boxes_tiled(); tiled=None does
+    so only for frames above Config.TILED_INFERENCE_MIN_SIDE.
+    The latency of the untiled pass is reported to the resolution controller per frame.
+    Returns one detection list per input frame, in input order.
+    """
+    try:
+        use_tiles = [tiled if tiled is not None else should_tile(frame) for frame in frames]
+        untiled = [frame for frame, tile in zip(frames, use_tiles) if not tile]
+        start = time.perf_counter()
+        batch_boxes = detect_boxes_batch(model, untiled, conf_threshold, imgsz)
+        if untiled:
+            # End to end, queueing included: the controller steps down when callers wait too long.
+            # The 'inference' stage only covers the forward pass itself (see detect_boxes_batch)
+            elapsed = time.perf_counter() - start
+            resolution_controller.observe(elapsed * 1000.0, imgsz, getattr(model, 'queue_depth', 0), frames=len(untiled))
+        frames_processed.inc(len(frames))
+        batch_boxes = iter(batch_boxes)
+        return [
+            boxes_to_detections(
+                detect_boxes_tiled(
+                    model, frame, conf_threshold,
+                    tile_size=Config.TILE_SIZE,
+                    overlap=Config.TILE_OVERLAP,
+                    nms_threshold=Config.TILE_NMS_THRESHOLD
+                ) if tile else next(batch_boxes),
+                model.names
+            )
+            for frame, tile in zip(frames, use_tiles)
+        ]
+        
+    except Exception as e:
+        logger.error(f"Error in detect_weapons_batch: {str(e)}")
+        raise
+
+def detect_weapons(
+    model: YOLO,
+    frame: np.ndarray,
+    conf_threshold: float = 0.3,
+    tiled: Optional[bool] = None,
+    imgsz: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Detect weapons in a single frame, tiling large stills unless tiled is False."""
+    try:
+        return detect_weapons_batch(model, [frame], conf_threshold=conf_threshold, imgsz=imgsz, tiled=tiled)[0]
         
     except Exception as e:
         logger.error(f"Error in detect_weapons: {str(e)}")
         raise
 
+def passes_motion_gate(motion_gate: Optional[MotionGate], frame: np.ndarray) -> bool:
+    """Whether the detector should run on a frame, counting the frames the gate rejects."""
+    if motion_gate is None or motion_gate.check(frame):
+        return True
+    frames_skipped.labels('motion_gate').inc()
+    return False
+
 def process_detection(
     model: YOLO,
     image: np.ndarray,
     conf_threshold: float = 0.3,
-    max_size: int = 640
+    max_size: Optional[int] = None
 ) -> Dict[str, Any]:
-    """Process an image for weapon detection."""
+    """Process an image for weapon detection.
+
+    max_size defaults to the adaptive resolution controller's current size.
+    """
     try:
-        # Run inference
-        results = model(image, conf=conf_threshold, imgsz=max_size)
+        max_size = max_size or resolution_controller.current()
         
-        # Process results
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = model.names[class_id]
-                
-                detections.append({
-                    'class': class_name,
-                    'confidence': confidence,
-                    'bbox': [float(x1), float(y1), float(x2), float(y2)]
-                })
+        # Run inference
+        detections = detect_weapons(model, image, conf_threshold, tiled=False, imgsz=max_size)
         
         # Draw detections on the image
         processed_image = draw_detections(image, detections)
@@ -102,7 +284,8 @@ def process_detection(
         
         return {
             'detections': detections,
-            'processed_image_path': processed_image_path
+            'processed_image_path': processed_image_path,
+            'imgsz': max_size
         }
         
     except Exception as e:
@@ -113,10 +296,23 @@ def process_video_detection(
     model: YOLO,
     cap: cv2.VideoCapture,
     conf_threshold: float = 0.3,
-    max_size: int = 640
+    max_size: Optional[int] = None,
+    batch_size: int = Config.INFERENCE_BATCH_SIZE,
+    pipelined: bool = Config.VIDEO_PIPELINE_ENABLED,
+    motion_gate: Optional[MotionGate] = None
 ) -> Dict[str, Any]:
-    """Process a video for weapon detection."""
+    """Process a video for weapon detection.
+
+    If a motion_gate is given, frames it rejects are written without running
+    the detector on them. Without max_size, each batch runs at the adaptive
+    resolution controller's current size.
+    """
     try:
+        usage = ResolutionUsage(resolution_controller)
+        
+        def infer(frames):
+            return detect_weapons_batch(model, frames, conf_threshold, imgsz=usage.next(len(frames), max_size))
+        
         # Get video properties
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -149,51 +345,77 @@ def process_video_detection(
         if not writer or not writer.isOpened():
             raise Exception("Failed to create video writer with any codec")
         
-        # Process video frames
+        if pipelined:
+            detections = []
+            pipeline = VideoPipeline(
+                cap,
+                writer,
+                infer_fn=infer,
+                # Decoded frames belong to the pipeline, so they are annotated in place
+                annotate_fn=lambda frame, frame_detections: draw_detections(frame, frame_detections, out=frame),
+                batch_size=batch_size,
+                queue_size=Config.VIDEO_PIPELINE_QUEUE_SIZE,
+                should_infer=lambda index, frame: passes_motion_gate(motion_gate, frame),
+                on_detections=lambda index, frame_detections: detections.extend(frame_detections)
+            )
+            try:
+                stage_timings = pipeline.run()
+            finally:
+                writer.release()
+                cap.release()
+            
+            logger.debug(f"Pipelined video processing completed. Stage timings: {stage_timings}")
+            
+            result = {
+                'detections': detections,
+                'processed_video_path': output_path,
+                'stage_timings': stage_timings,
+                'imgsz': usage.to_dict()
+            }
+            if motion_gate is not None:
+                result['motion_gate'] = motion_gate.stats()
+            return result
+        
+        # Process video frames in batches
         frame_count = 0
         detections = []
         
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            batch = []
+            while len(batch) < batch_size:
+                with time_stage('decode'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                batch.append(frame)
+            
+            if not batch:
                 break
             
             try:
-                # Run inference on frame
-                results = model(frame, conf=conf_threshold, imgsz=max_size)
-                
-                # Process results
-                frame_detections = []
-                for result in results:
-                    boxes = result.boxes
-                    for box in boxes:
-                        # Get box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = float(box.conf[0].cpu().numpy())
-                        class_id = int(box.cls[0].cpu().numpy())
-                        class_name = model.names[class_id]
-                        
-                        frame_detections.append({
-                            'class': class_name,
-                            'confidence': confidence,
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)]
-                        })
-                
-                # Draw detections on frame
-                processed_frame = draw_detections(frame, frame_detections)
-                
-                # Write processed frame
-                writer.write(processed_frame)
+                # Run inference on the frames that pass the motion gate
+                gated = [passes_motion_gate(motion_gate, frame) for frame in batch]
+                gated_frames = [frame for frame, keep in zip(batch, gated) if keep]
+                gated_detections = iter(infer(gated_frames) if gated_frames else [])
+                batch_detections = [next(gated_detections) if keep else [] for keep in gated]
                 
-                # Add frame detections to overall detections
-                detections.extend(frame_detections)
-                
-                frame_count += 1
-                if frame_count % 10 == 0:  # Log progress every 10 frames
-                    logger.debug(f"Processed {frame_count}/{total_frames} frames")
+                for frame, frame_detections in zip(batch, batch_detections):
+                    # Draw detections on frame
+                    processed_frame = draw_detections(frame, frame_detections, out=frame)
+                    
+                    # Write processed frame
+                    with time_stage('encode'):
+                        writer.write(processed_frame)
+                    
+                    # Add frame detections to overall detections
+                    detections.extend(frame_detections)
+                    
+                    frame_count += 1
+                    if frame_count % 10 == 0:  # Log progress every 10 frames
+                        logger.debug(f"Processed {frame_count}/{total_frames} frames")
                 
             except Exception as e:
-                logger.error(f"Error processing frame {frame_count}: {str(e)}")
+                logger.error(f"Error processing frames {frame_count}-{frame_count + len(batch) - 1}: {str(e)}")
                 continue
         
         # Release resources
@@ -202,45 +424,104 @@ def process_video_detection(
         
         logger.debug(f"Video processing completed. Processed {frame_count} frames")
         
-        return {
+        result = {
             'detections': detections,
-            'processed_video_path': output_path
+            'processed_video_path': output_path,
+            'imgsz': usage.to_dict()
         }
+        if motion_gate is not None:
+            result['motion_gate'] = motion_gate.stats()
+        return result
         
     except Exception as e:
         logger.error(f"Error in process_video_detection: {str(e)}")
         raise
 
-def draw_detections(image: np.ndarray, detections: List[Dict[str, Any]]) -> np.ndarray:
-    """Draw bounding boxes and labels on the image."""
+def detect_video_sparse(
+    model: YOLO,
+    cap: cv2.VideoCapture,
+    interval: int = Config.VIDEO_SAMPLE_INTERVAL,
+    conf_threshold: float = 0.3,
+    max_size: Optional[int] = None,
+    batch_size: int = Config.INFERENCE_BATCH_SIZE,
+    on_detections: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+    motion_gate: Optional[MotionGate] = None
+) -> Dict[str, Any]:
+    """Detect weapons on every interval-th frame only, without decoding the others.
+
+    Nothing is drawn or re-encoded; only the detections are returned. Without
+    max_size, each batch runs at the adaptive resolution controller's current size.
+    """
     try:
-        # Make a copy of the image
-        img = image.copy()
+        usage = ResolutionUsage(resolution_controller)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames_analyzed = 0
+        frames_sampled = 0
+        frame_detections = []
         
-        for det in detections:
-            x1, y1, x2, y2 = det['bbox']
-            class_name = det['class']
-            confidence = det['confidence']
-            
-            # Draw bounding box
-            cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            
-            # Create label
-            label = f"{class_name} {confidence:.2f}"
-            
-            # Get text size
-            (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            
-            # Draw background rectangle for text
-            cv2.rectangle(img, (int(x1), int(y1) - text_height - 4), 
-                         (int(x1) + text_width, int(y1)), (0, 255, 0), -1)
-            
-            # Draw text
-            cv2.putText(img, label, (int(x1), int(y1) - 4),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+        def flush(batch):
+            batch_detections = detect_weapons_batch(
+                model, [frame for _, frame in batch], conf_threshold, imgsz=usage.next(len(batch), max_size)
+            )
+            for (index, _), detections in zip(batch, batch_detections):
+                if on_detections:
+                    on_detections(index, detections)
+                if detections:
+                    frame_detections.append({
+                        'frame': index,
+                        'timestamp': index / fps if fps else None,
+                        'detections': detections
+                    })
+        
+        batch = []
+        for index, frame in iter_sampled_frames(cap, interval, Config.SPARSE_SEEK_MIN_INTERVAL):
+            frames_sampled += 1
+            if not passes_motion_gate(motion_gate, frame):
+                continue
+            batch.append((index, frame))
+            frames_analyzed += 1
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        
+        cap.release()
+        frames_skipped.labels('sampling').inc(max(0, total_frames - frames_sampled))
+        
+        logger.debug(f"Sparse video analysis completed. Analyzed {frames_analyzed}/{total_frames} frames")
         
-        return img
+        result = {
+            'total_frames': total_frames,
+            'frames_analyzed': frames_analyzed,
+            'frame_detections': frame_detections,
+            'imgsz': usage.to_dict()
+        }
+        if motion_gate is not None:
+            result['motion_gate'] = motion_gate.stats()
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in detect_video_sparse: {str(e)}")
+        raise
+
+def draw_detections(
+    image: np.ndarray,
+    detections: List[Dict[str, Any]],
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Draw bounding boxes and labels on the image.
+
+    Draws on a copy unless out is given: pass out=image to annotate in place,
+    or a preallocated buffer of the same shape to reuse it across frames.
+    """
+    try:
+        start = time.perf_counter()
+        annotated = annotation_renderer.draw(image, detections, out=out)
+        stage_seconds.labels('draw').observe(time.perf_counter() - start)
+        return annotated
         
     except Exception as e:
         logger.error(f"Error in draw_detections: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
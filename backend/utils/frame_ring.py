@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SlotHandle(NamedTuple):
+    """Picklable reference to a frame stored in a FrameRing slot"""
+    ring: str  # Shared memory block name
+    index: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+class FrameRing:
+    """Fixed-size frame slots in one shared memory block.
+
+    The creating process owns reservation: reserve() hands out a free slot,
+    release() returns it. Other processes attach() by name and only read and
+    write slot contents through handles, so a frame crosses the process
+    boundary as a SlotHandle of a few dozen bytes instead of a pickled array.
+    """
+
+    def __init__(self, num_slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._base = np.frombuffer(self.shm.buf, dtype=np.uint8)
+        self._address = self._base.ctypes.data
+
+        self._free = deque(range(num_slots))
+        self._cond = threading.Condition()
+        self.reservations = 0
+        self.failed_reservations = 0
+        self.peak_in_use = 0
+
+    @classmethod
+    def attach(cls, name: str, num_slots: int, slot_bytes: int) -> 'FrameRing':
+        """Open an existing ring from another process"""
+        return cls(num_slots, slot_bytes, name=name)
+
+    def reserve(self, shape: Tuple[int, ...], dtype=np.uint8, timeout: Optional[float] = None) -> Optional[SlotHandle]:
+        """Take a free slot for a frame of this shape; waits up to timeout (None: forever, 0: not at all)"""
+        dtype = np.dtype(dtype)
+        if int(np.prod(shape)) * dtype.itemsize > self.slot_bytes:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._free:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.failed_reservations += 1
+                    return None
+                self._cond.wait(remaining)
+            index = self._free.popleft()
+            self.reservations += 1
+            self.peak_in_use = max(self.peak_in_use, self.num_slots - len(self._free))
+        return SlotHandle(self.name, index, tuple(shape), dtype.str)
+
+    def release(self, handle: SlotHandle):
+        with self._cond:
+            self._free.append(handle.index)
+            self._cond.notify()
+
+    def array(self, handle: SlotHandle) -> np.ndarray:
+        """Zero-copy view of a slot's frame"""
+        return np.ndarray(handle.shape, np.dtype(handle.dtype), buffer=self.shm.buf, offset=handle.index * self.slot_bytes)
+
+    def write(self, frame: np.ndarray, timeout: Optional[float] = None) -> Optional[SlotHandle]:
+        """Reserve a slot and copy frame into it"""
+        handle = self.reserve(frame.shape, frame.dtype, timeout)
+        if handle is not None:
+            self.array(handle)[...] = frame
+        return handle
+
+    def handle_for(self, frame: np.ndarray) -> Optional[SlotHandle]:
+        """The handle of a frame that is itself a whole-slot view of this ring, else None"""
+        if not isinstance(frame, np.ndarray) or not frame.flags.c_contiguous:
+            return None
+        offset = frame.__array_interface__['data'][0] - self._address
+        if offset < 0 or offset >= self.num_slots * self.slot_bytes or offset % self.slot_bytes:
+            return None
+        if frame.nbytes > self.slot_bytes:
+            return None
+        return SlotHandle(self.name, offset // self.slot_bytes, frame.shape, frame.dtype.str)
+
+    def close(self):
+        """Detach; the owner also frees the block. Views into the ring must be gone by now."""
+        del self._base
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning(f"Frame ring {self.name} still has live views; leaving it mapped")
+            return
+        if self.owner:
+            self.shm.unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'slots': self.num_slots,
+                'slot_bytes': self.slot_bytes,
+                'in_use': self.num_slots - len(self._free),
+                'peak_in_use': self.peak_in_use,
+                'reservations': self.reservations,
+                'failed_reservations': self.failed_reservations
+            }
@@ -0,0 +1,149 @@
+import glob
+import logging
+import os
+import tempfile
+from typing import List, Optional
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 'torch' serves best.pt directly; the others serve an exported copy through
+# ultralytics' runtime wrappers, so predictions keep the same Results format.
+# onnx needs onnxruntime; openvino needs openvino (and nncf for INT8).
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+def exported_model_path(model_path: str, backend: str, int8: bool = False) -> str:
+    """Where the exported copy of model_path lives (next to it, named as ultralytics names exports)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    if backend == 'torch':
+        return model_path
+    stem = os.path.splitext(model_path)[0] + ('_int8' if int8 else '')
+    if backend == 'onnx':
+        return stem + '.onnx'
+    return stem + '_openvino_model'
+
+def calibration_images(calibration_dir: Optional[str], limit: Optional[int] = None) -> List[str]:
+    if not calibration_dir or not os.path.isdir(calibration_dir):
+        return []
+    paths = sorted(
+        path for pattern in IMAGE_EXTENSIONS
+        for path in glob.glob(os.path.join(calibration_dir, '**', pattern), recursive=True)
+    )
+    return paths[:limit] if limit else paths
+
+def _is_stale(exported_path: str, model_path: str) -> bool:
+    return not os.path.exists(exported_path) or os.path.getmtime(exported_path) < os.path.getmtime(model_path)
+
+def letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """Resize keeping aspect ratio and pad to imgsz x imgsz, as ultralytics does for exported models"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top = (imgsz - new_height) // 2
+    left = (imgsz - new_width) // 2
+    return cv2.copyMakeBorder(
+        resized, top, imgsz - new_height - top, left, imgsz - new_width - left,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+
+def _quantize_onnx(fp32_path: str, int8_path: str, image_paths: List[str], imgsz: int):
+    """Static INT8 post-training quantization with onnxruntime, calibrated on image_paths"""
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is None:
+                    continue
+                blob = letterbox(image, imgsz)[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+                return {input_name: np.ascontiguousarray(blob, dtype=np.float32)[None] / 255.0}
+            return None
+
+    quantize_static(
+        fp32_path, int8_path, ImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    # ultralytics reads class names, stride and imgsz from the model metadata
+    int8_model = onnx.load(int8_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, int8_path)
+
+def export_model(
+    model_path: str,
+    backend: str,
+    imgsz: int = 640,
+    int8: bool = False,
+    calibration_dir: Optional[str] = None,
+    force: bool = False
+) -> str:
+    """Export model_path for a backend unless an up-to-date export exists; returns the exported path"""
+    target = exported_model_path(model_path, backend, int8)
+    if backend == 'torch' or (not force and not _is_stale(target, model_path)):
+        return target
+
+    image_paths = []
+    if int8:
+        image_paths = calibration_images(calibration_dir, Config.INT8_CALIBRATION_MAX_IMAGES)
+        if not image_paths:
+            raise ValueError(f"INT8 export needs calibration images, none found in: {calibration_dir}")
+
+    logger.info(f"Exporting {model_path} to {backend}{' INT8' if int8 else ''}")
+    try:
+        model = YOLO(model_path)
+        if backend == 'onnx':
+            # Dynamic axes so batched requests and other image sizes keep working
+            fp32_path = model.export(format='onnx', imgsz=imgsz, dynamic=True)
+            if int8:
+                _quantize_onnx(fp32_path, target, image_paths, imgsz)
+        else:
+            kwargs = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True}
+            if not int8:
+                model.export(**kwargs)
+            else:
+                # OpenVINO quantization reads a dataset yaml; labels are not needed for calibration
+                with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as data_file:
+                    yaml.safe_dump({
+                        'path': os.path.abspath(calibration_dir),
+                        'train': '.',
+                        'val': '.',
+                        'names': model.names
+                    }, data_file)
+                try:
+                    model.export(int8=True, data=data_file.name, **kwargs)
+                finally:
+                    os.remove(data_file.name)
+        logger.info(f"Exported model to: {target}")
+        return target
+
+    except Exception as e:
+        logger.error(f"Error exporting model to {backend}: {str(e)}")
+        raise
+
+def load_backend_model(model_path: str, backend: str, imgsz: int = 640, int8: bool = False,
+                       calibration_dir: Optional[str] = None) -> YOLO:
+    """Load a non-torch backend, exporting best.pt first when needed"""
+    runtime_path = export_model(model_path, backend, imgsz=imgsz, int8=int8, calibration_dir=calibration_dir)
+    return YOLO(runtime_path, task='detect')
@@ -0,0 +1,345 @@
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import psutil
+from config import Config
+from utils.frame_ring import FrameRing, SlotHandle
+from utils.metrics import stage_seconds
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def default_pool_size(threads_per_worker: int) -> int:
+    """One worker per `threads_per_worker` physical cores available to this process"""
+    physical = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    if hasattr(os, 'sched_getaffinity'):
+        logical = psutil.cpu_count(logical=True) or physical
+        # Scale physical cores down when the process is restricted to a subset of CPUs (containers, taskset)
+        physical = max(1, physical * len(os.sched_getaffinity(0)) // logical)
+    return max(1, physical // max(1, threads_per_worker))
+
+def cpu_slices(num_workers: int) -> List[Optional[List[int]]]:
+    """Split the CPUs this process may use into one disjoint set per worker"""
+    if not hasattr(os, 'sched_getaffinity'):
+        return [None] * num_workers
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < num_workers:
+        return [None] * num_workers
+    size = len(cpus) // num_workers
+    return [cpus[i * size:(i + 1) * size] for i in range(num_workers)]
+
+def pack_frames(frames: List[np.ndarray]) -> Tuple[shared_memory.SharedMemory, List[tuple]]:
+    """Copy frames into one new shared memory segment; returns it with each frame's (shape, dtype, offset)"""
+    frames = [np.ascontiguousarray(frame) for frame in frames]
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(frame.nbytes for frame in frames)))
+    layout, offset = [], 0
+    for frame in frames:
+        np.ndarray(frame.shape, frame.dtype, buffer=shm.buf, offset=offset)[...] = frame
+        layout.append((frame.shape, frame.dtype.str, offset))
+        offset += frame.nbytes
+    return shm, layout
+
+def _worker_main(index, model_path, backend, threads, cpus, ring_spec, task_queue, result_queue):
+    """Worker process: pin itself, load its own model and serve detection tasks until it gets None"""
+    # Thread pools read these when torch / OpenCV / onnxruntime initialize
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    try:
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        import cv2
+        import torch
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(1)
+        from utils.detection_utils import load_model, detect_boxes_batch
+        model = load_model(model_path, backend=backend)
+        if Config.MODEL_WARMUP:
+            size = Config.MODEL_WARMUP_SIZE
+            detect_boxes_batch(model, [np.zeros((size, size, 3), dtype=np.uint8)], imgsz=size)
+        ring = FrameRing.attach(*ring_spec) if ring_spec else None
+        result_queue.put(('ready', index, None, dict(model.names)))
+    except Exception as e:
+        result_queue.put(('error', index, None, str(e)))
+        return
+
+    # The predictor keeps references to the last batch, so a segment can only be
+    # closed once a later task has replaced them
+    attached = []
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, shm_name, refs, conf_threshold, imgsz = task
+        try:
+            shm = None
+            if shm_name:
+                shm = shared_memory.SharedMemory(name=shm_name)
+                attached.append(shm)
+            # Ring slots are read in place; anything else was packed into the task's own segment
+            frames = [
+                ring.array(ref) if isinstance(ref, SlotHandle)
+                else np.ndarray(ref[0], ref[1], buffer=shm.buf, offset=ref[2])
+                for ref in refs
+            ]
+            # This process's metrics are never scraped, so stage timings go back with the results
+            timings = {}
+            results = detect_boxes_batch(model, frames, conf_threshold, imgsz, timings=timings)
+            del frames
+            result_queue.put(('result', index, task_id, (results, timings)))
+        except Exception as e:
+            result_queue.put(('failed', index, task_id, str(e)))
+
+        still_attached = []
+        for segment in attached:
+            try:
+                segment.close()
+            except BufferError:
+                still_attached.append(segment)
+        attached = still_attached
+
+    # Drop the predictor's references to the last frames before unmapping
+    del model
+    for segment in attached:
+        segment.close()
+    if ring is not None:
+        ring.close()
+
+class InferenceWorkerPool:
+    """Runs detection in separate processes, each with its own model and pinned CPUs.
+
+    Frames travel through shared memory; only slot handles or layouts and the
+    (small) BoxArrays results are pickled. Frames that already live in
+    frame_ring (e.g. decoded straight into a slot) are handed over without a
+    copy; others are copied into a free slot, or into a per-task segment when
+    the ring is full or the frame does not fit. Behaves like a model for detect_boxes_batch()
+    and the InferenceScheduler (exposes names, predict_boxes() and submit()).
+    """
+
+    def __init__(self, model_path: str, backend: str = 'torch', num_workers: int = 0,
+                 threads_per_worker: int = 1, pin_cpus: bool = True, ring_slots: int = 16,
+                 ring_slot_bytes: int = 1920 * 1080 * 3):
+        self.model_path = model_path
+        self.backend = backend
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.num_workers = num_workers or default_pool_size(self.threads_per_worker)
+        self.pin_cpus = pin_cpus
+        self.ring_slots = ring_slots
+        self.ring_slot_bytes = ring_slot_bytes
+        self.frame_ring: Optional[FrameRing] = None
+        self.names: Dict[int, str] = {}
+
+        # spawn: workers must not inherit the server's threads or torch state
+        self._context = mp.get_context('spawn')
+        self._result_queue = self._context.Queue()
+        self._workers: List[Dict[str, Any]] = []
+        self._tasks: Dict[int, tuple] = {}  # task_id -> (future, shm, slots to release, worker index)
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self.bytes_copied = 0
+        self.zero_copy_frames = 0
+
+    @property
+    def max_in_flight(self) -> int:
+        return self.num_workers
+
+    @property
+    def queue_depth(self) -> int:
+        """Tasks submitted beyond what the workers are running"""
+        with self._lock:
+            return max(0, len(self._tasks) - self.num_workers)
+
+    def start(self, timeout: float = 120.0):
+        """Spawn the workers and wait until each has loaded its model"""
+        with self._lock:
+            if self._started:
+                return
+            slices = cpu_slices(self.num_workers) if self.pin_cpus else [None] * self.num_workers
+            ring_spec = None
+            if self.ring_slots > 0:
+                self.frame_ring = FrameRing(self.ring_slots, self.ring_slot_bytes)
+                ring_spec = (self.frame_ring.name, self.ring_slots, self.ring_slot_bytes)
+            for index, cpus in enumerate(slices):
+                task_queue = self._context.Queue()
+                process = self._context.Process(
+                    target=_worker_main,
+                    args=(index, self.model_path, self.backend, self.threads_per_worker, cpus,
+                          ring_spec, task_queue, self._result_queue),
+                    name=f'inference-worker-{index}',
+                    daemon=True
+                )
+                process.start()
+                self._workers.append({'process': process, 'queue': task_queue, 'cpus': cpus, 'in_flight': 0, 'tasks': 0})
+
+            deadline = time.monotonic() + timeout
+            ready = 0
+            while ready < self.num_workers:
+                try:
+                    kind, index, _, payload = self._result_queue.get(timeout=max(0.1, deadline - time.monotonic()))
+                except queue.Empty:
+                    self._abort_start()
+                    raise TimeoutError(f"Inference workers did not start within {timeout}s")
+                if kind == 'error':
+                    self._abort_start()
+                    raise RuntimeError(f"Inference worker {index} failed to load the model: {payload}")
+                self.names = payload
+                ready += 1
+
+            threading.Thread(target=self._collect_results, name='inference-pool-results', daemon=True).start()
+            self._started = True
+        logger.info(f"Started {self.num_workers} inference workers with {self.threads_per_worker} threads each")
+
+    def submit(self, frames: List[np.ndarray], conf_threshold: float = 0.3, imgsz: Optional[int] = None) -> Future:
+        """Queue frames on the least busy worker; the Future resolves to one BoxArrays per frame"""
+        if not self._started:
+            self.start()
+        future = Future()
+        if not frames:
+            future.set_result([])
+            return future
+
+        refs, owned, loose, copied = [], [], [], 0
+        for position, frame in enumerate(frames):
+            handle = None
+            if self.frame_ring is not None:
+                # Caller-owned slots (zero copy) are released by the caller, our copies by _finish()
+                handle = self.frame_ring.handle_for(frame)
+                if handle is None:
+                    handle = self.frame_ring.write(frame, timeout=0)
+                    if handle is not None:
+                        owned.append(handle)
+                        copied += frame.nbytes
+            if handle is None:
+                loose.append(position)
+            refs.append(handle)
+        shm = None
+        if loose:
+            shm, layout = pack_frames([frames[position] for position in loose])
+            copied += shm.size
+            for position, entry in zip(loose, layout):
+                refs[position] = entry
+
+        with self._lock:
+            alive = [i for i, worker in enumerate(self._workers) if worker['process'].is_alive()]
+            index = min(alive, key=lambda i: self._workers[i]['in_flight']) if alive else None
+            if index is not None:
+                task_id = next(self._task_ids)
+                self._tasks[task_id] = (future, shm, owned, index)
+                self._workers[index]['in_flight'] += 1
+                self._workers[index]['tasks'] += 1
+                self.bytes_copied += copied
+                self.zero_copy_frames += len(frames) - len(owned) - len(loose)
+        if index is None:
+            self._release(shm, owned)
+            raise RuntimeError("No inference workers are running")
+        self._workers[index]['queue'].put((task_id, shm.name if shm else None, refs, conf_threshold, imgsz))
+        return future
+
+    def predict_boxes(self, frames: List[np.ndarray], conf_threshold: float = 0.3, imgsz: Optional[int] = None):
+        """Blocking submit(), called by detect_boxes_batch()"""
+        return self.submit(frames, conf_threshold, imgsz).result()
+
+    def _release(self, shm, owned):
+        for handle in owned:
+            self.frame_ring.release(handle)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def _finish(self, task_id: int) -> Optional[Future]:
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return None
+            future, shm, owned, index = task
+            self._workers[index]['in_flight'] -= 1
+        self._release(shm, owned)
+        return future
+
+    def _collect_results(self):
+        while True:
+            try:
+                kind, index, task_id, payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._fail_dead_workers()
+                continue
+            except (EOFError, OSError):
+                return
+            future = self._finish(task_id)
+            if future is None:
+                continue
+            if kind == 'result':
+                results, timings = payload
+                for stage, seconds in timings.items():
+                    stage_seconds.labels(stage).observe(seconds)
+                future.set_result(results)
+            else:
+                logger.error(f"Error in inference worker {index}: {payload}")
+                future.set_exception(RuntimeError(payload))
+
+    def _fail_dead_workers(self):
+        """Fail the tasks of workers that exited without answering"""
+        with self._lock:
+            dead = {i for i, worker in enumerate(self._workers) if not worker['process'].is_alive()}
+            orphaned = [task_id for task_id, task in self._tasks.items() if task[-1] in dead]
+        for task_id in orphaned:
+            future = self._finish(task_id)
+            if future is not None:
+                future.set_exception(RuntimeError("Inference worker exited"))
+
+    def _abort_start(self):
+        self._stop_workers()
+        self._workers = []
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+
+    def _stop_workers(self):
+        for worker in self._workers:
+            worker['queue'].put(None)
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+
+    def shutdown(self):
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        self._stop_workers()
+        self._fail_dead_workers()
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'threads_per_worker': self.threads_per_worker,
+                'backend': self.backend,
+                'bytes_copied': self.bytes_copied,
+                'zero_copy_frames': self.zero_copy_frames,
+                'frame_ring': self.frame_ring.stats() if self.frame_ring else None,
+                'in_flight': sum(worker['in_flight'] for worker in self._workers),
+                'per_worker': [
+                    {
+                        'pid': worker['process'].pid,
+                        'alive': worker['process'].is_alive(),
+                        'cpus': worker['cpus'],
+                        'tasks': worker['tasks'],
+                        'in_flight': worker['in_flight']
+                    }
+                    for worker in self._workers
+                ]
+            }
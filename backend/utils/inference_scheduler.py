@@ -0,0 +1,256 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import Config
+from utils.detection_utils import BoxArrays, detect_boxes_batch
+from utils.model_registry import model_registry
+from utils.inference_pool import InferenceWorkerPool
+from utils.metrics import Histogram, registry, stage_seconds, inference_batch_frames
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Request:
+    __slots__ = ('frames', 'conf_threshold', 'imgsz', 'future', 'enqueued_at')
+
+    def __init__(self, frames, conf_threshold, imgsz):
+        self.frames = frames
+        self.conf_threshold = conf_threshold
+        self.imgsz = imgsz
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def key(self):
+        # Only requests with identical inference arguments can share a forward pass
+        return (self.conf_threshold, self.imgsz)
+
+class InferenceScheduler:
+    """Collects concurrent detection requests and runs them as one batched forward pass.
+
+    A batch is dispatched once it holds max_batch_size frames or the oldest
+    request has waited window_ms. Callers get their own slice of the results
+    through a Future. Behaves like a model for detect_boxes_batch() and
+    detect_weapons_batch() (exposes names and predict_boxes()).
+
+    If the wrapped model has submit() (the process pool), batches are handed
+    off without waiting, up to its max_in_flight at a time.
+    """
+
+    QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+
+    def __init__(self, model, max_batch_size: int = 8, window_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000.0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._async = hasattr(model, 'submit')
+        self._slots = threading.Semaphore(getattr(model, 'max_in_flight', 1) if self._async else 1)
+
+        self.queue_wait_ms = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+        self.batch_size = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.batches = 0
+        self.requests = 0
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def frame_ring(self):
+        """Shared memory ring of the wrapped worker pool, if any, so callers can decode into it"""
+        return getattr(self.model, 'frame_ring', None)
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a batch, plus any queued in the wrapped pool"""
+        with self._cond:
+            pending = len(self._pending)
+        return pending + getattr(self.model, 'queue_depth', 0)
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='inference-scheduler', daemon=True)
+                self._thread.start()
+
+    def submit(self, frames: List[np.ndarray], conf_threshold: float = 0.3, imgsz: Optional[int] = None) -> Future:
+        """Queue frames for detection; the Future resolves to one BoxArrays per frame"""
+        if self._thread is None:
+            self.start()
+        request = _Request(list(frames), conf_threshold, imgsz)
+        if not request.frames:
+            request.future.set_result([])
+            return request.future
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def predict_boxes(self, frames: List[np.ndarray], conf_threshold: float = 0.3, imgsz: Optional[int] = None) -> List[BoxArrays]:
+        """Blocking submit(), called by detect_boxes_batch()"""
+        return self.submit(frames, conf_threshold, imgsz).result()
+
+    def _collect(self) -> List[_Request]:
+        """Wait for a full batch or the window to close, then take compatible requests in arrival order"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            first = self._pending[0]
+            deadline = first.enqueued_at + self.window
+            while True:
+                queued_frames = sum(len(r.frames) for r in self._pending if r.key == first.key)
+                remaining = deadline - time.monotonic()
+                if queued_frames >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, skipped, frames = [], deque(), 0
+            while self._pending:
+                request = self._pending.popleft()
+                if request.key != first.key or (batch and frames + len(request.frames) > self.max_batch_size):
+                    skipped.append(request)
+                    continue
+                batch.append(request)
+                frames += len(request.frames)
+            # Requests left out keep their place at the front of the queue
+            self._pending = skipped
+            return batch
+
+    def _loop(self):
+        while True:
+            # Requests keep accumulating into the next batch while all slots are busy
+            self._slots.acquire()
+            batch = self._collect()
+            started = time.monotonic()
+            frames = [frame for request in batch for frame in request.frames]
+            queue_wait = stage_seconds.labels('queue_wait')
+            for request in batch:
+                self.queue_wait_ms.observe((started - request.enqueued_at) * 1000.0)
+                queue_wait.observe(started - request.enqueued_at)
+            self.batch_size.observe(len(frames))
+            inference_batch_frames.observe(len(frames))
+
+            first = batch[0]
+            try:
+                if self._async:
+                    future = self.model.submit(frames, first.conf_threshold, first.imgsz)
+                    future.add_done_callback(lambda done, batch=batch: self._complete(batch, done))
+                    continue
+                results = detect_boxes_batch(self.model, frames, first.conf_threshold, first.imgsz)
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+            self._deliver(batch, results)
+
+    def _complete(self, batch: List[_Request], future: Future):
+        error = future.exception()
+        if error is not None:
+            self._fail(batch, error)
+        else:
+            self._deliver(batch, future.result())
+
+    def _fail(self, batch: List[_Request], error: BaseException):
+        self._slots.release()
+        logger.error(f"Error in inference scheduler batch: {str(error)}")
+        for request in batch:
+            request.future.set_exception(error)
+
+    def _deliver(self, batch: List[_Request], results: List[BoxArrays]):
+        self._slots.release()
+        offset = 0
+        for request in batch:
+            request.future.set_result(results[offset:offset + len(request.frames)])
+            offset += len(request.frames)
+        with self._cond:
+            self.batches += 1
+            self.requests += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+            batches, requests = self.batches, self.requests
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_batch_size': self.max_batch_size,
+            'pending': pending,
+            'batches': batches,
+            'requests': requests,
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            'batch_size': self.batch_size.snapshot()
+        }
+
+# One scheduler (and worker pool, if enabled) per model version
+_schedulers: Dict[str, InferenceScheduler] = {}
+_pools: Dict[str, InferenceWorkerPool] = {}
+_schedulers_lock = threading.Lock()
+
+def _get_pool(version: str) -> InferenceWorkerPool:
+    with _schedulers_lock:
+        pool = _pools.get(version)
+        if pool is None:
+            pool = InferenceWorkerPool(
+                model_registry.path(Config.WEAPON_MODEL_NAME, version),
+                backend=Config.INFERENCE_BACKEND,
+                num_workers=Config.INFERENCE_POOL_WORKERS,
+                threads_per_worker=Config.INFERENCE_POOL_THREADS_PER_WORKER,
+                pin_cpus=Config.INFERENCE_POOL_PIN_CPUS,
+                ring_slots=Config.FRAME_RING_SLOTS,
+                ring_slot_bytes=Config.FRAME_RING_SLOT_BYTES
+            )
+            _pools[version] = pool
+    pool.start(timeout=Config.INFERENCE_POOL_START_TIMEOUT)
+    return pool
+
+def get_weapon_detector(version: Optional[str] = None):
+    """Return what routes should pass as `model`.
+
+    That is the shared scheduler, feeding the worker pool when it is enabled
+    and the in-process model otherwise; without the scheduler, the pool or
+    model itself.
+    """
+    version = model_registry.resolve_version(Config.WEAPON_MODEL_NAME, version or Config.WEAPON_MODEL_VERSION)
+    if Config.INFERENCE_POOL_ENABLED:
+        model = _get_pool(version)
+    else:
+        model = model_registry.get(Config.WEAPON_MODEL_NAME, version)
+    if not Config.INFERENCE_SCHEDULER_ENABLED:
+        return model
+    with _schedulers_lock:
+        scheduler = _schedulers.get(version)
+        if scheduler is None:
+            scheduler = InferenceScheduler(
+                model,
+                max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+                window_ms=Config.INFERENCE_BATCH_WINDOW_MS
+            )
+            _schedulers[version] = scheduler
+        return scheduler
+
+def scheduler_stats() -> Dict[str, Any]:
+    with _schedulers_lock:
+        return {version: scheduler.stats() for version, scheduler in _schedulers.items()}
+
+def pool_stats() -> Dict[str, Any]:
+    with _schedulers_lock:
+        return {version: pool.stats() for version, pool in _pools.items()}
+
+def _queue_depths():
+    with _schedulers_lock:
+        return [({'version': version}, scheduler.queue_depth) for version, scheduler in _schedulers.items()]
+
+registry.gauge('weapon_inference_queue_depth', 'Detection requests waiting for a forward pass', _queue_depths)
+
+@atexit.register
+def _shutdown_pools():
+    for pool in list(_pools.values()):
+        pool.shutdown()
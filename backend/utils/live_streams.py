@@ -0,0 +1,502 @@
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import cv2
+import numpy as np
+from config import Config
+from utils.stream_scheduler import StreamBudget, stream_scheduler
+from utils.metrics import registry, frames_skipped
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Network sources cv2.VideoCapture can open through FFmpeg
+_URL_SCHEMES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://')
+
+# part: frame_age (capture to detector start), inference, total (capture to emit)
+live_latency_seconds = registry.histogram(
+    'weapon_live_latency_seconds', 'Live stream latency from frame capture to detections emitted',
+    [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10], ['part']
+)
+
+class LiveStreamLimit(Exception):
+    """Raised when no more live streams may be opened"""
+    pass
+
+class SourceNotAllowed(Exception):
+    """Raised for a device or stream URL the configuration does not allow"""
+    pass
+
+def host_allowed(url: str) -> bool:
+    """Whether LIVE_STREAM_ALLOWED_HOSTS lets a stream URL be opened"""
+    allowed = Config.LIVE_STREAM_ALLOWED_HOSTS
+    if '*' in allowed:
+        return True
+    try:
+        parts = urlsplit(url)
+        host, port = (parts.hostname or '').lower(), parts.port
+    except ValueError:
+        return False
+    return bool(host) and (host in allowed or (port is not None and f'{host}:{port}' in allowed))
+
+def resolve_source(source: Any) -> Tuple[Any, bool]:
+    """Turn a client-supplied source into a cv2.VideoCapture argument.
+
+    Returns (source, is_file). Accepts a device index (if LIVE_STREAM_ALLOW_DEVICES),
+    an RTSP/RTMP/HTTP URL on a host in LIVE_STREAM_ALLOWED_HOSTS, or the name
+    of a file in LIVE_STREAM_FILES_FOLDER (played in a loop, as a stand-in for
+    a camera). Devices and URLs that are not allowed raise SourceNotAllowed;
+    anything else raises ValueError.
+    """
+    if isinstance(source, int) or (isinstance(source, str) and re.fullmatch(r'\d+', source.strip())):
+        if not Config.LIVE_STREAM_ALLOW_DEVICES:
+            raise SourceNotAllowed('Capture devices are not enabled as live stream sources')
+        return int(source), False
+    if not isinstance(source, str) or not source.strip():
+        raise ValueError('source must be a device index, a stream URL or a file name')
+    source = source.strip()
+    if source.lower().startswith(_URL_SCHEMES):
+        if not host_allowed(source):
+            raise SourceNotAllowed('Stream URL host is not in LIVE_STREAM_ALLOWED_HOSTS')
+        return source, False
+    # Files only from the configured folder, so the API cannot be pointed at arbitrary paths
+    folder = os.path.realpath(Config.LIVE_STREAM_FILES_FOLDER)
+    path = os.path.realpath(os.path.join(folder, source))
+    if os.path.dirname(path) != folder or not os.path.isfile(path):
+        raise ValueError(f'No such stream file: {source}')
+    return path, True
+
+def open_capture(source: Any) -> cv2.VideoCapture:
+    """cv2.VideoCapture with timeouts for network sources, so a dead camera cannot block a reader forever"""
+    if isinstance(source, str) and source.lower().startswith(_URL_SCHEMES):
+        return cv2.VideoCapture(source, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(Config.LIVE_STREAM_TIMEOUT * 1000),
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(Config.LIVE_STREAM_TIMEOUT * 1000)
+        ])
+    return cv2.VideoCapture(source)
+
+class LatestFrameReader:
+    """Reads a capture on its own thread and keeps only the newest frame.
+
+    Consumers never see a backlog: a frame that is replaced before anyone
+    took it counts as dropped. Files are paced to their frame rate and
+    rewound at the end, so they behave like a camera; network and device
+    sources are reopened after a failure.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        loop: bool = False,
+        reconnect_delay: float = 2.0,
+        max_reconnects: int = 5,
+        on_status=None,
+        on_frame=None
+    ):
+        self.source = source
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.on_status = on_status
+        self.on_frame = on_frame
+        self.fps = 0.0
+        self.width = 0
+        self.height = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.error: Optional[str] = None
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._latest: Optional[Tuple[int, np.ndarray, float]] = None  # (sequence, frame, captured_at)
+        self._taken = True
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self):
+        """Open the capture on the calling thread, so bad sources fail the request that added them"""
+        self._cap = open_capture(self.source)
+        if not self._cap.isOpened():
+            self._cap.release()
+            raise IOError(f'Could not open stream source {self.source}')
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def start(self):
+        if self._cap is None:
+            self.open()
+        self._thread = threading.Thread(target=self._run, name='live-reader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self, after: int = -1, timeout: float = 1.0, take: bool = True) -> Optional[Tuple[int, np.ndarray, float]]:
+        """Newest frame with a sequence number above after, waiting up to timeout for one.
+
+        take=False only looks: the frame still counts as dropped if it is
+        replaced before someone takes it.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._latest is None or self._latest[0] <= after:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set() or not self.alive:
+                    return None
+                self._cond.wait(remaining)
+            if take:
+                self._taken = True
+            return self._latest
+
+    def _reconnect(self) -> bool:
+        self._cap.release()
+        for _ in range(self.max_reconnects):
+            if self._stop.wait(self.reconnect_delay):
+                return False
+            self.reconnects += 1
+            if self.on_status:
+                self.on_status('reconnecting')
+            self._cap = open_capture(self.source)
+            if self._cap.isOpened():
+                if self.on_status:
+                    self.on_status('running')
+                return True
+            self._cap.release()
+        self.error = f'Lost stream source {self.source}'
+        return False
+
+    def _run(self):
+        frame_interval = 1.0 / self.fps if self.loop and self.fps > 0 else 0.0
+        next_frame_at = time.monotonic()
+        sequence = 0
+        try:
+            while not self._stop.is_set():
+                ret, frame = self._cap.read()
+                if not ret:
+                    if self.loop and self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                        continue
+                    if not self._reconnect():
+                        break
+                    continue
+                captured_at = time.time()
+                self.frames_read += 1
+                with self._cond:
+                    if not self._taken:
+                        self.frames_dropped += 1
+                        frames_skipped.labels('stale').inc()
+                    self._latest = (sequence, frame, captured_at)
+                    self._taken = False
+                    self._cond.notify_all()
+                sequence += 1
+                if self.on_frame:
+                    self.on_frame()
+                if frame_interval:
+                    # Play files in real time instead of as fast as they decode
+                    next_frame_at = max(next_frame_at + frame_interval, time.monotonic() - frame_interval)
+                    self._stop.wait(max(0.0, next_frame_at - time.monotonic()))
+        except Exception as e:
+            logger.error(f"Error reading stream {self.source}: {str(e)}")
+            self.error = str(e)
+        finally:
+            self._cap.release()
+            with self._cond:
+                self._cond.notify_all()
+
+class LiveStream:
+    """One live source: a LatestFrameReader whose newest frames are analyzed
+    by the shared FairStreamScheduler at this stream's share of the inference
+    budget, with the results emitted to the stream's Socket.IO room.
+
+    Latency is measured from the moment a frame is read to the moment its
+    detections are emitted, split into frame age (time until the scheduler
+    picked the frame) and inference.
+    """
+
+    def __init__(
+        self,
+        stream_id: str,
+        source: Any,
+        name: Optional[str],
+        is_file: bool,
+        manager: 'LiveStreamManager',
+        budget: Optional[StreamBudget] = None
+    ):
+        self.id = stream_id
+        self.name = name or str(source if not is_file else os.path.basename(source))
+        self.source = source
+        self.manager = manager
+        self.budget = budget or StreamBudget()
+        self.status = 'starting'
+        self.created_at = time.time()
+        self.frames_analyzed = 0
+        self.detections_emitted = 0
+        self.reader = LatestFrameReader(
+            source,
+            loop=is_file,
+            reconnect_delay=Config.LIVE_STREAM_RECONNECT_DELAY,
+            max_reconnects=Config.LIVE_STREAM_MAX_RECONNECTS,
+            on_status=self._set_status,
+            on_frame=stream_scheduler.wake
+        )
+        self._latencies = deque(maxlen=Config.LIVE_STREAM_LATENCY_WINDOW)  # (frame age, inference, total) seconds
+        self._end_to_end = deque(maxlen=Config.LIVE_STREAM_LATENCY_WINDOW)  # Capture to client, from acks
+        self._analyzed_at = deque()  # Emit times within the last LIVE_STREAM_FPS_WINDOW seconds
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    @property
+    def room(self) -> str:
+        return f'live_stream:{self.id}'
+
+    def start(self):
+        self.reader.start()
+        self._set_status('running')
+        stream_scheduler.add(self)
+
+    def stop(self):
+        self._stopping = True
+        stream_scheduler.remove(self)
+        self.reader.stop()
+        if self.status != 'failed':
+            self._set_status('stopped')
+
+    def finish(self):
+        """Called by the scheduler once the reader has given up on its own"""
+        if not self._stopping:
+            self._set_status('failed' if self.reader.error else 'ended')
+            # Nothing will run again, so drop the stream (and its metric labels) without waiting for a DELETE
+            self.manager.discard(self.id)
+
+    def _set_status(self, status: str):
+        self.status = status
+        payload = {'stream_id': self.id, 'status': status}
+        if self.reader.error:
+            payload['error'] = self.reader.error
+        self.manager.emit('live_stream_status', self.room, payload)
+
+    def publish(self, sequence: int, captured_at: float, started_at: float, detections: List[Dict[str, Any]], imgsz: int):
+        """Record and emit the detections the scheduler produced for one frame"""
+        emitted_at = time.time()
+        frame_age, inference, total = started_at - captured_at, emitted_at - started_at, emitted_at - captured_at
+        if detections:
+            # Look more closely at cameras that just saw something
+            self.budget.boost(time.monotonic())
+        with self._lock:
+            self.frames_analyzed += 1
+            self._latencies.append((frame_age, inference, total))
+            self._analyzed_at.append(emitted_at)
+            while self._analyzed_at and self._analyzed_at[0] < emitted_at - Config.LIVE_STREAM_FPS_WINDOW:
+                self._analyzed_at.popleft()
+            if detections:
+                self.detections_emitted += len(detections)
+        live_latency_seconds.labels('frame_age').observe(frame_age)
+        live_latency_seconds.labels('inference').observe(inference)
+        live_latency_seconds.labels('total').observe(total)
+        self.manager.emit('live_stream_detections', self.room, {
+            'stream_id': self.id,
+            'frame': sequence,
+            'captured_at': captured_at,
+            'emitted_at': emitted_at,
+            'imgsz': imgsz,
+            'latency_ms': {
+                'frame_age': round(frame_age * 1000, 1),
+                'inference': round(inference * 1000, 1),
+                'total': round(total * 1000, 1)
+            },
+            'detections': detections
+        })
+
+    def achieved_fps(self) -> float:
+        """Frames analyzed per second over the last LIVE_STREAM_FPS_WINDOW seconds"""
+        now = time.time()
+        window = min(Config.LIVE_STREAM_FPS_WINDOW, max(now - self.created_at, 1e-6))
+        with self._lock:
+            recent = sum(1 for emitted_at in self._analyzed_at if emitted_at >= now - window)
+        return recent / window
+
+    def record_ack(self, captured_at: float, emitted_at: float):
+        """A client echoed a detections event back: capture to client is the
+        server-side latency plus half the round trip from emit to ack.
+        """
+        round_trip = time.time() - emitted_at
+        server_side = emitted_at - captured_at
+        if 0 <= round_trip < 60 and 0 <= server_side < 60:
+            with self._lock:
+                self._end_to_end.append(server_side + round_trip / 2)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000 if self._latencies else None
+            end_to_end = np.array(self._end_to_end) * 1000 if self._end_to_end else None
+            frames_analyzed = self.frames_analyzed
+            detections_emitted = self.detections_emitted
+
+        def percentiles(values):
+            return {'p50': round(float(np.percentile(values, 50)), 1), 'p95': round(float(np.percentile(values, 95)), 1)}
+
+        latency = None
+        if latencies is not None:
+            latency = {
+                'frame_age_ms': percentiles(latencies[:, 0]),
+                'inference_ms': percentiles(latencies[:, 1]),
+                'total_ms': percentiles(latencies[:, 2])
+            }
+            if end_to_end is not None:
+                latency['end_to_end_ms'] = percentiles(end_to_end)
+        now = time.monotonic()
+        achieved_fps = self.achieved_fps()
+        return {
+            'stream_id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'room': self.room,
+            'source_fps': self.reader.fps,
+            'width': self.reader.width,
+            'height': self.reader.height,
+            'frames_read': self.reader.frames_read,
+            'frames_dropped': self.reader.frames_dropped,  # Replaced by a newer frame before analysis
+            'frames_analyzed': frames_analyzed,
+            'budget': self.budget.to_dict(),
+            'boosted': self.budget.boosted(now),
+            'allocated_fps': stream_scheduler.allocated_fps(self.id),
+            'achieved_fps': round(achieved_fps, 2),
+            # Achieved below the configured minimum: the box cannot keep up with all streams
+            'below_min_fps': self.status == 'running' and self.uptime() > Config.LIVE_STREAM_FPS_WINDOW
+                             and achieved_fps < self.budget.min_fps * 0.9,
+            'detections_emitted': detections_emitted,
+            'reconnects': self.reader.reconnects,
+            'error': self.reader.error,
+            'latency': latency,
+            'uptime_seconds': round(self.uptime(), 1)
+        }
+
+    def uptime(self) -> float:
+        return time.time() - self.created_at
+
+class LiveStreamManager:
+    """Process-wide registry of live streams, started by create_app()"""
+
+    def __init__(self, max_streams: int = 8):
+        self.max_streams = max_streams
+        self.socketio = None
+        self._streams: Dict[str, LiveStream] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, socketio=None):
+        self.socketio = socketio
+
+    def emit(self, event: str, room: str, payload: Dict[str, Any]):
+        if self.socketio is None:
+            return
+        try:
+            self.socketio.emit(event, payload, room=room)
+        except Exception as e:
+            logger.warning(f"Could not emit {event} to {room}: {str(e)}")
+
+    def start(self, source: Any, name: Optional[str] = None, **budget) -> LiveStream:
+        """Open source and start analyzing it; raises ValueError, SourceNotAllowed, IOError or LiveStreamLimit.
+
+        budget takes StreamBudget settings (target_fps, min_fps, weight, ...)
+        and falls back to the LIVE_STREAM_* defaults.
+        """
+        resolved, is_file = resolve_source(source)
+        stream_budget = StreamBudget()
+        stream_budget.update(**budget)
+        with self._lock:
+            active = sum(1 for stream in self._streams.values() if stream.status in ('starting', 'running', 'reconnecting'))
+            if active >= self.max_streams:
+                raise LiveStreamLimit(f'At most {self.max_streams} live streams can run at once')
+            stream = LiveStream(uuid.uuid4().hex, resolved, name, is_file, self, stream_budget)
+            self._streams[stream.id] = stream
+        try:
+            stream.reader.open()
+        except Exception:
+            with self._lock:
+                del self._streams[stream.id]
+            raise
+        stream.start()
+        logger.info(f"Started live stream {stream.id} ({stream.name})")
+        return stream
+
+    def stop(self, stream_id: str) -> bool:
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return False
+        stream.stop()
+        logger.info(f"Stopped live stream {stream_id}")
+        return True
+
+    def discard(self, stream_id: str):
+        """Forget a stream whose source ended or failed"""
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream is not None:
+            logger.info(f"Live stream {stream_id} {stream.status}{f': {stream.reader.error}' if stream.reader.error else ''}")
+
+    def get(self, stream_id: str) -> Optional[LiveStream]:
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            streams = list(self._streams.values())
+        return [stream.stats() for stream in streams]
+
+    def status_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for stream in self._streams.values():
+                counts[stream.status] = counts.get(stream.status, 0) + 1
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        counts = self.status_counts()
+        return {
+            'max_streams': self.max_streams,
+            'streams': sum(counts.values()),
+            'running': counts.get('running', 0),
+            'scheduler': stream_scheduler.stats()
+        }
+
+    def shutdown(self):
+        with self._lock:
+            stream_ids = list(self._streams)
+        for stream_id in stream_ids:
+            self.stop(stream_id)
+
+live_streams = LiveStreamManager(max_streams=Config.LIVE_STREAM_MAX_STREAMS)
+
+registry.gauge(
+    'weapon_live_streams', 'Live streams by status',
+    lambda: [({'status': status}, count) for status, count in live_streams.status_counts().items()]
+)
+
+def _stream_rates():
+    samples = []
+    for stream in live_streams.list():
+        samples.append(({'stream': stream['stream_id'], 'kind': 'achieved'}, stream['achieved_fps']))
+        samples.append(({'stream': stream['stream_id'], 'kind': 'allocated'}, stream['allocated_fps'] or 0.0))
+    return samples
+
+registry.gauge('weapon_live_stream_fps', 'Analysis frame rate per live stream, achieved and allocated', _stream_rates)
+registry.gauge(
+    'weapon_live_capacity_fps', 'Frames per second the live stream scheduler can analyze',
+    lambda: stream_scheduler.stats()['capacity_fps'] or 0.0
+)
@@ -0,0 +1,210 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+import psutil
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (cumulative counts per upper bound, like Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> '_Timer':
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets + [float('inf')], self._counts):
+                running += count
+                cumulative.append(('+Inf' if bound == float('inf') else f'{bound:g}', running))
+            return {
+                'count': self._count,
+                'sum': self._sum,
+                'mean': self._sum / self._count if self._count else 0.0,
+                'buckets': dict(cumulative)
+            }
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+        snapshot = self.snapshot()
+        lines = [(f'{name}_bucket', dict(labels, le=bound), count) for bound, count in snapshot['buckets'].items()]
+        lines.append((f'{name}_sum', labels, snapshot['sum']))
+        lines.append((f'{name}_count', labels, snapshot['count']))
+        return lines
+
+class Counter:
+    """Thread-safe monotonically increasing value"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+        return [(name, labels, self._value)]
+
+class _Timer:
+    __slots__ = ('histogram', 'start', 'elapsed')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed)
+
+class MetricFamily:
+    """A named metric with one child Counter or Histogram per label combination"""
+
+    def __init__(self, name: str, documentation: str, kind: str, factory: Callable[[], Any], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for these label values, created on first use"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    # Shortcuts for unlabelled families
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def collect(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in sorted(children):
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+class MetricsRegistry:
+    """Holds metric families and gauge callbacks and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._gauges: Dict[str, Tuple[str, str, Callable[[], Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            return self._families.setdefault(family.name, family)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, 'counter', Counter, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, 'histogram', lambda: Histogram(buckets), labelnames))
+
+    def gauge(self, name: str, documentation: str, fn: Callable[[], Any], kind: str = 'gauge'):
+        """Value read at scrape time; fn returns a number or a list of (labels dict, number).
+
+        kind='counter' exposes a total kept elsewhere (e.g. by the OS).
+        """
+        with self._lock:
+            self._gauges[name] = (documentation, kind, fn)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+            gauges = list(self._gauges.items())
+        lines = []
+        for family in families:
+            lines.append(f'# HELP {family.name} {family.documentation}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            lines.extend(_format_sample(*sample) for sample in family.collect())
+        for name, (documentation, kind, fn) in gauges:
+            try:
+                value = fn()
+            except Exception as e:
+                logger.warning(f"Error reading gauge {name}: {str(e)}")
+                continue
+            samples = value if isinstance(value, list) else [({}, value)]
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(_format_sample(name, labels, sample) for labels, sample in samples if sample is not None)
+        return '\n'.join(lines) + '\n'
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f'{name}{{{label_text}}} {float(value)!r}'
+    return f'{name} {float(value)!r}'
+
+registry = MetricsRegistry()
+
+# Seconds per stage of a request: upload_parse, decode, queue_wait, inference,
+# extract, draw, encode, gemini
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+stage_seconds = registry.histogram(
+    'weapon_stage_seconds', 'Time spent in each processing stage', STAGE_BUCKETS, ['stage']
+)
+frames_processed = registry.counter('weapon_frames_processed_total', 'Frames the detector ran on')
+frames_skipped = registry.counter(
+    'weapon_frames_skipped_total', 'Video frames not sent to the detector', ['reason']
+)
+inference_batch_frames = registry.histogram(
+    'weapon_inference_batch_frames', 'Frames per forward pass dispatched by the inference scheduler',
+    [1, 2, 4, 8, 16, 32, 64]
+)
+gemini_calls = registry.counter('weapon_gemini_calls_total', 'Gemini requests by kind and outcome', ['kind', 'outcome'])
+
+def time_stage(stage: str) -> _Timer:
+    """with time_stage('decode'): ... records the block's duration under that stage"""
+    return stage_seconds.labels(stage).time()
+
+_process = psutil.Process(os.getpid())
+
+def _process_cpu_seconds():
+    times = _process.cpu_times()
+    return times.user + times.system
+
+registry.gauge('process_resident_memory_bytes', 'Resident memory size in bytes', lambda: _process.memory_info().rss)
+registry.gauge('process_cpu_seconds_total', 'Total user and system CPU time in seconds', _process_cpu_seconds, kind='counter')
@@ -0,0 +1,161 @@
+import os
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+import numpy as np
+import psutil
+from config import Config
+from utils.detection_utils import load_model
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """Process-wide registry that loads each named model version exactly once.
+
+    _lock only guards the registry's bookkeeping and is never held for long;
+    each model version has its own load lock, so status() and other versions
+    stay available while a model loads.
+    """
+
+    def __init__(self, warmup: bool = True, warmup_size: int = 640, backend: str = 'torch'):
+        self.warmup = warmup
+        self.warmup_size = warmup_size
+        self.backend = backend
+        self._lock = threading.RLock()
+        # name -> {version: path}
+        self._paths: Dict[str, Dict[str, str]] = {}
+        # name -> default version
+        self._defaults: Dict[str, str] = {}
+        # (name, version) -> entry
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+        # (name, version) -> lock held while that version loads
+        self._load_locks: Dict[tuple, threading.Lock] = {}
+
+    def register(self, name: str, path: str, version: str = 'latest', default: bool = False):
+        """Register a model file under a name and version without loading it"""
+        with self._lock:
+            self._paths.setdefault(name, {})[version] = path
+            if default or name not in self._defaults:
+                self._defaults[name] = version
+            self._entries.setdefault((name, version), {
+                'model': None,
+                'path': path,
+                'backend': self.backend,
+                'state': 'registered',
+                'error': None,
+                'load_time': None,
+                'warmup_time': None,
+                'memory_bytes': None,
+                'rss_delta_bytes': None
+            })
+            self._load_locks.setdefault((name, version), threading.Lock())
+
+    def resolve_version(self, name: str, version: Optional[str] = None) -> str:
+        """Return the version that get() would load for a name"""
+        if name not in self._paths:
+            raise KeyError(f"Unknown model: {name}")
+        version = version or self._defaults[name]
+        if version not in self._paths[name]:
+            raise KeyError(f"Unknown version '{version}' for model '{name}'")
+        return version
+
+    def path(self, name: str, version: Optional[str] = None) -> str:
+        """Return the registered file for a model version without loading it"""
+        return self._paths[name][self.resolve_version(name, version)]
+
+    def get(self, name: str, version: Optional[str] = None):
+        """Return a loaded model, loading and warming it up on first use"""
+        version = self.resolve_version(name, version)
+        entry = self._entries[(name, version)]
+        if entry['model'] is not None:
+            return entry['model']
+
+        with self._load_locks[(name, version)]:
+            # Another thread may have finished loading while we waited
+            if entry['model'] is not None:
+                return entry['model']
+            return self._load(name, version, entry)
+
+    def _load(self, name: str, version: str, entry: Dict[str, Any]):
+        """Load and warm up a model entry. Caller must hold the entry's load lock."""
+        entry['state'] = 'loading'
+        process = psutil.Process(os.getpid())
+        rss_before = process.memory_info().rss
+        try:
+            start = time.time()
+            model = load_model(entry['path'], backend=entry['backend'])
+            entry['load_time'] = time.time() - start
+
+            if self.warmup:
+                start = time.time()
+                self._warmup(model)
+                entry['warmup_time'] = time.time() - start
+
+            entry['memory_bytes'] = self._model_memory_bytes(model)
+            entry['rss_delta_bytes'] = process.memory_info().rss - rss_before
+            entry['model'] = model
+            entry['state'] = 'loaded'
+            entry['error'] = None
+            logger.info(f"Model {name}:{version} loaded in {entry['load_time']:.2f}s")
+            return model
+        except Exception as e:
+            entry['state'] = 'error'
+            entry['error'] = str(e)
+            logger.error(f"Error loading model {name}:{version}: {str(e)}")
+            raise
+
+    def _warmup(self, model):
+        """Run a dummy inference so the first real request does not pay setup costs"""
+        dummy = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        model(dummy, imgsz=self.warmup_size)
+
+    @staticmethod
+    def _model_memory_bytes(model) -> Optional[int]:
+        """Size of the model's parameters and buffers in bytes"""
+        try:
+            module = model.model
+            tensors = list(module.parameters()) + list(module.buffers())
+            return int(sum(t.numel() * t.element_size() for t in tensors))
+        except Exception as e:
+            logger.warning(f"Could not compute model memory footprint: {str(e)}")
+            return None
+
+    def is_loaded(self, name: str, version: Optional[str] = None) -> bool:
+        try:
+            version = self.resolve_version(name, version)
+        except KeyError:
+            return False
+        return self._entries[(name, version)]['state'] == 'loaded'
+
+    def status(self) -> Dict[str, Any]:
+        """Load state and memory footprint of every registered model, without waiting for loads in progress"""
+        with self._lock:
+            entries = list(self._entries.items())
+            defaults = dict(self._defaults)
+        status = {}
+        for (name, version), entry in entries:
+            model_status = status.setdefault(name, {
+                'default_version': defaults[name],
+                'versions': {}
+            })
+            model_status['versions'][version] = {
+                key: value for key, value in dict(entry).items() if key != 'model'
+            }
+        return status
+
+# Process-wide registry shared by the app and all blueprints
+model_registry = ModelRegistry(
+    warmup=Config.MODEL_WARMUP,
+    warmup_size=Config.MODEL_WARMUP_SIZE,
+    backend=Config.INFERENCE_BACKEND
+)
+for model_name, versions in Config.MODELS.items():
+    for model_version, model_path in versions.items():
+        model_registry.register(model_name, model_path, version=model_version)
+
+def get_weapon_model(version: Optional[str] = None):
+    """Return the shared weapon detection model"""
+    return model_registry.get(Config.WEAPON_MODEL_NAME, version or Config.WEAPON_MODEL_VERSION)
@@ -0,0 +1,110 @@
+import logging
+from typing import Any, Dict, Optional
+import cv2
+import numpy as np
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MotionGate:
+    """Cheap pre-filter that decides whether a frame is worth running the detector on.
+
+    Frames are downscaled to grayscale and compared against a running-average
+    background. Inference is allowed when the fraction of changed pixels passes
+    motion_threshold, when the histogram says the scene changed, or when
+    max_skip consecutive frames have been gated out.
+    """
+
+    def __init__(
+        self,
+        motion_threshold: float = 0.005,
+        pixel_threshold: int = 25,
+        scene_change_threshold: float = 0.4,
+        downscale_width: int = 160,
+        learning_rate: float = 0.05,
+        max_skip: Optional[int] = None
+    ):
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.scene_change_threshold = scene_change_threshold
+        self.downscale_width = downscale_width
+        self.learning_rate = learning_rate
+        self.max_skip = max_skip
+
+        self._background = None
+        self._last_hist = None
+        self._consecutive_skips = 0
+
+        self.frames_checked = 0
+        self.frames_passed = 0
+        self.frames_skipped = 0
+        self.scene_changes = 0
+        self.last_score = 0.0
+
+    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = self.downscale_width / float(width)
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame: np.ndarray) -> bool:
+        """Return True if the detector should run on this frame"""
+        self.frames_checked += 1
+        gray = self._preprocess(frame)
+        hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._last_hist = hist
+            return self._pass()
+
+        # Fraction of pixels that differ noticeably from the background
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        self.last_score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        cv2.accumulateWeighted(gray.astype(np.float32), self._background, self.learning_rate)
+
+        scene_change = 1.0 - cv2.compareHist(self._last_hist, hist, cv2.HISTCMP_CORREL) > self.scene_change_threshold
+        self._last_hist = hist
+        if scene_change:
+            # Start the background over for the new scene
+            self.scene_changes += 1
+            self._background = gray.astype(np.float32)
+            return self._pass()
+
+        if self.last_score >= self.motion_threshold:
+            return self._pass()
+
+        if self.max_skip is not None and self._consecutive_skips >= self.max_skip:
+            return self._pass()
+
+        self.frames_skipped += 1
+        self._consecutive_skips += 1
+        return False
+
+    def _pass(self) -> bool:
+        self.frames_passed += 1
+        self._consecutive_skips = 0
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'frames_checked': self.frames_checked,
+            'frames_passed': self.frames_passed,
+            'frames_skipped': self.frames_skipped,
+            'scene_changes': self.scene_changes,
+            'skip_ratio': round(self.frames_skipped / self.frames_checked, 4) if self.frames_checked else 0.0
+        }
+
+def create_motion_gate() -> MotionGate:
+    """Build a MotionGate from the MOTION_GATE_* settings in Config"""
+    return MotionGate(
+        motion_threshold=Config.MOTION_GATE_THRESHOLD,
+        pixel_threshold=Config.MOTION_GATE_PIXEL_THRESHOLD,
+        scene_change_threshold=Config.MOTION_GATE_SCENE_CHANGE_THRESHOLD,
+        downscale_width=Config.MOTION_GATE_DOWNSCALE_WIDTH,
+        max_skip=Config.MOTION_GATE_MAX_SKIP
+    )
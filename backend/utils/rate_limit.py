@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Holds up to `capacity` tokens and refills at `rate` tokens per second.
+    try_acquire() never blocks; acquire() waits up to `timeout` seconds.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+
+    def _refill(self, now: float):
+        """Add tokens accrued since the last update. Caller holds the lock."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, tokens: float) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def _count(self, granted: bool) -> bool:
+        with self._lock:
+            if granted:
+                self.granted += 1
+            else:
+                self.rejected += 1
+        return granted
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available right now"""
+        return self._count(self._take(tokens))
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until `tokens` will be available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate) if self.rate > 0 else float('inf')
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available or timeout expires"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._take(tokens):
+                return self._count(True)
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return self._count(False)
+            time.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'tokens_available': round(self._tokens, 2),
+                'capacity': self.capacity,
+                'rate_per_second': self.rate,
+                'granted': self.granted,
+                'rejected': self.rejected
+            }
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def content_key(data: bytes, model_version: str, conf_threshold: float) -> str:
+    """Cache key for an upload: hash of its bytes plus everything that changes the result"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}:{model_version}:{conf_threshold:.3f}"
+
+class ResultCache:
+    """Thread-safe LRU cache of detection results bounded by an approximate byte budget.
+
+    Entry size is the length of the JSON encoding of the stored value, which is
+    what the cache would hand back to the client.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (size, value)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self.total_bytes -= self._data.pop(key)[0]
+            self._data[key] = (size, value)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (evicted_size, _) = self._data.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        """Drop an entry, e.g. when the file it points to has been cleaned up"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Detections for repeated image uploads, keyed by content_key()
+image_result_cache = ResultCache(max_bytes=Config.IMAGE_RESULT_CACHE_BYTES)
@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+from config import Config
+from utils.detection_utils import detect_weapons_batch
+from utils.inference_scheduler import get_weapon_detector
+from utils.adaptive_resolution import resolution_controller
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def allocate_rates(capacity: float, demands: Dict[Hashable, Tuple[float, float, float]]) -> Dict[Hashable, float]:
+    """Split capacity (frames per second) over streams by max-min fair water-filling.
+
+    demands maps a stream to (min_fps, target_fps, weight). Every stream first
+    gets its minimum; what is left is shared in proportion to the weights,
+    and a stream's share never exceeds its target, so unused share flows to
+    the others. When capacity does not even cover the minimums, they are
+    scaled down together.
+    """
+    floors = {key: min(min_fps, target_fps) for key, (min_fps, target_fps, _) in demands.items()}
+    total_floor = sum(floors.values())
+    if capacity <= total_floor:
+        scale = capacity / total_floor if total_floor > 0 else 0.0
+        return {key: floor * scale for key, floor in floors.items()}
+
+    rates = dict(floors)
+    remaining = capacity - total_floor
+    unsaturated = {key for key, (_, target_fps, weight) in demands.items() if rates[key] < target_fps and weight > 0}
+    while remaining > 1e-9 and unsaturated:
+        total_weight = sum(demands[key][2] for key in unsaturated)
+        spent = 0.0
+        saturated = set()
+        for key in unsaturated:
+            room = demands[key][1] - rates[key]
+            given = min(remaining * demands[key][2] / total_weight, room)
+            rates[key] += given
+            spent += given
+            if given >= room - 1e-9:
+                saturated.add(key)
+        remaining -= spent
+        if not saturated:
+            break
+        unsaturated -= saturated
+    return rates
+
+class StreamBudget:
+    """Analysis rate settings of one stream.
+
+    After a detection, the stream is boosted for boost_seconds: its weight and
+    target are multiplied by boost_factor (the target never exceeds the
+    source's own frame rate).
+    """
+
+    def __init__(
+        self,
+        target_fps: float = Config.LIVE_STREAM_TARGET_FPS,
+        min_fps: float = Config.LIVE_STREAM_MIN_FPS,
+        weight: float = Config.LIVE_STREAM_WEIGHT,
+        boost_factor: float = Config.LIVE_STREAM_BOOST_FACTOR,
+        boost_seconds: float = Config.LIVE_STREAM_BOOST_SECONDS
+    ):
+        self.target_fps = target_fps
+        self.min_fps = min_fps
+        self.weight = weight
+        self.boost_factor = boost_factor
+        self.boost_seconds = boost_seconds
+        self.boosted_until = 0.0
+        self.validate()
+
+    def validate(self):
+        if self.target_fps <= 0:
+            raise ValueError('target_fps must be positive')
+        if self.min_fps < 0 or self.min_fps > self.target_fps:
+            raise ValueError('min_fps must be between 0 and target_fps')
+        if self.weight <= 0:
+            raise ValueError('weight must be positive')
+        if self.boost_factor < 1:
+            raise ValueError('boost_factor must be at least 1')
+
+    def update(self, **settings):
+        """Change any of target_fps, min_fps, weight, boost_factor, boost_seconds; all or nothing"""
+        previous = {name: getattr(self, name) for name in settings}
+        for name, value in settings.items():
+            if name not in ('target_fps', 'min_fps', 'weight', 'boost_factor', 'boost_seconds'):
+                raise ValueError(f'Unknown budget setting: {name}')
+            setattr(self, name, float(value))
+        try:
+            self.validate()
+        except ValueError:
+            for name, value in previous.items():
+                setattr(self, name, value)
+            raise
+
+    def boost(self, now: float):
+        self.boosted_until = now + self.boost_seconds
+
+    def boosted(self, now: float) -> bool:
+        return now < self.boosted_until
+
+    def effective(self, now: float, source_fps: float = 0.0) -> Tuple[float, float, float]:
+        """(min_fps, target_fps, weight) in force right now"""
+        target, weight = self.target_fps, self.weight
+        if self.boosted(now):
+            target *= self.boost_factor
+            weight *= self.boost_factor
+        if source_fps > 0:
+            # Analyzing faster than the source produces frames only repeats work
+            target = min(target, source_fps)
+        return min(self.min_fps, target), target, weight
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'target_fps': self.target_fps,
+            'min_fps': self.min_fps,
+            'weight': self.weight,
+            'boost_factor': self.boost_factor,
+            'boost_seconds': self.boost_seconds
+        }
+
+class _StreamState:
+    def __init__(self):
+        self.next_due = 0.0
+        self.last_sequence = -1
+        self.allocated_fps = 0.0
+
+class FairStreamScheduler:
+    """Shares one inference budget across all live streams.
+
+    Capacity is LIVE_INFERENCE_BUDGET_FPS frames per second, or, when that is
+    0, the detector's measured throughput. allocate_rates() turns it into a
+    rate per stream, and each stream becomes due every 1 / rate seconds.
+    Each pass takes the newest frame of the most overdue streams (lateness
+    counted in their own intervals, so a stream allocated 2 fps that is half a
+    second late ranks with one allocated 10 fps that is 0.1 s late) and runs
+    them through the detector as one batch.
+
+    Streams are duck-typed: they provide id, budget (a StreamBudget), reader
+    (latest(after, timeout, take), alive, fps), publish(sequence, captured_at,
+    started_at, detections, imgsz) and finish().
+    """
+
+    def __init__(self, budget_fps: float = 0.0, max_batch: int = 8, smoothing: float = 0.2):
+        self.budget_fps = budget_fps
+        self.max_batch = max(1, max_batch)
+        self.smoothing = smoothing
+        self._streams: Dict[str, Any] = {}
+        self._states: Dict[str, _StreamState] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._frame_seconds: Optional[float] = None  # Smoothed detector time per frame
+        self.batches = 0
+        self.frames = 0
+
+    def add(self, stream):
+        with self._lock:
+            self._streams[stream.id] = stream
+            self._states[stream.id] = _StreamState()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-scheduler', daemon=True)
+                self._thread.start()
+        self.wake()
+
+    def remove(self, stream):
+        with self._lock:
+            self._streams.pop(stream.id, None)
+            self._states.pop(stream.id, None)
+
+    def wake(self):
+        """Called by readers when a new frame arrives"""
+        self._wake.set()
+
+    def capacity_fps(self) -> float:
+        if self.budget_fps > 0:
+            return self.budget_fps
+        if self._frame_seconds:
+            return 1.0 / self._frame_seconds
+        # Nothing measured yet: let every stream run at its target until the first batches
+        return float('inf')
+
+    def allocated_fps(self, stream_id: str) -> Optional[float]:
+        with self._lock:
+            state = self._states.get(stream_id)
+            return round(state.allocated_fps, 2) if state else None
+
+    def _run(self):
+        model = get_weapon_detector()
+        while True:
+            with self._lock:
+                if not self._streams:
+                    self._thread = None
+                    return
+                streams = list(self._streams.values())
+            try:
+                if not self._dispatch(model, streams):
+                    self._wake.clear()
+            except Exception as e:
+                logger.error(f"Error in live stream scheduler: {str(e)}")
+                time.sleep(0.5)
+
+    def _dispatch(self, model, streams) -> bool:
+        """Run one batch if any stream is due and has a new frame; otherwise wait. True if a batch ran."""
+        now = time.monotonic()
+        for stream in streams:
+            if not stream.reader.alive:
+                # The source ended or failed
+                self.remove(stream)
+                stream.finish()
+        streams = [stream for stream in streams if stream.reader.alive]
+        if not streams:
+            return False
+
+        rates = allocate_rates(
+            self.capacity_fps(),
+            {stream.id: stream.budget.effective(now, stream.reader.fps) for stream in streams}
+        )
+        candidates = []
+        wait = 0.5
+        with self._lock:
+            states = {stream.id: self._states.get(stream.id) for stream in streams}
+        for stream in streams:
+            state = states[stream.id]
+            if state is None:
+                continue
+            state.allocated_fps = rate = rates.get(stream.id, 0.0)
+            if rate <= 0:
+                continue
+            interval = 1.0 / rate
+            if now < state.next_due:
+                wait = min(wait, state.next_due - now)
+                continue
+            item = stream.reader.latest(after=state.last_sequence, timeout=0, take=False)
+            if item is None:
+                continue
+            candidates.append(((now - state.next_due) / interval, stream, state, item, interval))
+
+        if not candidates:
+            self._wake.wait(wait)
+            return False
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        batch = candidates[:self.max_batch]
+        taken = []
+        for _, stream, state, item, interval in batch:
+            # Take whatever is newest now; a frame may have arrived since the peek
+            item = stream.reader.latest(after=state.last_sequence, timeout=0, take=True) or item
+            taken.append((stream, item))
+            state.last_sequence = item[0]
+            # At most one interval of catch-up, so a stream that was starved does not burst afterwards
+            state.next_due = max(state.next_due, now - interval) + interval
+        frames = [frame for _, (_, frame, _) in taken]
+
+        started_at = time.time()
+        start = time.perf_counter()
+        imgsz = resolution_controller.current()
+        batch_detections = detect_weapons_batch(model, frames, imgsz=imgsz)
+        frame_seconds = (time.perf_counter() - start) / len(frames)
+        self._frame_seconds = frame_seconds if self._frame_seconds is None else (
+            self.smoothing * frame_seconds + (1 - self.smoothing) * self._frame_seconds
+        )
+        self.batches += 1
+        self.frames += len(frames)
+
+        for (stream, (sequence, _, captured_at)), detections in zip(taken, batch_detections):
+            stream.publish(sequence, captured_at, started_at, detections, imgsz)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        capacity = self.capacity_fps()
+        with self._lock:
+            streams = len(self._streams)
+            allocated = sum(state.allocated_fps for state in self._states.values())
+        return {
+            'streams': streams,
+            'budget_fps': self.budget_fps or None,
+            'capacity_fps': round(capacity, 2) if capacity != float('inf') else None,
+            'allocated_fps': round(allocated, 2),
+            'batches': self.batches,
+            'frames': self.frames,
+            'mean_batch_size': round(self.frames / self.batches, 2) if self.batches else None
+        }
+
+stream_scheduler = FairStreamScheduler(
+    budget_fps=Config.LIVE_INFERENCE_BUDGET_FPS,
+    max_batch=Config.LIVE_SCHEDULER_MAX_BATCH
+)
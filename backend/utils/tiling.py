@@ -0,0 +1,46 @@
+from typing import List, Tuple
+import numpy as np
+
+def tile_grid(height: int, width: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Overlapping (x1, y1, x2, y2) tiles covering the image; edge tiles are shifted inwards to stay full size"""
+    stride = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+def nms(xyxy: np.ndarray, scores: np.ndarray, classes: np.ndarray, threshold: float, metric: str = 'ios') -> np.ndarray:
+    """Class-aware greedy NMS; returns the indices to keep, best score first.
+
+    metric 'iou' is standard NMS. 'ios' (intersection over the smaller box)
+    also removes the partial box a tile border cut out of a larger detection.
+    """
+    areas = np.clip(xyxy[:, 2] - xyxy[:, 0], 0, None) * np.clip(xyxy[:, 3] - xyxy[:, 1], 0, None)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        if not rest.size:
+            break
+        x1 = np.maximum(xyxy[best, 0], xyxy[rest, 0])
+        y1 = np.maximum(xyxy[best, 1], xyxy[rest, 1])
+        x2 = np.minimum(xyxy[best, 2], xyxy[rest, 2])
+        y2 = np.minimum(xyxy[best, 3], xyxy[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        if metric == 'iou':
+            denominator = areas[best] + areas[rest] - inter
+        else:
+            denominator = np.minimum(areas[best], areas[rest])
+        overlap = inter / np.maximum(denominator, 1e-6)
+        order = rest[(overlap <= threshold) | (classes[rest] != classes[best])]
+    return np.array(keep, dtype=np.int64)
@@ -0,0 +1,190 @@
+import logging
+from typing import Any, Dict, List
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Noise scales relative to box height, as in DeepSORT
+_STD_WEIGHT_POSITION = 1.0 / 20
+_STD_WEIGHT_VELOCITY = 1.0 / 160
+
+def bbox_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of [x1, y1, x2, y2] boxes"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+class Track:
+    """A single tracked box with a constant-velocity Kalman filter.
+
+    State is [cx, cy, w, h, vx, vy, vw, vh] in pixels and pixels per frame.
+    """
+
+    _F = np.eye(8)
+    _F[:4, 4:] = np.eye(4)
+    _H = np.eye(4, 8)
+
+    def __init__(self, track_id: int, detection: Dict[str, Any]):
+        self.track_id = track_id
+        self.class_name = detection['class']
+        self.confidence = detection['confidence']
+        self.hits = 1
+        self.age = 0
+        self.time_since_update = 0
+        self.misses = 0  # Consecutive detector runs that did not match this track
+
+        measurement = self._to_measurement(detection['bbox'])
+        self.x = np.concatenate([measurement, np.zeros(4)])
+        # Centre when the detector last ran; drift is measured from here
+        self.anchor = measurement[:2].copy()
+        h = max(measurement[3], 1.0)
+        std = np.array([
+            2 * _STD_WEIGHT_POSITION * h, 2 * _STD_WEIGHT_POSITION * h,
+            2 * _STD_WEIGHT_POSITION * h, 2 * _STD_WEIGHT_POSITION * h,
+            10 * _STD_WEIGHT_VELOCITY * h, 10 * _STD_WEIGHT_VELOCITY * h,
+            10 * _STD_WEIGHT_VELOCITY * h, 10 * _STD_WEIGHT_VELOCITY * h
+        ])
+        self.P = np.diag(std ** 2)
+
+    @staticmethod
+    def _to_measurement(bbox) -> np.ndarray:
+        x1, y1, x2, y2 = bbox
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+    def predict(self):
+        h = max(self.x[3], 1.0)
+        std = np.array([_STD_WEIGHT_POSITION * h] * 4 + [_STD_WEIGHT_VELOCITY * h] * 4)
+        self.x = self._F @ self.x
+        # Never let the box collapse
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+        self.P = self._F @ self.P @ self._F.T + np.diag(std ** 2)
+        self.age += 1
+        self.time_since_update += 1
+
+    def update(self, detection: Dict[str, Any]):
+        z = self._to_measurement(detection['bbox'])
+        h = max(self.x[3], 1.0)
+        R = np.diag((np.array([_STD_WEIGHT_POSITION * h] * 4)) ** 2)
+        S = self._H @ self.P @ self._H.T + R
+        K = self.P @ self._H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self._H @ self.x)
+        self.P = (np.eye(8) - K @ self._H) @ self.P
+        self.confidence = detection['confidence']
+        self.hits += 1
+        self.time_since_update = 0
+        self.misses = 0
+
+    @property
+    def bbox(self) -> List[float]:
+        cx, cy, w, h = self.x[:4]
+        return [float(cx - w / 2), float(cy - h / 2), float(cx + w / 2), float(cy + h / 2)]
+
+    @property
+    def drift(self) -> float:
+        """Distance the predicted centre moved since the detector last ran, relative to box size"""
+        return float(np.linalg.norm(self.x[:2] - self.anchor) / max(self.x[2], self.x[3], 1.0))
+
+    @property
+    def uncertainty(self) -> float:
+        """Standard deviation of the predicted centre, relative to box size"""
+        return float(np.sqrt(self.P[0, 0] + self.P[1, 1]) / max(self.x[2], self.x[3], 1.0))
+
+    def to_detection(self) -> Dict[str, Any]:
+        return {
+            'class': self.class_name,
+            'confidence': float(self.confidence),
+            'bbox': self.bbox,
+            'track_id': self.track_id,
+            'predicted': self.time_since_update > 0
+        }
+
+class IoUTracker:
+    """Greedy IoU multi-object tracker with Kalman prediction between detections.
+
+    Call step() once per frame, passing detections for frames the detector ran
+    on and None otherwise. needs_detection() tells the caller when the
+    predicted boxes have moved too far to trust without a fresh detection.
+    That is judged by how far the filter moved a box since the detector last
+    ran (its estimated velocity at work), not by the filter's covariance,
+    which grows on a fixed schedule even for a box standing still.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: int = 45,
+        max_misses: int = 2,
+        drift_threshold: float = 0.25
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.max_misses = max_misses
+        self.drift_threshold = drift_threshold
+        self.tracks: List[Track] = []
+        self._next_id = 1
+        # class name -> set of track IDs ever assigned
+        self._track_ids_by_class: Dict[str, set] = {}
+
+    def needs_detection(self) -> bool:
+        return any(track.drift > self.drift_threshold for track in self.tracks)
+
+    def step(self, detections=None) -> List[Dict[str, Any]]:
+        """Advance all tracks one frame and return the current tracked boxes"""
+        for track in self.tracks:
+            track.predict()
+
+        if detections is not None:
+            self._associate(detections)
+
+        self.tracks = [
+            track for track in self.tracks
+            if track.time_since_update <= self.max_age and track.misses <= self.max_misses
+        ]
+        return [track.to_detection() for track in self.tracks]
+
+    def _associate(self, detections: List[Dict[str, Any]]):
+        existing = list(self.tracks)
+        unmatched = set(range(len(detections)))
+        if self.tracks and detections:
+            ious = bbox_iou(
+                [track.bbox for track in self.tracks],
+                [detection['bbox'] for detection in detections]
+            )
+            # Greedy matching, best overlap first, same class only
+            for flat_index in np.argsort(-ious, axis=None):
+                t, d = np.unravel_index(flat_index, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                track = self.tracks[t]
+                if d not in unmatched or track.time_since_update == 0:
+                    continue
+                if track.class_name != detections[d]['class']:
+                    continue
+                track.update(detections[d])
+                unmatched.discard(d)
+
+        for track in existing:
+            if track.time_since_update > 0:
+                track.misses += 1
+            # The detector has looked, matched or not; measure drift from here on
+            track.anchor = track.x[:2].copy()
+
+        for d in sorted(unmatched):
+            track = Track(self._next_id, detections[d])
+            self._next_id += 1
+            self.tracks.append(track)
+            self._track_ids_by_class.setdefault(track.class_name, set()).add(track.track_id)
+
+    def distinct_counts(self) -> Dict[str, int]:
+        """Number of distinct tracks seen per class"""
+        return {class_name: len(ids) for class_name, ids in self._track_ids_by_class.items()}
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and optional SQLite persistence.
+
+    Values must be JSON-serializable when a backing_path is given. The on-disk
+    table is written through on every set and read on in-memory misses, so
+    entries survive restarts until their TTL runs out.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 86400, backing_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backing_path = backing_path
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if backing_path:
+            self._open_backing_store(backing_path)
+
+    def _open_backing_store(self, path: str):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+            self._db.commit()
+            logger.info(f"Opened cache backing store: {path}")
+        except Exception as e:
+            logger.error(f"Error opening cache backing store {path}: {str(e)}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            value = self._load(key, now)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                        (key, json.dumps(value), expires_at)
+                    )
+                    # Keep the table bounded the same way as memory
+                    self._db.execute(
+                        'DELETE FROM cache WHERE key NOT IN '
+                        '(SELECT key FROM cache ORDER BY expires_at DESC LIMIT ?)',
+                        (self.maxsize,)
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    logger.warning(f"Error writing cache entry {key}: {str(e)}")
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        """Insert into memory and evict least-recently-used entries. Caller holds the lock."""
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str, now: float) -> Optional[Any]:
+        """Read an entry from the backing store into memory. Caller holds the lock."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"Error reading cache entry {key}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        self._store(key, value, row[1])
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM cache')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'persistent': self._db is not None
+            }
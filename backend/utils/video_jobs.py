@@ -0,0 +1,197 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when a job queue cannot accept more work"""
+    pass
+
+class JobQueue:
+    """Bounded background worker pool for long-running jobs.
+
+    Progress and status are pushed over Socket.IO as '<event_prefix>_progress'
+    and '<event_prefix>_status' events to the room named after the job ID.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        max_queue_size: int = 16,
+        retention_seconds: int = 3600,
+        progress_interval: float = 1.0,
+        event_prefix: str = 'video_job'
+    ):
+        self.num_workers = num_workers
+        self.event_prefix = event_prefix
+        self.retention_seconds = retention_seconds
+        self.progress_interval = progress_interval
+        self.socketio = None
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def init_app(self, socketio=None):
+        """Attach the Socket.IO server and start the worker threads"""
+        self.socketio = socketio
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker, name=f'{self.event_prefix}-worker-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Started {self.num_workers} {self.event_prefix} workers")
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args, **kwargs) -> str:
+        """Queue fn(*args, progress=callback, **kwargs) and return the job ID"""
+        if not self._workers:
+            self.init_app(self.socketio)
+
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {
+                'frames_done': 0,
+                'total_frames': 0,
+                'detections': 0,
+                'percent': 0.0,
+                'eta_seconds': None
+            },
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, fn, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+            raise JobQueueFull(f"{self.event_prefix} queue is full ({self._queue.maxsize} jobs)")
+        logger.info(f"Queued {self.event_prefix} {job_id} (queue depth: {self._queue.qsize()})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of the job state, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['progress'] = dict(job['progress'])
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job['status'] for job in self._jobs.values()]
+        return {
+            'workers': self.num_workers,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_size': self._queue.maxsize,
+            'running': statuses.count('running'),
+            'queued': statuses.count('queued')
+        }
+
+    def _worker(self):
+        while True:
+            job_id, fn, args, kwargs = self._queue.get()
+            try:
+                self._run(job_id, fn, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id, fn, args, kwargs):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+        self._emit(f'{self.event_prefix}_status', job_id, {'status': 'running'})
+
+        last_emit = [0.0]
+
+        def progress(frames_done: int, total_frames: int, detections: int):
+            now = time.time()
+            with self._lock:
+                elapsed = now - job['started_at']
+                eta = None
+                if frames_done > 0 and total_frames > frames_done:
+                    eta = elapsed / frames_done * (total_frames - frames_done)
+                job['progress'] = {
+                    'frames_done': frames_done,
+                    'total_frames': total_frames,
+                    'detections': detections,
+                    'percent': round(100.0 * frames_done / total_frames, 1) if total_frames else 0.0,
+                    'eta_seconds': eta
+                }
+                payload = dict(job['progress'])
+            # Throttle Socket.IO traffic for fast jobs
+            if now - last_emit[0] >= self.progress_interval:
+                last_emit[0] = now
+                self._emit(f'{self.event_prefix}_progress', job_id, payload)
+
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+            with self._lock:
+                job['status'] = 'completed'
+                job['result'] = result
+                job['finished_at'] = time.time()
+            logger.info(f"{self.event_prefix} {job_id} completed in {job['finished_at'] - job['started_at']:.2f}s")
+            self._emit(f'{self.event_prefix}_status', job_id, {'status': 'completed', 'result': result})
+        except Exception as e:
+            logger.error(f"Error in {self.event_prefix} {job_id}: {str(e)}")
+            with self._lock:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                job['finished_at'] = time.time()
+            self._emit(f'{self.event_prefix}_status', job_id, {'status': 'failed', 'error': str(e)})
+
+    def _emit(self, event: str, job_id: str, payload: Dict[str, Any]):
+        if self.socketio is None:
+            return
+        try:
+            self.socketio.emit(event, dict(payload, job_id=job_id), room=job_id)
+        except Exception as e:
+            logger.warning(f"Could not emit {event} for job {job_id}: {str(e)}")
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished_at'] is not None and job['finished_at'] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+# Process-wide video job queue, started by create_app()
+video_job_queue = JobQueue(
+    num_workers=Config.VIDEO_JOB_WORKERS,
+    max_queue_size=Config.VIDEO_JOB_QUEUE_SIZE,
+    retention_seconds=Config.VIDEO_JOB_RETENTION_SECONDS,
+    progress_interval=Config.VIDEO_JOB_PROGRESS_INTERVAL
+)
+
+# Background Gemini enrichment for image detections
+analysis_job_queue = JobQueue(
+    num_workers=Config.ANALYSIS_JOB_WORKERS,
+    max_queue_size=Config.ANALYSIS_JOB_QUEUE_SIZE,
+    retention_seconds=Config.ANALYSIS_JOB_RETENTION_SECONDS,
+    event_prefix='weapon_analysis'
+)
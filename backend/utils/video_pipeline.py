@@ -0,0 +1,302 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import cv2
+import numpy as np
+from utils.frame_ring import FrameRing, SlotHandle
+from utils.metrics import stage_seconds
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marks the end of the frame stream in the stage queues
+_END = object()
+
+class StageStats:
+    """Timing for a single pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0  # Seconds spent doing the stage's own work
+        self.wait_time = 0.0  # Seconds blocked on the neighbouring queues
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'frames': self.items,
+            'busy_seconds': round(self.busy_time, 4),
+            'wait_seconds': round(self.wait_time, 4),
+            'ms_per_frame': round(1000.0 * self.busy_time / self.items, 3) if self.items else 0.0,
+            'max_fps': round(self.items / self.busy_time, 2) if self.busy_time > 0 else None
+        }
+
+class VideoPipeline:
+    """Decode -> infer -> annotate -> encode pipeline with bounded queues.
+
+    Decode, annotate and encode each run on their own thread so that OpenCV
+    decoding and encoding overlap with inference, which runs on the calling
+    thread. Every stage is a single FIFO worker, so frame order is preserved.
+
+    should_infer is evaluated as each frame arrives at the infer stage, and
+    the frames it selects are inferred in batches of batch_size, or in a
+    smaller batch once queue_size frames are waiting on one. redetect is
+    asked about every other frame in order, once track_fn has seen all earlier
+    frames, so track_fn-driven re-detection still decides frame by frame; the
+    frames it selects run as one-frame batches of their own.
+
+    With a frame_ring, frames are decoded straight into shared memory slots
+    (while at most max_ring_slots are held) so a process-based infer_fn can
+    read them without a copy; each slot is released once its frame is encoded.
+    prefer_ring limits slots to the frames that are expected to be inferred.
+    """
+
+    def __init__(
+        self,
+        cap: cv2.VideoCapture,
+        writer: Optional[cv2.VideoWriter],
+        infer_fn: Callable[[List[np.ndarray]], List[List[Dict[str, Any]]]],
+        annotate_fn: Callable[[np.ndarray, List[Dict[str, Any]]], np.ndarray],
+        batch_size: int = 4,
+        queue_size: int = 32,
+        should_infer: Callable[[int, np.ndarray], bool] = lambda index, frame: True,
+        on_detections: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+        track_fn: Optional[Callable[[int, Optional[List[Dict[str, Any]]]], List[Dict[str, Any]]]] = None,
+        redetect: Optional[Callable[[int], bool]] = None,
+        on_frame_written: Optional[Callable[[int], None]] = None,
+        frame_ring: Optional[FrameRing] = None,
+        max_ring_slots: Optional[int] = None,
+        prefer_ring: Optional[Callable[[int], bool]] = None
+    ):
+        self.cap = cap
+        self.writer = writer
+        self.infer_fn = infer_fn
+        self.annotate_fn = annotate_fn
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.should_infer = should_infer
+        self.on_detections = on_detections
+        self.track_fn = track_fn
+        self.redetect = redetect
+        self.on_frame_written = on_frame_written
+        self.frame_ring = frame_ring
+        # Leave slots for other users of a shared ring; when none are free, frames go on the heap
+        self.max_ring_slots = max_ring_slots if max_ring_slots is not None else (
+            frame_ring.num_slots // 2 if frame_ring else 0
+        )
+        # Frames likely to be inferred; the rest stay on the heap so they do not use up slots
+        self.prefer_ring = prefer_ring or (lambda index: True)
+        self._slots: Dict[int, SlotHandle] = {}  # frame index -> ring slot holding it
+        self._slots_lock = threading.Lock()
+
+        self._decode_queue = queue.Queue(maxsize=queue_size)
+        self._annotate_queue = queue.Queue(maxsize=queue_size)
+        self._encode_queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._errors = []
+        self.stats = {name: StageStats(name) for name in ('decode', 'infer', 'annotate', 'encode')}
+        # Inference and drawing are recorded by detect_weapons_batch() and draw_detections()
+        self._decode_seconds = stage_seconds.labels('decode')
+        self._encode_seconds = stage_seconds.labels('encode')
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.wait_time += time.perf_counter() - start
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+                stats.wait_time += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                continue
+        stats.wait_time += time.perf_counter() - start
+        return _END
+
+    def _fail(self, stage: str, error: Exception):
+        logger.error(f"Error in {stage} stage: {str(error)}")
+        self._errors.append(error)
+        self._stop.set()
+
+    def _read_into_slot(self, index: int, shape):
+        """Decode the next frame into a free ring slot, falling back to a normal array"""
+        slot = None
+        with self._slots_lock:
+            if len(self._slots) < self.max_ring_slots and self.prefer_ring(index):
+                slot = self.frame_ring.reserve(shape, timeout=0)
+        if slot is None:
+            return self.cap.read()
+        target = self.frame_ring.array(slot)
+        ret, frame = self.cap.read(target)
+        # OpenCV reallocates instead of writing in place when the frame does not match the slot
+        if ret and frame is not None and np.shares_memory(frame, target):
+            with self._slots_lock:
+                self._slots[index] = slot
+        else:
+            self.frame_ring.release(slot)
+        return ret, frame
+
+    def _release_slot(self, index: int):
+        with self._slots_lock:
+            slot = self._slots.pop(index, None)
+        if slot is not None:
+            self.frame_ring.release(slot)
+
+    def _decode(self):
+        stats = self.stats['decode']
+        shape = None
+        if self.frame_ring is not None:
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            shape = (height, width, 3) if width and height else None
+        try:
+            index = 0
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = self._read_into_slot(index, shape) if shape else self.cap.read()
+                elapsed = time.perf_counter() - start
+                stats.busy_time += elapsed
+                self._decode_seconds.observe(elapsed)
+                if not ret:
+                    break
+                stats.items += 1
+                self._put(self._decode_queue, (index, frame), stats)
+                index += 1
+        except Exception as e:
+            self._fail('decode', e)
+        finally:
+            self._put(self._decode_queue, _END, stats)
+
+    def _infer(self):
+        """Batch frames selected by should_infer and pass every frame on in order"""
+        stats = self.stats['infer']
+        pending = []
+        sampled = 0
+        finished = False
+        while not finished and not self._stop.is_set():
+            item = self._get(self._decode_queue, stats)
+            if item is _END:
+                finished = True
+            else:
+                index, frame = item
+                infer = self.should_infer(index, frame)
+                pending.append((index, frame, infer))
+                if infer:
+                    sampled += 1
+
+            # Frames with no inferred frame ahead of them need not wait for a batch, and sparse
+            # sampling must not hold more than a queue's worth of decoded frames back
+            if pending and (finished or sampled >= self.batch_size or not sampled or len(pending) >= self.queue_size):
+                start = time.perf_counter()
+                batch = [frame for _, frame, infer in pending if infer]
+                results = iter(self.infer_fn(batch) if batch else [])
+                stats.busy_time += time.perf_counter() - start
+                stats.items += len(batch)
+
+                for index, frame, infer in pending:
+                    detections = next(results) if infer else None
+                    if not infer and self.redetect and self.redetect(index):
+                        start = time.perf_counter()
+                        detections = self.infer_fn([frame])[0]
+                        stats.busy_time += time.perf_counter() - start
+                        stats.items += 1
+                        infer = True
+                    if infer and self.on_detections:
+                        self.on_detections(index, detections)
+                    if self.track_fn:
+                        # Tracker sees every frame, with None where the detector did not run
+                        start = time.perf_counter()
+                        detections = self.track_fn(index, detections)
+                        stats.busy_time += time.perf_counter() - start
+                    detections = detections or []
+                    self._put(self._annotate_queue, (index, frame, detections), stats)
+                pending = []
+                sampled = 0
+        self._put(self._annotate_queue, _END, stats)
+
+    def _annotate(self):
+        stats = self.stats['annotate']
+        try:
+            while True:
+                item = self._get(self._annotate_queue, stats)
+                if item is _END:
+                    break
+                index, frame, detections = item
+                if detections:
+                    start = time.perf_counter()
+                    frame = self.annotate_fn(frame, detections)
+                    stats.busy_time += time.perf_counter() - start
+                stats.items += 1
+                self._put(self._encode_queue, (index, frame), stats)
+        except Exception as e:
+            self._fail('annotate', e)
+        finally:
+            self._put(self._encode_queue, _END, stats)
+
+    def _encode(self):
+        stats = self.stats['encode']
+        try:
+            while True:
+                item = self._get(self._encode_queue, stats)
+                if item is _END:
+                    break
+                index, frame = item
+                if self.writer is not None:
+                    start = time.perf_counter()
+                    self.writer.write(frame)
+                    elapsed = time.perf_counter() - start
+                    stats.busy_time += elapsed
+                    self._encode_seconds.observe(elapsed)
+                del frame
+                self._release_slot(index)
+                stats.items += 1
+                if self.on_frame_written:
+                    self.on_frame_written(index + 1)
+        except Exception as e:
+            self._fail('encode', e)
+
+    def run(self) -> Dict[str, Any]:
+        """Run the pipeline to completion and return per-stage timings"""
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._decode, name='pipeline-decode', daemon=True),
+            threading.Thread(target=self._annotate, name='pipeline-annotate', daemon=True),
+            threading.Thread(target=self._encode, name='pipeline-encode', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            self._infer()
+        except Exception as e:
+            self._fail('infer', e)
+
+        for thread in threads:
+            thread.join()
+        # Frames dropped on error never reach the encoder
+        for index in list(self._slots):
+            self._release_slot(index)
+
+        if self._errors:
+            raise self._errors[0]
+
+        return self.timings(time.perf_counter() - start)
+
+    def timings(self, wall_time: float) -> Dict[str, Any]:
+        stages = {name: stats.to_dict() for name, stats in self.stats.items()}
+        bottleneck = max(self.stats.values(), key=lambda stats: stats.busy_time).name
+        return {
+            'wall_seconds': round(wall_time, 4),
+            'bottleneck': bottleneck,
+            'stages': stages
+        }
@@ -0,0 +1,56 @@
+import logging
+from typing import Iterator, Tuple
+import cv2
+import numpy as np
+from utils.metrics import time_stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def iter_sampled_frames(
+    cap: cv2.VideoCapture,
+    interval: int,
+    seek_min_interval: int = 0
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_index, frame) for every interval-th frame without decoding the rest.
+
+    Skipped frames are only grabbed, which avoids the retrieve/colour-convert
+    and copy work of cap.read(). When interval is at least seek_min_interval
+    (and seek_min_interval > 0) the capture seeks straight to the next sampled
+    frame instead, which lets the backend jump from the nearest keyframe. If the
+    backend cannot seek accurately we fall back to grabbing.
+    """
+    interval = max(1, interval)
+    use_seek = seek_min_interval > 0 and interval >= seek_min_interval
+    index = 0
+
+    while True:
+        if use_seek and index > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if position != index:
+                logger.warning(f"Seek to frame {index} landed on {position}, falling back to grab()")
+                use_seek = False
+                # Grab forward to the requested frame, or resync if we overshot
+                while position < index:
+                    if not cap.grab():
+                        return
+                    position += 1
+                index = position
+
+        with time_stage('decode'):
+            ret, frame = cap.read()
+        if not ret:
+            return
+        yield index, frame
+
+        if use_seek:
+            index += interval
+            continue
+
+        # Skip the unsampled frames without decoding them into numpy arrays
+        for _ in range(interval - 1):
+            if not cap.grab():
+                return
+        index += interval
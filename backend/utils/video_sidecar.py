@@ -0,0 +1,125 @@
+import bisect
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Assumed when the container does not report a frame rate
+DEFAULT_FPS = 30.0
+
+def compact_detection(detection: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields an overlay needs, rounded so sidecar lines stay short"""
+    compact = {
+        'class': detection['class'],
+        'confidence': round(float(detection['confidence']), 3),
+        'bbox': [round(float(v), 1) for v in detection['bbox']]
+    }
+    if 'track_id' in detection:
+        compact['track_id'] = detection['track_id']
+    return compact
+
+def format_vtt_timestamp(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600 * 1000)
+    minutes, milliseconds = divmod(milliseconds, 60 * 1000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+
+class DetectionSidecar:
+    """Detections of a video keyed by frame, for drawing the overlay at playback time.
+
+    An entry is recorded only when a frame's boxes differ from the previous
+    entry, and holds until the next one, so a quiet stretch of video costs a
+    single empty entry. Frames must be added in increasing order.
+
+    Written as NDJSON (a header line, then {"frame", "t", "detections"} per
+    entry) or as a WebVTT metadata track with one JSON cue per non-empty entry.
+    """
+
+    def __init__(self, fps: float, total_frames: int, width: int, height: int):
+        self.fps = fps if fps and fps > 0 else DEFAULT_FPS
+        self.total_frames = total_frames
+        self.width = width
+        self.height = height
+        self._frames: List[int] = []
+        self._detections: List[List[Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def timestamp(self, frame_index: int) -> float:
+        return round(frame_index / self.fps, 3)
+
+    def add(self, frame_index: int, detections: List[Dict[str, Any]]):
+        compact = [compact_detection(det) for det in detections or []]
+        if self._detections and compact == self._detections[-1]:
+            return
+        if not self._detections and not compact:
+            # Nothing to show before the first detection
+            return
+        self._frames.append(frame_index)
+        self._detections.append(compact)
+
+    def detections_at(self, frame_index: int) -> List[Dict[str, Any]]:
+        """Boxes in effect at a frame: those of the latest entry at or before it"""
+        position = bisect.bisect_right(self._frames, frame_index) - 1
+        return self._detections[position] if position >= 0 else []
+
+    def entries(self):
+        for frame_index, detections in zip(self._frames, self._detections):
+            yield {'frame': frame_index, 't': self.timestamp(frame_index), 'detections': detections}
+
+    def header(self) -> Dict[str, Any]:
+        return {
+            'type': 'header',
+            'fps': self.fps,
+            'total_frames': self.total_frames,
+            'width': self.width,
+            'height': self.height
+        }
+
+    def write_ndjson(self, path: str):
+        lines = [json.dumps(self.header(), separators=(',', ':'))]
+        lines.extend(json.dumps(entry, separators=(',', ':')) for entry in self.entries())
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+    def write_webvtt(self, path: str):
+        end_of_video = self.timestamp(max(self.total_frames, self._frames[-1] + 1 if self._frames else 0))
+        entries = list(self.entries())
+        cues = ['WEBVTT', '']
+        for position, entry in enumerate(entries):
+            if not entry['detections']:
+                continue
+            end = entries[position + 1]['t'] if position + 1 < len(entries) else end_of_video
+            end = max(end, entry['t'] + 0.001)
+            cues.append(f"{format_vtt_timestamp(entry['t'])} --> {format_vtt_timestamp(end)}")
+            cues.append(json.dumps({'frame': entry['frame'], 'detections': entry['detections']}, separators=(',', ':')))
+            cues.append('')
+        _write_atomic(path, '\n'.join(cues) + '\n')
+
+    @classmethod
+    def load_ndjson(cls, path: str) -> 'DetectionSidecar':
+        try:
+            with open(path) as f:
+                header = json.loads(f.readline())
+                sidecar = cls(header['fps'], header['total_frames'], header['width'], header['height'])
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        sidecar._frames.append(entry['frame'])
+                        sidecar._detections.append(entry['detections'])
+            return sidecar
+        except Exception as e:
+            logger.error(f"Error loading detection sidecar {path}: {str(e)}")
+            raise
+
+def _write_atomic(path: str, text: str):
+    """Write via a temporary file so a reader never sees half a sidecar"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -1,11 +1,14 @@
 import os
+import math
 import google.generativeai as genai
 import logging
 from typing import Dict, Optional
 import json
 from dotenv import load_dotenv
-import time
-from datetime import datetime, timedelta
+from config import Config
+from utils.ttl_cache import TTLCache
+from utils.rate_limit import TokenBucket
+from utils.metrics import time_stage, gemini_calls
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,38 +33,36 @@ except Exception as e:
     logger.error(f"Error initializing Gemini model: {str(e)}")
     raise
 
+# Gemini answers only depend on the class (and confidence bucket for risk),
+# so they are cached across requests and, optionally, restarts
+weapon_info_cache = TTLCache(
+    maxsize=Config.WEAPON_INFO_CACHE_SIZE,
+    ttl=Config.WEAPON_INFO_CACHE_TTL,
+    backing_path=Config.WEAPON_INFO_CACHE_PATH
+)
+
 class WeaponInfo:
     """Class to handle weapon information retrieval using Gemini API"""
     
     # Rate limiting configuration
     RATE_LIMIT_WINDOW = 60  # seconds
     MAX_REQUESTS_PER_WINDOW = 3
-    _request_timestamps = []
+    # Shared by every instance and thread; refills one request every WINDOW / MAX seconds
+    _rate_limiter = TokenBucket(
+        rate=MAX_REQUESTS_PER_WINDOW / RATE_LIMIT_WINDOW,
+        capacity=MAX_REQUESTS_PER_WINDOW
+    )
     
     @staticmethod
-    def _check_rate_limit():
-        """Check if we're within rate limits and wait if necessary"""
-        now = datetime.now()
-        # Remove timestamps older than the window
-        WeaponInfo._request_timestamps = [
-            ts for ts in WeaponInfo._request_timestamps
-            if now - ts < timedelta(seconds=WeaponInfo.RATE_LIMIT_WINDOW)
-        ]
-        
-        if len(WeaponInfo._request_timestamps) >= WeaponInfo.MAX_REQUESTS_PER_WINDOW:
-            # Calculate wait time
-            oldest_request = WeaponInfo._request_timestamps[0]
-            wait_time = (oldest_request + timedelta(seconds=WeaponInfo.RATE_LIMIT_WINDOW) - now).total_seconds()
-            if wait_time > 0:
-                logger.info(f"Rate limit reached. Waiting {wait_time:.1f} seconds...")
-                time.sleep(wait_time)
-                # Clear timestamps after waiting
-                WeaponInfo._request_timestamps = []
+    def _check_rate_limit(wait=False):
+        """Take a Gemini request slot. Only blocks (up to the configured timeout) if wait is True."""
+        if wait:
+            return WeaponInfo._rate_limiter.acquire(timeout=Config.GEMINI_RATE_LIMIT_TIMEOUT)
+        return WeaponInfo._rate_limiter.try_acquire()
     
     @staticmethod
-    def _record_request():
-        """Record a new API request timestamp"""
-        WeaponInfo._request_timestamps.append(datetime.now())
+    def rate_limit_stats():
+        return WeaponInfo._rate_limiter.stats()
     
     # Fallback weapon database for when API is not available
     FALLBACK_DATABASE = {
@@ -103,11 +104,68 @@ class WeaponInfo:
         }
     }
     
+    @classmethod
+    def fallback_weapon_info(cls, weapon_name):
+        """Static weapon information that needs no API call"""
+        data = cls.FALLBACK_DATABASE.get(weapon_name.lower())
+        if data:
+            return dict(data)
+        return {
+            "name": weapon_name,
+            "type": "unknown",
+            "description": "No information available",
+            "specifications": {},
+            "risk_factor": "unknown",
+            "prevention_measures": []
+        }
+
+    @classmethod
+    def fallback_risk_assessment(cls, weapon_name, confidence=None):
+        """Risk assessment derived from the fallback database"""
+        data = cls.fallback_weapon_info(weapon_name)
+        return {
+            "threat_analysis": data['description'],
+            "risk_level": data['risk_factor'],
+            "recommended_actions": list(data['prevention_measures']),
+            "safety_measures": [],
+            "emergency_procedures": []
+        }
+
     def __init__(self):
         self.model = model
+        self.cache = weapon_info_cache
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss counters for the shared Gemini response cache"""
+        return weapon_info_cache.stats()
+
+    @staticmethod
+    def _confidence_bucket(confidence):
+        """Round confidence down to the configured bucket so similar scores share a cache entry"""
+        if not confidence:
+            return 'none'
+        step = Config.RISK_CONFIDENCE_BUCKET
+        # Rounded before flooring: 0.3 / 0.1 is 2.9999999999999996, which would land in the 0.20 bucket
+        return f"{math.floor(round(confidence / step, 6)) * step:.2f}"
+
+    def get_weapon_info(self, weapon_name, remote=True, wait=False):
+        """Get detailed information about a weapon using Gemini AI.
+
+        Falls back to FALLBACK_DATABASE when remote is False or the rate limit
+        is exhausted; wait=True blocks for a rate-limit slot instead.
+        """
+        cache_key = f"info:{weapon_name.lower()}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if not remote:
+            return self.fallback_weapon_info(weapon_name)
+        if not self._check_rate_limit(wait):
+            gemini_calls.labels('info', 'rate_limited').inc()
+            return self.fallback_weapon_info(weapon_name)
 
-    def get_weapon_info(self, weapon_name):
-        """Get detailed information about a weapon using Gemini AI"""
         try:
             prompt = f"""Analyze this weapon and provide information in the following JSON format:
             {{
@@ -127,14 +185,18 @@ class WeaponInfo:
 
             Provide accurate and detailed information about {weapon_name}."""
 
-            response = self.model.generate_content(prompt)
-            response.resolve()
+            with time_stage('gemini'):
+                response = self.model.generate_content(prompt)
+                response.resolve()
             
             try:
                 weapon_data = json.loads(response.text)
+                self.cache.set(cache_key, weapon_data)
+                gemini_calls.labels('info', 'ok').inc()
                 return weapon_data
             except json.JSONDecodeError:
                 logger.error("Failed to parse Gemini response as JSON")
+                gemini_calls.labels('info', 'invalid_json').inc()
                 return {
                     "name": weapon_name,
                     "type": "unknown",
@@ -146,6 +208,7 @@ class WeaponInfo:
 
         except Exception as e:
             logger.error(f"Error getting weapon info: {str(e)}")
+            gemini_calls.labels('info', 'error').inc()
             return {
                 "name": weapon_name,
                 "type": "unknown",
@@ -155,8 +218,19 @@ class WeaponInfo:
                 "prevention_measures": []
             }
 
-    def get_risk_assessment(self, weapon_name, confidence=None):
+    def get_risk_assessment(self, weapon_name, confidence=None, remote=True, wait=False):
         """Get risk assessment for a weapon using Gemini AI"""
+        cache_key = f"risk:{weapon_name.lower()}:{self._confidence_bucket(confidence)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if not remote:
+            return self.fallback_risk_assessment(weapon_name, confidence)
+        if not self._check_rate_limit(wait):
+            gemini_calls.labels('risk', 'rate_limited').inc()
+            return self.fallback_risk_assessment(weapon_name, confidence)
+
         try:
             confidence_str = f" with {confidence:.2f} confidence" if confidence else ""
             prompt = f"""Analyze the risk of {weapon_name}{confidence_str} and provide assessment in the following JSON format:
@@ -170,14 +244,18 @@ class WeaponInfo:
 
             Provide a comprehensive risk assessment."""
 
-            response = self.model.generate_content(prompt)
-            response.resolve()
+            with time_stage('gemini'):
+                response = self.model.generate_content(prompt)
+                response.resolve()
             
             try:
                 risk_data = json.loads(response.text)
+                self.cache.set(cache_key, risk_data)
+                gemini_calls.labels('risk', 'ok').inc()
                 return risk_data
             except json.JSONDecodeError:
                 logger.error("Failed to parse Gemini response as JSON")
+                gemini_calls.labels('risk', 'invalid_json').inc()
                 return {
                     "threat_analysis": "Unable to assess risk",
                     "risk_level": "unknown",
@@ -188,6 +266,7 @@ class WeaponInfo:
 
         except Exception as e:
             logger.error(f"Error getting risk assessment: {str(e)}")
+            gemini_calls.labels('risk', 'error').inc()
             return {
                 "threat_analysis": "Error assessing risk",
                 "risk_level": "unknown",
@@ -0,0 +1,96 @@
+import React, { useEffect, useRef } from 'react';
+import { Box } from '@mui/material';
+
+const SERVER_URL = 'http://localhost:5000';
+
+const BOX_COLOR = '#ff1744';
+
+// Plays the untouched source video and draws the detections of its WebVTT
+// metadata track on a canvas laid over it. Each cue holds the boxes in effect
+// until the next one, in source-video pixels.
+const DetectionOverlay = ({ sourceUrl, webvttUrl }) => {
+  const videoRef = useRef(null);
+  const trackRef = useRef(null);
+  const canvasRef = useRef(null);
+
+  useEffect(() => {
+    const video = videoRef.current;
+    const textTrack = trackRef.current?.track;
+    if (!video || !textTrack) return undefined;
+
+    // Metadata tracks only fire cuechange when they are not disabled
+    textTrack.mode = 'hidden';
+
+    const draw = () => {
+      const canvas = canvasRef.current;
+      if (!canvas || !video.videoWidth) return;
+
+      // Match the canvas to the displayed size; boxes are scaled from the source size
+      canvas.width = video.clientWidth;
+      canvas.height = video.clientHeight;
+      const context = canvas.getContext('2d');
+      context.clearRect(0, 0, canvas.width, canvas.height);
+
+      // object-fit: contain letterboxes the picture inside the element
+      const scale = Math.min(canvas.width / video.videoWidth, canvas.height / video.videoHeight);
+      const offsetX = (canvas.width - video.videoWidth * scale) / 2;
+      const offsetY = (canvas.height - video.videoHeight * scale) / 2;
+
+      context.lineWidth = 2;
+      context.font = '14px sans-serif';
+      Array.from(textTrack.activeCues || []).forEach((cue) => {
+        let payload;
+        try {
+          payload = JSON.parse(cue.text);
+        } catch (error) {
+          return;
+        }
+        payload.detections.forEach((detection) => {
+          const [x1, y1, x2, y2] = detection.bbox;
+          const left = offsetX + x1 * scale;
+          const top = offsetY + y1 * scale;
+          const label = `${detection.class} ${(detection.confidence * 100).toFixed(0)}%`;
+
+          context.strokeStyle = BOX_COLOR;
+          context.strokeRect(left, top, (x2 - x1) * scale, (y2 - y1) * scale);
+          context.fillStyle = BOX_COLOR;
+          context.fillRect(left, Math.max(0, top - 18), context.measureText(label).width + 8, 18);
+          context.fillStyle = '#fff';
+          context.fillText(label, left + 4, Math.max(14, top - 4));
+        });
+      });
+    };
+
+    textTrack.addEventListener('cuechange', draw);
+    video.addEventListener('loadedmetadata', draw);
+    video.addEventListener('seeked', draw);
+    window.addEventListener('resize', draw);
+    return () => {
+      textTrack.removeEventListener('cuechange', draw);
+      video.removeEventListener('loadedmetadata', draw);
+      video.removeEventListener('seeked', draw);
+      window.removeEventListener('resize', draw);
+    };
+  }, [sourceUrl, webvttUrl]);
+
+  return (
+    <Box sx={{ position: 'relative', width: '100%', maxWidth: '800px' }}>
+      {/* crossOrigin: the track is fetched from the API server, which sends CORS headers */}
+      <video
+        ref={videoRef}
+        controls
+        crossOrigin="anonymous"
+        style={{ width: '100%', display: 'block' }}
+        src={`${SERVER_URL}${sourceUrl}`}
+      >
+        <track ref={trackRef} kind="metadata" default src={`${SERVER_URL}${webvttUrl}`} />
+      </video>
+      <canvas
+        ref={canvasRef}
+        style={{ position: 'absolute', top: 0, left: 0, width: '100%', height: '100%', pointerEvents: 'none' }}
+      />
+    </Box>
+  );
+};
+
+export default DetectionOverlay;
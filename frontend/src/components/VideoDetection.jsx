@@ -1,10 +1,11 @@
 import React, { useState, useRef } from 'react';
-import axios from 'axios';
-import { Box, Button, Typography, Paper, CircularProgress, Alert, Grid, Card, CardContent, List, ListItem, ListItemText, Divider } from '@mui/material';
+import { Box, Button, Typography, Paper, CircularProgress, Alert, Grid, Card, CardContent, List, ListItem, ListItemText, Divider, LinearProgress, ToggleButton, ToggleButtonGroup } from '@mui/material';
 import { styled } from '@mui/material/styles';
 import CloudUploadIcon from '@mui/icons-material/CloudUpload';
 import VideoLibraryIcon from '@mui/icons-material/VideoLibrary';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, LineChart, Line } from 'recharts';
+import { detectVideo, exportVideo } from '../services/api';
+import DetectionOverlay from './DetectionOverlay';
 
 const VisuallyHiddenInput = styled('input')`
   clip: rect(0 0 0 0);
@@ -23,6 +24,12 @@ const VideoDetection = () => {
   const [isProcessing, setIsProcessing] = useState(false);
   const [error, setError] = useState(null);
   const [detectionResults, setDetectionResults] = useState(null);
+  const [progress, setProgress] = useState(0);
+  const [progressMessage, setProgressMessage] = useState('');
+  // 'metadata' skips re-encoding: boxes are drawn over the original video in the browser
+  const [outputMode, setOutputMode] = useState('full');
+  const [isExporting, setIsExporting] = useState(false);
+  const [exportedVideoUrl, setExportedVideoUrl] = useState(null);
   const fileInputRef = useRef(null);
 
   const handleFileSelect = (event) => {
@@ -56,29 +63,49 @@ const VideoDetection = () => {
 
     setIsProcessing(true);
     setError(null);
-
-    const formData = new FormData();
-    formData.append('file', selectedFile);
+    setDetectionResults(null);
+    setExportedVideoUrl(null);
+    setProgress(0);
+    setProgressMessage('Uploading...');
 
     try {
-      const response = await axios.post('http://localhost:5000/api/video/detect', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      // Resolves once the background detection job has finished
+      const result = await detectVideo(selectedFile, (percent, message) => {
+        setProgress(percent);
+        setProgressMessage(message);
+      }, outputMode);
 
-      if (response.data.success) {
-        setDetectionResults(response.data);
+      if (result.success) {
+        setDetectionResults(result);
       } else {
-        setError(response.data.error || 'Failed to process video');
+        setError(result.error || 'Failed to process video');
       }
     } catch (error) {
-      setError(error.response?.data?.error || 'Error processing video');
+      setError(error.response?.data?.error || error.message || 'Error processing video');
     } finally {
       setIsProcessing(false);
     }
   };
 
+  const handleExport = async () => {
+    setIsExporting(true);
+    setError(null);
+    setProgress(0);
+    setProgressMessage('Exporting...');
+
+    try {
+      const result = await exportVideo(detectionResults.export_url, (percent, message) => {
+        setProgress(percent);
+        setProgressMessage(message);
+      });
+      setExportedVideoUrl(result.processed_video_url);
+    } catch (error) {
+      setError(error.response?.data?.error || error.message || 'Error exporting video');
+    } finally {
+      setIsExporting(false);
+    }
+  };
+
   const renderDetectionSummary = () => {
     if (!detectionResults?.detections_summary) return null;
 
@@ -264,7 +291,17 @@ const VideoDetection = () => {
         </Alert>
       )}
 
-      <Box sx={{ display: 'flex', justifyContent: 'center', mb: 3 }}>
+      <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', gap: 2, mb: 3 }}>
+        <ToggleButtonGroup
+          size="small"
+          exclusive
+          value={outputMode}
+          onChange={(event, mode) => mode && setOutputMode(mode)}
+          disabled={isProcessing}
+        >
+          <ToggleButton value="full">Burn in boxes</ToggleButton>
+          <ToggleButton value="metadata">Overlay boxes</ToggleButton>
+        </ToggleButtonGroup>
         <Button
           variant="contained"
           onClick={handleUpload}
@@ -275,6 +312,15 @@ const VideoDetection = () => {
         </Button>
       </Box>
 
+      {(isProcessing || isExporting) && (
+        <Box sx={{ mb: 3 }}>
+          <LinearProgress variant="determinate" value={progress} />
+          <Typography variant="body2" color="text.secondary" sx={{ mt: 1, textAlign: 'center' }}>
+            {progressMessage}
+          </Typography>
+        </Box>
+      )}
+
       {detectionResults && (
         <Box>
           <Typography variant="h5" gutterBottom>
@@ -296,6 +342,35 @@ const VideoDetection = () => {
           {renderDetectionSummary()}
           {renderFrameAnalysis()}
 
+          {detectionResults.mode === 'metadata' && (
+            <Paper elevation={3} sx={{ p: 3, mt: 3 }}>
+              <Typography variant="h6" gutterBottom>
+                Video with Detections
+              </Typography>
+              <DetectionOverlay
+                sourceUrl={detectionResults.source_video_url}
+                webvttUrl={detectionResults.webvtt_url}
+              />
+              <Box sx={{ mt: 2 }}>
+                <Button
+                  variant="outlined"
+                  onClick={handleExport}
+                  disabled={isExporting}
+                  startIcon={isExporting ? <CircularProgress size={20} /> : null}
+                >
+                  {isExporting ? 'Exporting...' : 'Export with boxes'}
+                </Button>
+              </Box>
+              {exportedVideoUrl && (
+                <video
+                  controls
+                  style={{ width: '100%', maxWidth: '800px', marginTop: 16 }}
+                  src={`http://localhost:5000${exportedVideoUrl}`}
+                />
+              )}
+            </Paper>
+          )}
+
           {detectionResults.processed_video_url && (
             <Paper elevation={3} sx={{ p: 3, mt: 3 }}>
               <Typography variant="h6" gutterBottom>
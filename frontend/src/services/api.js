@@ -36,7 +36,36 @@ export const detectImage = async (file) => {
     }
 };
 
-export const detectVideo = async (file) => {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Poll a background video job until it finishes and return its result
+export const waitForVideoJob = async (statusUrl, onProgress) => {
+    while (true) {
+        // status_url is absolute on the server; the api instance already adds /api
+        const response = await api.get(statusUrl.replace(/^\/api/, ''));
+        const job = response.data;
+
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Video processing failed');
+        }
+        if (onProgress) {
+            const message = job.status === 'queued'
+                ? 'Waiting in queue...'
+                : `Processed ${job.progress.frames_done} of ${job.progress.total_frames} frames`;
+            onProgress(job.progress.percent, message);
+        }
+        await sleep(JOB_POLL_INTERVAL_MS);
+    }
+};
+
+// Upload a video, then wait for its detection job to finish.
+// mode 'metadata' keeps the video as uploaded and returns detection sidecars for an overlay
+export const detectVideo = async (file, onProgress, mode) => {
     const formData = new FormData();
     formData.append('file', file);
 
@@ -45,10 +74,28 @@ export const detectVideo = async (file) => {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
+            params: mode ? { mode } : undefined,
         });
-        return response.data;
+        if (response.status !== 202) {
+            return response.data;
+        }
+        return await waitForVideoJob(response.data.status_url, onProgress);
     } catch (error) {
         console.error('Error detecting video:', error);
         throw error;
     }
-}; 
\ No newline at end of file
+};
+
+// Burn a metadata-mode video's detections into a copy and return the finished export
+export const exportVideo = async (exportUrl, onProgress) => {
+    try {
+        const response = await api.post(exportUrl.replace(/^\/api/, ''));
+        if (response.status !== 202) {
+            return response.data;
+        }
+        return await waitForVideoJob(response.data.status_url, onProgress);
+    } catch (error) {
+        console.error('Error exporting video:', error);
+        throw error;
+    }
+};